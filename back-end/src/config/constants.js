@@ -4,6 +4,7 @@ const MAX_HISTORY = Number(process.env.MAX_HISTORY || 100);
 const MAX_ALERTS = Number(process.env.MAX_ALERTS || 50);
 const SERVER_START_TIME = Date.now();
 const SSE_PING_INTERVAL = Number(process.env.SSE_PING_INTERVAL || 30000);
+const MAX_DETECTION_STREAMS = Number(process.env.MAX_DETECTION_STREAMS || 32);
 
 const DEFAULT_COMMANDS = ['test_motor', 'get_status', 'calibrate_sensor', 'reboot', 'set_vibration'];
 
@@ -14,5 +15,6 @@ module.exports = {
   MAX_ALERTS,
   SERVER_START_TIME,
   SSE_PING_INTERVAL,
+  MAX_DETECTION_STREAMS,
   DEFAULT_COMMANDS
 };
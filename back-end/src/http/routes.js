@@ -9,7 +9,7 @@ const {
   sendSSEUpdate
 } = require('../services/broadcastService');
 const {
-  handleObjectDetection,
+  receiveDetection,
   sendCommandToESP32
 } = require('../services/systemService');
 const { getLocalIP } = require('../utils/network');
@@ -196,15 +196,27 @@ function registerHttpRoutes(router, state) {
       });
     }
 
-    handleObjectDetection(state, {
+    const result = receiveDetection(state, {
       type: 'detection',
       ...validation.data,
       timestamp: Date.now()
     });
 
+    if (result.status === 'gap') {
+      return res.status(409).json({
+        success: false,
+        snapshot_required: true,
+        stream: validation.data.stream,
+        expected: result.expected,
+        message: 'Sequência fora de ordem: envie um snapshot'
+      });
+    }
+
     res.json({
       success: true,
-      message: 'Descrição recebida e distribuída',
+      message: result.changed ? 'Descrição recebida e distribuída' : 'Sem mudança',
+      seq: validation.data.seq,
+      delta: true,
       receivedAt: Date.now()
     });
   });
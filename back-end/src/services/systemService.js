@@ -1,4 +1,5 @@
 const { MAX_HISTORY, MAX_ALERTS } = require('../state/systemState');
+const { MAX_DETECTION_STREAMS } = require('../config/constants');
 const { broadcastToAppClients, broadcastToSSEClients } = require('./broadcastService');
 
 function addSystemAlert(state, level, message) {
@@ -18,25 +19,35 @@ function addSystemAlert(state, level, message) {
   return alert;
 }
 
+// Etapas parcial/final da mesma captura (mesmo capture_id) substituem a entrada anterior
+function upsertDetection(list, detection, maxLength) {
+  if (detection.capture_id) {
+    const index = list.findIndex((item) => item.capture_id === detection.capture_id);
+    if (index !== -1) {
+      list[index] = detection;
+      return;
+    }
+  }
+  list.push(detection);
+  if (list.length > maxLength) {
+    list.shift();
+  }
+}
+
 function handleObjectDetection(state, payload) {
   const detection = {
     description: payload.description_pt,
     description_kz: payload.description_kz || payload.description_pt,
     objects: payload.objects || [],
     confidence: payload.confidence,
+    capture_id: payload.capture_id || null,
+    stage: payload.stage || 'final',
     timestamp: payload.timestamp || Date.now(),
     receivedAt: Date.now()
   };
 
-  state.lastDetections.push(detection);
-  if (state.lastDetections.length > 5) {
-    state.lastDetections.shift();
-  }
-
-  state.detectionHistory.push(detection);
-  if (state.detectionHistory.length > MAX_HISTORY) {
-    state.detectionHistory.shift();
-  }
+  upsertDetection(state.lastDetections, detection, 5);
+  upsertDetection(state.detectionHistory, detection, MAX_HISTORY);
 
   state.esp32Status.camera.connected = true;
   state.esp32Status.camera.lastSeen = new Date().toISOString();
@@ -46,6 +57,8 @@ function handleObjectDetection(state, payload) {
     description_kz: detection.description_kz,
     objects: detection.objects,
     confidence: detection.confidence,
+    capture_id: detection.capture_id,
+    stage: detection.stage,
     count: detection.objects.length,
     timestamp: detection.timestamp
   });
@@ -56,6 +69,79 @@ function handleObjectDetection(state, payload) {
   });
 }
 
+// Reconstrói o estado de um stream de deltas. Retorna status ok/duplicate/gap; em gap,
+// `expected` é a próxima seq esperada (null se o stream é desconhecido)
+function applyDetectionDelta(state, message) {
+  const { stream, seq, kind } = message;
+  const streams = state.detectionStreams;
+  const previous = streams.get(stream);
+
+  if (kind === 'snapshot') {
+    const current = {
+      seq,
+      description_pt: message.description_pt,
+      description_kz: message.description_kz || message.description_pt,
+      objects: Array.isArray(message.objects) ? [...message.objects] : [],
+      confidence: message.confidence
+    };
+    streams.delete(stream);
+    streams.set(stream, current);
+    if (streams.size > MAX_DETECTION_STREAMS) {
+      streams.delete(streams.keys().next().value);
+    }
+    return { status: 'ok', changed: true, current };
+  }
+
+  if (!previous) return { status: 'gap', expected: null };
+  if (seq <= previous.seq) return { status: 'duplicate', changed: false, current: previous };
+  if (seq !== previous.seq + 1) return { status: 'gap', expected: previous.seq + 1 };
+
+  previous.seq = seq;
+  if (message.confidence !== undefined) previous.confidence = message.confidence;
+  if (kind === 'same') return { status: 'ok', changed: false, current: previous };
+
+  const objects = [...previous.objects];
+  (message.removed || []).forEach((obj) => {
+    const index = objects.indexOf(obj);
+    if (index !== -1) objects.splice(index, 1);
+  });
+  objects.push(...(message.added || []));
+  previous.objects = objects;
+  if (message.description_pt !== undefined) previous.description_pt = message.description_pt;
+  if (message.description_kz !== undefined) previous.description_kz = message.description_kz;
+  return { status: 'ok', changed: true, current: previous };
+}
+
+// Ponto de entrada comum (HTTP e WebSocket): mensagens sem stream seguem o caminho antigo;
+// `same` só atualiza o status da câmera, sem rebroadcast para os apps
+function receiveDetection(state, message) {
+  if (!message.stream || !message.kind) {
+    handleObjectDetection(state, message);
+    return { status: 'ok', changed: true };
+  }
+
+  const result = applyDetectionDelta(state, message);
+  if (result.status !== 'ok') return result;
+
+  if (result.changed) {
+    const { current } = result;
+    handleObjectDetection(state, {
+      type: 'detection',
+      description_pt: current.description_pt,
+      description_kz: current.description_kz,
+      objects: [...current.objects],
+      confidence: current.confidence,
+      capture_id: message.capture_id,
+      stage: message.stage,
+      timestamp: message.timestamp
+    });
+  } else {
+    state.esp32Status.camera.connected = true;
+    state.esp32Status.camera.lastSeen = new Date().toISOString();
+  }
+  return result;
+}
+
 function handleSensorUpdate(state, payload) {
   state.esp32Status.sensor = {
     ...state.esp32Status.sensor,
@@ -190,6 +276,7 @@ function handleESP32PaiMessage(state, payload) {
   }
 }
 
+// Retorna o resultado de receiveDetection para mensagens `detection` (undefined nas demais)
 function handleESP32CamMessage(state, payload) {
   switch (payload.type) {
     case 'identify':
@@ -199,8 +286,7 @@ function handleESP32CamMessage(state, payload) {
       addSystemAlert(state, 'info', `ESP32-CAM conectado: ${payload.deviceId}`);
       break;
     case 'detection':
-      handleObjectDetection(state, payload);
-      break;
+      return receiveDetection(state, payload);
     case 'heartbeat':
       state.esp32Status.camera.connected = true;
       state.esp32Status.camera.lastSeen = new Date().toISOString();
@@ -228,6 +314,8 @@ function sendCommandToESP32(state, command) {
 module.exports = {
   addSystemAlert,
   handleObjectDetection,
+  applyDetectionDelta,
+  receiveDetection,
   handleSensorUpdate,
   handleModuleStatus,
   handleESP32Alert,
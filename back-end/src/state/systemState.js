@@ -10,6 +10,7 @@ const systemState = {
     camera: { connected: false, lastSeen: null, frameCount: null, rssi: null }
   },
   systemAlerts: [],
+  detectionStreams: new Map(),
   sseClients: new Set(),
   appClients: new Set(),
   esp32PaiConnection: null,
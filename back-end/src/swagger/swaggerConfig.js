@@ -139,9 +139,16 @@ const swaggerDefinition = {
           description_pt: { type: 'string' },
           description_kz: { type: 'string' },
           objects: { type: 'array', items: { type: 'string' } },
-          confidence: { type: 'number', minimum: 0, maximum: 1 }
+          confidence: { type: 'number', minimum: 0, maximum: 1 },
+          capture_id: { type: 'string' },
+          stage: { type: 'string', enum: ['partial', 'final'] },
+          stream: { type: 'string', description: 'Id do stream de deltas do publicador' },
+          seq: { type: 'integer', description: 'Número de sequência dentro do stream' },
+          kind: { type: 'string', enum: ['snapshot', 'delta', 'same'] },
+          added: { type: 'array', items: { type: 'string' }, description: 'Objetos que apareceram (delta)' },
+          removed: { type: 'array', items: { type: 'string' }, description: 'Objetos que sumiram (delta)' }
         },
-        required: ['description_pt']
+        description: 'description_pt é obrigatório, exceto em mensagens delta/same de um stream'
       }
     }
   },
@@ -266,13 +273,16 @@ const swaggerDefinition = {
                   properties: {
                     success: { type: 'boolean' },
                     message: { type: 'string' },
+                    seq: { type: 'integer' },
+                    delta: { type: 'boolean', description: 'Servidor aceita detecções por delta' },
                     receivedAt: { type: 'integer', format: 'int64' }
                   }
                 }
               }
             }
           },
-          400: { description: 'Payload inválido' }
+          400: { description: 'Payload inválido' },
+          409: { description: 'Delta fora de sequência para o stream; o publicador deve enviar um snapshot' }
         }
       }
     }
@@ -1,17 +1,53 @@
 const { z } = require('zod');
 
+// Campos do protocolo por delta: um stream numerado manda `snapshot` completo e depois só
+// `delta` (objetos adicionados/removidos, descrições alteradas) ou `same` (nada mudou)
+const deltaFields = {
+  stream: z.string().min(1).max(64).optional(),
+  seq: z.number().int().positive().optional(),
+  kind: z.enum(['snapshot', 'delta', 'same']).optional(),
+  added: z.array(z.string()).optional(),
+  removed: z.array(z.string()).optional()
+};
+
+function isDeltaMessage(payload) {
+  return Boolean(payload.stream && payload.kind && payload.kind !== 'snapshot');
+}
+
+// description_pt só pode faltar em `delta`/`same`; `kind` exige `stream` e `seq`
+function validateDetectionFields(payload, ctx) {
+  if (payload.kind && (!payload.stream || !payload.seq)) {
+    ctx.addIssue({
+      code: z.ZodIssueCode.custom,
+      path: ['seq'],
+      message: 'Mensagens com kind precisam de stream e seq'
+    });
+  }
+  if (!isDeltaMessage(payload) && !payload.description_pt) {
+    ctx.addIssue({
+      code: z.ZodIssueCode.custom,
+      path: ['description_pt'],
+      message: 'Descrição em português é obrigatória'
+    });
+  }
+}
+
 const detectionMessageSchema = z.object({
   type: z.literal('detection'),
-  description_pt: z.string().min(1, 'Descrição em português é obrigatória'),
+  description_pt: z.string().min(1, 'Descrição em português é obrigatória').optional(),
   description_kz: z.string().optional(),
-  objects: z.array(z.string()).optional().default([]),
+  objects: z.array(z.string()).optional(),
   confidence: z.number().min(0).max(1).optional(),
-  timestamp: z.number().optional()
+  capture_id: z.string().min(1).max(64).optional(),
+  stage: z.enum(['partial', 'final']).optional(),
+  timestamp: z.number().optional(),
+  ...deltaFields
 });
 
 const identifySchema = z.object({
   type: z.literal('identify'),
-  deviceId: z.string().min(1)
+  deviceId: z.string().min(1),
+  encodings: z.array(z.string()).optional()
 });
 
 const heartbeatSchema = z.object({
@@ -57,7 +93,11 @@ const esp32CamMessageSchema = z.discriminatedUnion('type', [
   identifySchema,
   detectionMessageSchema,
   heartbeatSchema
-]);
+]).superRefine((payload, ctx) => {
+  if (payload.type === 'detection') {
+    validateDetectionFields(payload, ctx);
+  }
+});
 
 const commandRequestSchema = z.object({
   command: z.enum(['test_motor', 'get_status', 'calibrate_sensor', 'reboot', 'set_vibration']),
@@ -65,17 +105,21 @@ const commandRequestSchema = z.object({
 });
 
 const sendDescriptionSchema = z.object({
-  description_pt: z.string().min(1),
+  description_pt: z.string().min(1).optional(),
   description_kz: z.string().optional(),
-  objects: z.array(z.string()).optional().default([]),
-  confidence: z.number().min(0).max(1).optional()
-});
+  objects: z.array(z.string()).optional(),
+  confidence: z.number().min(0).max(1).optional(),
+  capture_id: z.string().min(1).max(64).optional(),
+  stage: z.enum(['partial', 'final']).optional(),
+  ...deltaFields
+}).superRefine(validateDetectionFields);
 
 const detectionsHistoryQuerySchema = z.object({
   limit: z.coerce.number().int().min(1).max(200).optional()
 });
 
 module.exports = {
+  isDeltaMessage,
   detectionMessageSchema,
   identifySchema,
   heartbeatSchema,
@@ -109,7 +109,20 @@ function registerWebsocketRoutes(router, state) {
         return;
       }
 
-      handleESP32CamMessage(state, parsed.data);
+      if (parsed.data.type === 'identify' && parsed.data.encodings) {
+        // Cliente novo: este servidor só fala JSON, mas aceita detecções por delta
+        ws.send(JSON.stringify({ type: 'hello', encoding: 'json', delta: true }));
+      }
+
+      const result = handleESP32CamMessage(state, parsed.data);
+      if (result && result.status === 'gap') {
+        ws.send(JSON.stringify({
+          type: 'snapshot-request',
+          stream: parsed.data.stream,
+          expected: result.expected
+        }));
+        return;
+      }
       ws.send(JSON.stringify({ status: 'ok', receivedAt: Date.now() }));
     });
 
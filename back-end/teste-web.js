@@ -6,6 +6,16 @@ const swaggerJsdoc = require('swagger-jsdoc');
 const swaggerUi = require('swagger-ui-express');
 const WebSocket = require('ws');
 const { WebSocketExpress, Router } = require('websocket-express');
+const zlib = require('zlib');
+
+// MessagePack é opcional: sem o pacote o canal /esp32-cam negocia JSON
+let msgpack = null;
+try {
+  msgpack = require('@msgpack/msgpack');
+} catch (err) {
+  console.log('ℹ️ @msgpack/msgpack não instalado: /esp32-cam aceita apenas JSON');
+}
+const FRAME_FLAG_ZLIB = 0x01;
 
 const app = new WebSocketExpress();
 const router = new Router();
@@ -266,16 +276,42 @@ function handleESP32PaiMessage(message, ws) {
   ws.send(`Mensagem recebida: ${JSON.stringify(message)}`);
 }
 
-function handleESP32CamMessage(message, ws) {
+// Frame binário: 1 byte de flags (0x01 = zlib) + corpo MessagePack
+function decodeCamFrame(data) {
+  const buffer = Buffer.isBuffer(data) ? data : Buffer.from(data);
+  let body = buffer.subarray(1);
+  if (buffer[0] & FRAME_FLAG_ZLIB) {
+    body = zlib.inflateSync(body);
+  }
+  return msgpack.decode(body);
+}
+
+function negotiateCamEncoding(message) {
+  const encodings = Array.isArray(message.encodings) ? message.encodings : [];
+  return msgpack && encodings.includes('msgpack') ? 'msgpack' : 'json';
+}
+
+function handleESP32CamMessage(message, ws, session = {}) {
   switch (message.type) {
     case 'identify':
       console.log(`✅ ESP32-CAM identificado: ${message.deviceId}`);
       updateESP32Status('camera', true);
       addSystemAlert('info', `ESP32-CAM conectado: ${message.deviceId}`);
+      if (Array.isArray(message.encodings)) {
+        // Cliente novo: responde com a codificação escolhida e dispensa os acks textuais
+        session.encoding = negotiateCamEncoding(message);
+        session.negotiated = true;
+        ws.send(JSON.stringify({ type: 'hello', encoding: session.encoding, compression: 'zlib', delta: true }));
+        return;
+      }
       break;
-    case 'detection':
-      handleObjectDetection(message);
+    case 'detection': {
+      const result = receiveDetection(message);
+      if (result.status === 'gap') {
+        ws.send(JSON.stringify({ type: 'snapshot-request', stream: message.stream, expected: result.expected }));
+      }
       break;
+    }
     case 'heartbeat':
       updateESP32Status('camera', true);
       esp32Status.camera.lastUpdate = Date.now();
@@ -284,11 +320,104 @@ function handleESP32CamMessage(message, ws) {
       console.log(`⚠️ Tipo de mensagem desconhecido: ${message.type}`);
   }
 
-  ws.send(`Mensagem recebida: ${JSON.stringify(message)}`);
+  if (!session.negotiated) {
+    ws.send(`Mensagem recebida: ${JSON.stringify(message)}`);
+  }
+}
+
+// ===== DETECÇÕES POR DELTA =====
+// Publicadores que mandam `stream` + `seq` enviam um snapshot completo e depois só o que
+// mudou (`delta`: objetos adicionados/removidos e descrições alteradas) ou `same` (nada
+// mudou). O estado de cada stream é reconstruído aqui; um buraco na sequência pede snapshot.
+const MAX_DETECTION_STREAMS = 32;
+const detectionStreams = new Map();
+
+function applyDetectionDelta(message) {
+  const { stream, seq, kind } = message;
+  const previous = detectionStreams.get(stream);
+
+  if (kind === 'snapshot') {
+    const state = {
+      seq,
+      description_pt: message.description_pt,
+      description_kz: message.description_kz || message.description_pt,
+      objects: Array.isArray(message.objects) ? [...message.objects] : [],
+      confidence: message.confidence
+    };
+    detectionStreams.delete(stream);
+    detectionStreams.set(stream, state);
+    if (detectionStreams.size > MAX_DETECTION_STREAMS) {
+      detectionStreams.delete(detectionStreams.keys().next().value);
+    }
+    return { status: 'ok', changed: true, state };
+  }
+
+  if (!previous) return { status: 'gap', expected: null };
+  if (seq <= previous.seq) return { status: 'duplicate', changed: false, state: previous };
+  if (seq !== previous.seq + 1) return { status: 'gap', expected: previous.seq + 1 };
+
+  previous.seq = seq;
+  if (message.confidence !== undefined) previous.confidence = message.confidence;
+  if (kind === 'same') return { status: 'ok', changed: false, state: previous };
+
+  const objects = [...previous.objects];
+  (message.removed || []).forEach((obj) => {
+    const index = objects.indexOf(obj);
+    if (index !== -1) objects.splice(index, 1);
+  });
+  objects.push(...(message.added || []));
+  previous.objects = objects;
+  if (message.description_pt !== undefined) previous.description_pt = message.description_pt;
+  if (message.description_kz !== undefined) previous.description_kz = message.description_kz;
+  return { status: 'ok', changed: true, state: previous };
+}
+
+// Ponto de entrada comum (HTTP e WebSocket): mensagens sem stream seguem o caminho antigo;
+// `same` só atualiza o status da câmera, sem rebroadcast para os apps
+function receiveDetection(message) {
+  if (!message.stream || !message.kind) {
+    handleObjectDetection(message);
+    return { status: 'ok', changed: true };
+  }
+
+  const result = applyDetectionDelta(message);
+  if (result.status !== 'ok') return result;
+
+  if (result.changed) {
+    const { state } = result;
+    handleObjectDetection({
+      type: 'detection',
+      description_pt: state.description_pt,
+      description_kz: state.description_kz,
+      objects: [...state.objects],
+      confidence: state.confidence,
+      capture_id: message.capture_id,
+      stage: message.stage,
+      timestamp: message.timestamp
+    });
+  } else {
+    updateESP32Status('camera', true);
+    esp32Status.camera.lastUpdate = Date.now();
+  }
+  return result;
+}
+
+// Uma captura pode chegar em duas etapas (legenda parcial + tradução final) com o mesmo
+// capture_id: a segunda substitui a primeira no histórico em vez de duplicá-la
+function upsertDetection(list, detection, maxLength) {
+  if (detection.capture_id) {
+    const index = list.findIndex(item => item.capture_id === detection.capture_id);
+    if (index !== -1) {
+      list[index] = detection;
+      return;
+    }
+  }
+  list.push(detection);
+  if (list.length > maxLength) list.shift();
 }
 
 function handleObjectDetection(message) {
-  const { description_pt, description_kz, objects, confidence, timestamp } = message;
+  const { description_pt, description_kz, objects, confidence, timestamp, capture_id, stage } = message;
 
   console.log('\n╔════════════════════════════════════════╗');
   console.log('║  🎯 DETECÇÃO DE OBJETOS               ║');
@@ -309,21 +438,22 @@ function handleObjectDetection(message) {
     description_kz,
     objects: objects || [],
     confidence,
+    capture_id: capture_id || null,
+    stage: stage || 'final',
     timestamp: timestamp || Date.now(),
     receivedAt: Date.now()
   };
 
-  lastDetections.push(detection);
-  if (lastDetections.length > 5) lastDetections.shift();
-
-  detectionHistory.push(detection);
-  if (detectionHistory.length > MAX_HISTORY) detectionHistory.shift();
+  upsertDetection(lastDetections, detection, 5);
+  upsertDetection(detectionHistory, detection, MAX_HISTORY);
 
   broadcastToSSEClients('detection', {
     description: description_pt,
     description_kz,
     objects: objects || [],
     confidence,
+    capture_id: detection.capture_id,
+    stage: detection.stage,
     count: objects ? objects.length : 0,
     timestamp: Date.now()
   });
@@ -657,6 +787,10 @@ router.ws('/esp32', async (req, res) => {
  *     summary: Canal WebSocket para o ESP32-CAM (detecção já processada)
  *     description: >-
  *       Recebe mensagens `identify`, `detection` e `heartbeat`. O corpo de `detection` segue o schema Detection.
+ *       Um `identify` com `encodings` (ex: `["msgpack", "json"]`) recebe `{"type":"hello","encoding":...,"delta":true}`
+ *       (`delta: true` anuncia suporte a detecções por delta com `stream`/`seq`);
+ *       com `msgpack` as mensagens seguintes chegam como frames binários (1 byte de flags, 0x01 = zlib,
+ *       seguido do corpo MessagePack) e os acks textuais deixam de ser enviados.
  *     tags: [WebSockets]
  *     responses:
  *       101:
@@ -686,13 +820,23 @@ router.ws('/esp32-cam', async (req, res) => {
     ...getOperationModeState({ timestamp: Date.now(), source: 'server-bootstrap' })
   }));
 
-  ws.on('message', (message) => {
-    console.log('received: %s', message);
+  const session = { encoding: 'json', negotiated: false };
 
+  ws.on('message', (message, isBinary) => {
     try {
-      const msg = JSON.parse(message.toString());
-      console.log(`📥 ESP32-CAM enviou (${msg.type}):`, msg);
-      handleESP32CamMessage(msg, ws);
+      let msg;
+      if (isBinary) {
+        if (!msgpack) {
+          console.error('❌ Frame binário recebido sem suporte a MessagePack');
+          return;
+        }
+        msg = decodeCamFrame(message);
+      } else {
+        console.log('received: %s', message);
+        msg = JSON.parse(message.toString());
+        console.log(`📥 ESP32-CAM enviou (${msg.type}):`, msg);
+      }
+      handleESP32CamMessage(msg, ws, session);
     } catch (err) {
       console.error('❌ Erro ao processar mensagem ESP32-CAM:', err);
     }
@@ -741,6 +885,8 @@ const swaggerOptions = {
               items: { type: 'string' }
             },
             confidence: { type: 'number', format: 'float', nullable: true },
+            capture_id: { type: 'string', nullable: true, description: 'Identificador da captura' },
+            stage: { type: 'string', enum: ['partial', 'final'], description: 'Etapa da descrição' },
             timestamp: { type: 'integer', format: 'int64', description: 'Timestamp informado pelo ESP32-CAM (ms)' },
             receivedAt: { type: 'integer', format: 'int64', description: 'Timestamp em que o servidor recebeu a mensagem', nullable: true }
           },
@@ -942,12 +1088,19 @@ const swaggerOptions = {
         },
         DescriptionRequest: {
           type: 'object',
-          required: ['description_pt'],
+          description: 'description_pt é obrigatório, exceto em mensagens kind=delta/same de um stream',
           properties: {
             description_pt: { type: 'string' },
             description_kz: { type: 'string', nullable: true },
             objects: { type: 'array', items: { type: 'string' } },
-            confidence: { type: 'number', format: 'float', nullable: true }
+            confidence: { type: 'number', format: 'float', nullable: true },
+            capture_id: { type: 'string', nullable: true, description: 'Identificador da captura (etapas parcial e final compartilham o mesmo)' },
+            stage: { type: 'string', enum: ['partial', 'final'], nullable: true, description: 'partial = legenda sem tradução; final = tradução pronta' },
+            stream: { type: 'string', nullable: true, description: 'Identificador do publicador para envio por delta' },
+            seq: { type: 'integer', nullable: true, description: 'Número de sequência dentro do stream' },
+            kind: { type: 'string', enum: ['snapshot', 'delta', 'same'], nullable: true },
+            added: { type: 'array', items: { type: 'string' }, nullable: true, description: 'Objetos que apareceram (kind=delta)' },
+            removed: { type: 'array', items: { type: 'string' }, nullable: true, description: 'Objetos que sumiram (kind=delta)' }
           }
         },
         SSEEvent: {
@@ -1274,7 +1427,7 @@ app.get('/api/detections/history', (req, res) => {
  *     tags: [Streams]
  *     responses:
  *       200:
- *         description: Fluxo contínuo SSE contendo eventos `detection`, `sensor-update`, `mode-change`, `systems-health`, `system-alert` e `ping`.
+ *         description: Fluxo contínuo SSE contendo eventos `detection`, `sensor-update`, `mode-change`, `capture-request`, `systems-health`, `system-alert` e `ping`.
  *         content:
  *           text/event-stream:
  *             schema:
@@ -1509,12 +1662,34 @@ app.post('/api/esp32/command', (req, res) => {
  *             $ref: '#/components/schemas/DescriptionRequest'
  *     responses:
  *       200:
- *         description: Descrição aceita e distribuída via SSE/WebSocket.
+ *         description: Descrição aceita e distribuída via SSE/WebSocket. `delta: true` na resposta anuncia suporte a detecções por delta.
  *       400:
  *         description: Campo description_pt ausente.
+ *       409:
+ *         description: Delta fora de sequência para o stream; o publicador deve enviar um snapshot.
  */
 app.post('/api/esp32-cam/send-description', (req, res) => {
-  const { description_pt, description_kz, objects, confidence } = req.body;
+  const { description_pt, description_kz, objects, confidence, capture_id, stage, stream, seq, kind } = req.body;
+
+  if (stream && kind && kind !== 'snapshot') {
+    const result = receiveDetection({ type: 'detection', ...req.body, timestamp: Date.now() });
+    if (result.status === 'gap') {
+      return res.status(409).json({
+        success: false,
+        snapshot_required: true,
+        stream,
+        expected: result.expected,
+        message: 'Sequência fora de ordem: envie um snapshot'
+      });
+    }
+    return res.json({
+      success: true,
+      message: result.changed ? 'Descrição recebida e distribuída' : 'Sem mudança',
+      seq,
+      delta: true,
+      receivedAt: Date.now()
+    });
+  }
 
   if (!description_pt) {
     return res.status(400).json({
@@ -1523,18 +1698,25 @@ app.post('/api/esp32-cam/send-description', (req, res) => {
     });
   }
 
-  handleObjectDetection({
+  receiveDetection({
     type: 'detection',
     description_pt,
     description_kz: description_kz || description_pt,
     objects: objects || [],
     confidence: confidence || 0,
+    capture_id,
+    stage,
+    stream,
+    seq,
+    kind,
     timestamp: Date.now()
   });
 
   res.json({
     success: true,
     message: 'Descrição recebida e distribuída',
+    seq,
+    delta: true,
     receivedAt: Date.now()
   });
 });
@@ -1551,11 +1733,16 @@ app.post('/api/esp32-cam/send-description', (req, res) => {
  *         description: Sinal de captura enviado
  */
 app.post('/api/esp32-cam/capture-now', (req, res) => {
-  // Apenas retorna OK - o script Python verifica periodicamente este endpoint
-  // ou podemos usar uma flag global
+  // Scripts conectados ao SSE recebem o pedido na hora; a flag global continua
+  // para os que ainda consultam /api/esp32-cam/capture-status
   global.manualCaptureRequested = true;
   global.manualCaptureTimestamp = Date.now();
 
+  broadcastToSSEClients('capture-request', {
+    timestamp: global.manualCaptureTimestamp,
+    mode: operationMode
+  });
+
   console.log('📸 Captura manual solicitada via API');
 
   res.json({
@@ -1,20 +1,26 @@
 import cv2
 import numpy as np
 import requests
-import tensorflow as tf
 import time
 import os
+from utils.tracker import ArrayTracker
+from utils.motion import MotionVerifier
+from utils.detection_schedule import DetectionScheduler, FlowPropagator
+from utils.yolo_backend import TFLiteDetector
+from utils.letterbox import LetterboxInput
+from utils.yolo_decode import YoloDecoder
 
 URL = 'http://192.168.100.57:81/stream'
 
 TFLITE_MODEL = 'tflite_learn_810340_10.tflite'
-tflite_interpreter = tf.lite.Interpreter(model_path=TFLITE_MODEL)
-tflite_interpreter.allocate_tensors()
-t_in = tflite_interpreter.get_input_details()[0]
-t_out = tflite_interpreter.get_output_details()[0]
-IN_H, IN_W = t_in['shape'][1], t_in['shape'][2]
-in_scale, in_zero = t_in.get('quantization', (1.0, 0))
-out_scale, out_zero = t_out.get('quantization', (1.0, 0))
+NUM_THREADS = None  # None = número de CPUs
+detector = TFLiteDetector(TFLITE_MODEL, num_threads=NUM_THREADS)
+print(f"Detector: {detector.describe()}")
+t_in = detector.input_details
+t_out = detector.output_details
+IN_H, IN_W = detector.input_height, detector.input_width
+letterbox = LetterboxInput.from_detector(detector)
+out_scale, out_zero = detector.output_quantization
 
 COCO_LABELS = [
     'person','bicycle','car','motorcycle','airplane','bus','train','truck','boat','traffic light',
@@ -39,86 +45,37 @@ MAX_TRACK_AGE = 6
 VERIFIED_TTL = 6
 
 MOTION_FRAC_THRESH = 0.05
+MOTION_WIDTH = 160  # largura do frame usado pelo MOG2
 INSTANT_VERIFY_SCORE = 0.40
 
-def iou_xyxy(a, b):
-    xa1, ya1, xa2, ya2 = a
-    xb1, yb1, xb2, yb2 = b
-    xi1 = max(xa1, xb1); yi1 = max(ya1, yb1)
-    xi2 = min(xa2, xb2); yi2 = min(ya2, yb2)
-    if xi2 <= xi1 or yi2 <= yi1:
-        return 0.0
-    inter = (xi2 - xi1) * (yi2 - yi1)
-    area_a = max(0, xa2 - xa1) * max(0, ya2 - ya1)
-    area_b = max(0, xb2 - xb1) * max(0, yb2 - yb1)
-    union = area_a + area_b - inter
-    return inter / union if union > 0 else 0.0
-
-class DetectionTracker:
-    def __init__(self):
-        self.tracks = []
-
-    def update(self, candidates):
-        for t in self.tracks:
-            t['age'] += 1
-            t['verified_ttl'] = max(0, t.get('verified_ttl', 0) - 1)
-
-        for c in candidates:
-            best = None; best_iou = 0.0
-            for t in self.tracks:
-                if t['cls'] != c['cls']:
-                    continue
-                i = iou_xyxy(t['box'], c['box'])
-                if i > best_iou:
-                    best_iou = i; best = t
-            if best and best_iou >= MATCH_IOU:
-                best['age'] = 0
-                best['hits'] += 1
-                best['score'] = (best['score'] * 0.6) + (c['score'] * 0.4)
-                bb = best['box']; cb = c['box']
-                best['box'] = [(bb[i] + cb[i]) / 2.0 for i in range(4)]
-                if c.get('verified_now', False):
-                    best['verified_ttl'] = VERIFIED_TTL
-            else:
-                self.tracks.append({
-                    'cls': c['cls'],
-                    'box': c['box'],
-                    'score': c['score'],
-                    'hits': 1,
-                    'age': 0,
-                    'verified_ttl': VERIFIED_TTL if c.get('verified_now', False) else 0
-                })
-
-        self.tracks = [t for t in self.tracks if t['age'] <= MAX_TRACK_AGE]
-
-        confirmed = []
-        for t in self.tracks:
-            bx = t['box']
-            box_area = max(0, bx[2] - bx[0]) * max(0, bx[3] - bx[1])
-            if box_area < MIN_BOX_AREA_RATIO:
-                continue
-            cond_persistent = (t['hits'] >= MIN_PERSISTENCE_FRAMES)
-            cond_score = (t['score'] >= TRACKER_MIN_AVG_SCORE)
-            cond_verified = (t.get('verified_ttl', 0) > 0)
-            if cond_persistent or cond_score or cond_verified:
-                confirmed.append(t)
-        return confirmed
-
-def xywh2xyxy(x):
-    y = np.copy(x)
-    y[..., 0] = x[..., 0] - x[..., 2] / 2.0
-    y[..., 1] = x[..., 1] - x[..., 3] / 2.0
-    y[..., 2] = x[..., 0] + x[..., 2] / 2.0
-    y[..., 3] = x[..., 1] + x[..., 3] / 2.0
-    return y
-
-def do_nms(boxes, scores, iou_threshold=IOU_THRESHOLD, max_output=50):
-    if len(boxes) == 0:
-        return np.array([], dtype=np.int32)
-    boxes_tf = tf.convert_to_tensor(boxes, dtype=tf.float32)
-    scores_tf = tf.convert_to_tensor(scores, dtype=tf.float32)
-    idx = tf.image.non_max_suppression(boxes_tf, scores_tf, max_output, iou_threshold=iou_threshold)
-    return idx.numpy()
+# Limiar por classe ({'person': 0.3}) e classes ignoradas (['tie', 'frisbee'])
+CLASS_THRESHOLDS = {}
+IGNORE_CLASSES = []
+
+# Agendamento: detector completo a cada N frames (N adaptado à latência), fluxo óptico no meio
+SCHEDULE_DETECTION = True
+FRAME_BUDGET_MS = 33.0
+MAX_DETECT_INTERVAL = 8
+SCENE_MOTION_THRESH = 0.25
+
+def draw_tracks(display, confirmed, w_orig, h_orig):
+    for t in confirmed:
+        cls = int(t['cls']); score = float(t['score'])
+        box = t['box']
+        x1 = int(max(0, round(box[0] * w_orig))); y1 = int(max(0, round(box[1] * h_orig)))
+        x2 = int(min(w_orig-1, round(box[2] * w_orig))); y2 = int(min(h_orig-1, round(box[3] * h_orig)))
+
+        box_area = max(0, (box[2]-box[0])) * max(0, (box[3]-box[1]))
+        if box_area < MIN_BOX_AREA_RATIO:
+            continue
+
+        label_name = COCO_LABELS[cls] if cls < len(COCO_LABELS) else f"cls{cls}"
+        label = f"{label_name} {score:.2f} H{t['hits']} A{t['age']}"
+
+        color = (0, 255, 0) if t.get('verified_ttl', 0) > 0 else (255, 0, 0)
+
+        cv2.rectangle(display, (x1,y1), (x2,y2), color, 2)
+        cv2.putText(display, label, (x1, max(15,y1-5)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
 
 def connect_stream(url, timeout=5):
     try:
@@ -137,8 +94,16 @@ results_dir = "resultados"
 os.makedirs(results_dir, exist_ok=True)
 capture_count = 0
 
-tracker = DetectionTracker()
-bg_sub = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=25, detectShadows=False)
+tracker = ArrayTracker(match_iou=MATCH_IOU, max_age=MAX_TRACK_AGE, verified_ttl=VERIFIED_TTL,
+                       min_hits=MIN_PERSISTENCE_FRAMES, min_avg_score=TRACKER_MIN_AVG_SCORE,
+                       min_box_area=MIN_BOX_AREA_RATIO)
+motion = MotionVerifier(width=MOTION_WIDTH, history=200, var_threshold=25)
+scheduler = DetectionScheduler(frame_budget_ms=FRAME_BUDGET_MS, max_interval=MAX_DETECT_INTERVAL,
+                               motion_threshold=SCENE_MOTION_THRESH)
+flow = FlowPropagator()
+decoder = YoloDecoder(COCO_LABELS, conf_threshold=CONF_THRESHOLD, iou_threshold=IOU_THRESHOLD,
+                      class_thresholds=CLASS_THRESHOLDS, deny=IGNORE_CLASSES,
+                      output_quantization=detector.output_quantization)
 
 while True:
     resp = connect_stream(URL)
@@ -191,22 +156,26 @@ while True:
             display = frame.copy()
             h_orig, w_orig = frame.shape[:2]
 
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            resized = cv2.resize(frame_rgb, (IN_W, IN_H))
-            input_data = np.expand_dims(resized, axis=0)
+            motion.apply(frame)
+            if SCHEDULE_DETECTION and not scheduler.should_detect(motion.global_fraction()):
+                # Frame intermediário: só propaga os tracks com fluxo óptico
+                tracker.set_boxes(flow.propagate(frame, tracker.boxes))
+                draw_tracks(display, tracker.to_dicts(tracker.confirmed_mask()), w_orig, h_orig)
+                cv2.putText(display, f"flow | detect a cada {scheduler.interval}", (10, h_orig - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                cv2.imshow("Stream Seguro", display)
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    resp.close()
+                    cv2.destroyAllWindows()
+                    raise SystemExit()
+                continue
+            flow.reset(frame)
 
-            if t_in['dtype'] == np.uint8:
-                if in_scale != 0:
-                    input_data = (input_data / in_scale + in_zero).astype(np.uint8)
-                else:
-                    input_data = input_data.astype(np.uint8)
-            else:
-                input_data = (np.float32(input_data) - 127.5) / 127.5
+            input_data = letterbox(frame)
 
             try:
-                tflite_interpreter.set_tensor(t_in['index'], input_data)
-                tflite_interpreter.invoke()
-                output = tflite_interpreter.get_tensor(t_out['index'])
+                output = detector.invoke(input_data)
+                scheduler.record_latency(detector.last_latency_ms)
             except Exception as e:
                 cv2.putText(display, f"Infer err", (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,0,255),2)
                 print("Erro na inferência:", e)
@@ -215,89 +184,38 @@ while True:
                     break
                 continue
 
-            if t_out['dtype'] == np.uint8:
-                if out_scale != 0:
-                    output = (output.astype(np.float32) - out_zero) * out_scale
-                else:
-                    output = output.astype(np.float32)
-            else:
-                output = output.astype(np.float32)
-
             if output.ndim == 2 and output.shape[1] > 1 and output.shape[0] == 1:
-                probs = output[0]
+                probs = output[0].astype(np.float32)
+                if t_out['dtype'] == np.uint8 and out_scale != 0:
+                    probs = (probs - out_zero) * out_scale
                 top_idx = int(np.argmax(probs))
                 top_score = float(probs[top_idx])
                 label_name = COCO_LABELS[top_idx] if top_idx < len(COCO_LABELS) else f"class{top_idx}"
                 text = f"{label_name}: {top_score:.2f}"
                 cv2.putText(display, text, (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,0),2)
             else:
-                preds = output[0] if output.ndim == 3 else output
-                if preds.ndim == 2 and preds.shape[1] >= 6:
-                    obj_conf = preds[:,4]
-                    mask_obj = obj_conf > CONF_THRESHOLD
-                    preds = preds[mask_obj]
-
-                    if preds.shape[0] == 0:
-                        cv2.putText(display, "Nenhuma detec > conf", (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,255,255),2)
-                    else:
-                        class_probs = preds[:,5:]
-                        class_ids = np.argmax(class_probs, axis=1)
-                        class_scores = np.max(class_probs, axis=1)
-                        scores = preds[:,4] * class_scores
-
-                        keep = scores > CONF_THRESHOLD
-                        preds = preds[keep]
-                        scores = scores[keep]
-                        class_ids = class_ids[keep]
-
-                        if preds.shape[0] == 0:
-                            pass
-                        else:
-                            boxes_xywh = preds[:,:4]
-                            boxes_xyxy = xywh2xyxy(boxes_xywh)
-                            boxes_nms = np.stack([boxes_xyxy[:,1], boxes_xyxy[:,0], boxes_xyxy[:,3], boxes_xyxy[:,2]], axis=1)
-                            keep_idx = do_nms(boxes_nms, scores, IOU_THRESHOLD, max_output=50)
-
-                            candidates = []
-                            fg_mask = bg_sub.apply(frame)
-                            for i in keep_idx:
-                                x1n, y1n, x2n, y2n = boxes_xyxy[i]
-                                cls = int(class_ids[i]); score = float(scores[i])
-                                x1p = int(max(0, round(x1n * w_orig))); y1p = int(max(0, round(y1n * h_orig)))
-                                x2p = int(min(w_orig-1, round(x2n * w_orig))); y2p = int(min(h_orig-1, round(y2n * h_orig)))
-                                if x2p <= x1p or y2p <= y1p:
-                                    continue
-                                crop_mask = fg_mask[y1p:y2p, x1p:x2p]
-                                motion_frac = float(np.count_nonzero(crop_mask)) / (max(1, crop_mask.size))
-                                
-                                verified_now = False
-                                if score >= INSTANT_VERIFY_SCORE:
-                                    verified_now = True
-                                elif motion_frac >= MOTION_FRAC_THRESH and score >= CONF_THRESHOLD:
-                                    verified_now = True
-
-                                candidates.append({'cls': cls, 'box': [x1n, y1n, x2n, y2n], 'score': score, 'verified_now': verified_now})
-
-                            confirmed = tracker.update(candidates)
-
-                            for t in confirmed:
-                                cls = int(t['cls']); score = float(t['score'])
-                                box = t['box']
-                                x1 = int(max(0, round(box[0] * w_orig))); y1 = int(max(0, round(box[1] * h_orig)))
-                                x2 = int(min(w_orig-1, round(box[2] * w_orig))); y2 = int(min(h_orig-1, round(box[3] * h_orig)))
-                                
-                                box_area = max(0, (box[2]-box[0])) * max(0, (box[3]-box[1]))
-                                if box_area < MIN_BOX_AREA_RATIO:
-                                    continue
-                                
-                                label_name = COCO_LABELS[cls] if cls < len(COCO_LABELS) else f"cls{cls}"
-                                label = f"{label_name} {score:.2f} H{t['hits']} A{t['age']}"
-                                
-                                color = (0, 255, 0) if t.get('verified_ttl', 0) > 0 else (255, 0, 0)
-                                
-                                cv2.rectangle(display, (x1,y1), (x2,y2), color, 2)
-                                cv2.putText(display, label, (x1, max(15,y1-5)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-
+                dets = decoder.decode(output, letterbox)
+                if dets.scores.size == 0:
+                    cv2.putText(display, "Nenhuma detec > conf", (10,30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,255,255),2)
+                else:
+                    # Descarta caixas que viram vazias em pixels (mesmo critério de antes)
+                    x1p = np.clip(np.round(dets.boxes[:, 0] * w_orig), 0, None)
+                    y1p = np.clip(np.round(dets.boxes[:, 1] * h_orig), 0, None)
+                    x2p = np.clip(np.round(dets.boxes[:, 2] * w_orig), None, w_orig - 1)
+                    y2p = np.clip(np.round(dets.boxes[:, 3] * h_orig), None, h_orig - 1)
+                    valid = (x2p > x1p) & (y2p > y1p)
+                    boxes, scores, class_ids = dets.boxes[valid], dets.scores[valid], dets.class_ids[valid]
+
+                    motion_frac = motion.motion_fractions(boxes)
+                    verified = (scores >= INSTANT_VERIFY_SCORE) | (
+                        (motion_frac >= MOTION_FRAC_THRESH) & (scores >= CONF_THRESHOLD))
+
+                    confirmed_mask = tracker.update(boxes, class_ids, scores, verified)
+                    confirmed = tracker.to_dicts(confirmed_mask)
+                    draw_tracks(display, confirmed, w_orig, h_orig)
+
+            cv2.putText(display, f"invoke {detector.last_latency_ms:.1f}ms", (10, h_orig - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
             cv2.imshow("Stream Seguro", display)
             if cv2.waitKey(1) & 0xFF == ord("q"):
                 resp.close()
@@ -331,3 +249,4 @@ while True:
         continue
 
 cv2.destroyAllWindows()
+print("Latência do detector:", detector.latency_stats())
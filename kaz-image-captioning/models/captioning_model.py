@@ -45,7 +45,8 @@ class CaptioningModel(nn.Module):
                     eos_idx=eos_idx,
                     how_many_outputs=how_many_outputs_per_beam,
                     max_seq_len=beam_max_seq_len,
-                    sample_or_max=sample_or_max)
+                    sample_or_max=sample_or_max,
+                    cross_enc_output=kwargs.get('enc_output', None))
                 return out_classes, out_logprobs
             if mode == 'sampling':
                 how_many_outputs = kwargs.get('how_many_outputs', 1)
@@ -109,12 +110,15 @@ class CaptioningModel(nn.Module):
         return res_predicted_caption, res_predicted_caption_prob
 
     def beam_search(self, enc_input, enc_input_num_pads, sos_idx, eos_idx,
-                    beam_size=3, how_many_outputs=1, max_seq_len=20, sample_or_max='max',):
+                    beam_size=3, how_many_outputs=1, max_seq_len=20, sample_or_max='max',
+                    cross_enc_output=None):
         assert (how_many_outputs <= beam_size), "requested output per sequence must be lower than beam width"
         assert (sample_or_max == 'max' or sample_or_max == 'sample'), "argument must be chosen between \'max\' and \'sample\'"
         bs = enc_input.shape[0]
 
-        cross_enc_output = self.forward_enc(enc_input, enc_input_num_pads)
+        # cross_enc_output: optional precomputed forward_enc output (skips the encoder)
+        if cross_enc_output is None:
+            cross_enc_output = self.forward_enc(enc_input, enc_input_num_pads)
 
         # init: ------------------------------------------------------------------
         init_dec_class = torch.tensor([sos_idx] * bs).unsqueeze(1).type(torch.long).to(self.rank)
@@ -583,7 +583,10 @@ class SwinTransformer(nn.Module):
         self.pos_drop = nn.Dropout(p=drop_rate)
 
         # stochastic depth
-        dpr = [x.item() for x in torch.linspace(0, drop_path_rate, sum(depths))]  # stochastic depth decay rule
+        # stochastic depth decay rule (same values as torch.linspace, computed in python so that
+        # the model can also be built on the meta device)
+        num_blocks = sum(depths)
+        dpr = [drop_path_rate * i / (num_blocks - 1) if num_blocks > 1 else 0.0 for i in range(num_blocks)]
 
         # build layers
         self.layers = nn.ModuleList()
@@ -0,0 +1,145 @@
+"""
+Confere utils.nms.nms() contra tf.image.non_max_suppression.
+
+1. Casos montados à mão, com os índices esperados pela semântica do TF: empates de score
+   (menor índice primeiro), caixas degeneradas (área zero nunca suprimem nem são
+   suprimidas), cantos invertidos, IoU exatamente igual ao limiar (não suprime),
+   score_threshold estrito e max_output.
+2. Fixtures aleatórias com scores repetidos, caixas de área zero e cantos trocados,
+   comparadas com tf.image.non_max_suppression quando o TensorFlow está instalado. Sem
+   TensorFlow a comparação é com _tf_reference(), transcrição do laço guloso do kernel
+   de CPU do TF (non_max_suppression_op.cc), e o script avisa isso na saída.
+
+Uso:
+    cd kaz-image-captioning
+    PYTHONPATH=. python script/verificar_nms.py [--seeds 300]
+
+Sai com código 1 se algum caso divergir.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from utils.nms import nms
+
+try:
+    import tensorflow as tf
+except ImportError:
+    tf = None
+
+CASES = [
+    # (nome, caixas [y1, x1, y2, x2], scores, iou_threshold, max_output, score_threshold, esperado)
+    ('empate: caixas iguais, mesmo score', [[0, 0, 1, 1]] * 3, [0.9, 0.9, 0.9], 0.5, 10, None, [0]),
+    ('empate: caixas disjuntas, mesmo score', [[0, 0, 1, 1], [2, 2, 3, 3], [4, 4, 5, 5]],
+     [0.7, 0.7, 0.7], 0.5, 10, None, [0, 1, 2]),
+    ('empate: menor índice vence entre sobrepostas', [[4, 4, 5, 5], [0, 0, 1, 1], [0, 0, 1, 1.1]],
+     [0.5, 0.9, 0.9], 0.5, 10, None, [1, 0]),
+    ('degenerada: área zero não suprime', [[0, 0, 0, 0], [0, 0, 1, 1]], [0.9, 0.8], 0.5, 10, None, [0, 1]),
+    ('degenerada: duas iguais de área zero', [[0.5, 0.5, 0.5, 0.5]] * 2, [0.9, 0.8], 0.5, 10, None, [0, 1]),
+    ('degenerada: linha (altura zero)', [[0, 0, 1, 1], [0.5, 0, 0.5, 1]], [0.9, 0.8], 0.0, 10, None, [0, 1]),
+    ('cantos invertidos: mesma caixa', [[1, 1, 0, 0], [0, 0, 1, 1]], [0.9, 0.8], 0.5, 10, None, [0]),
+    ('cantos invertidos: só um eixo', [[0, 1, 1, 0], [0, 0, 1, 1], [3, 3, 2, 2]],
+     [0.8, 0.9, 0.7], 0.5, 10, None, [1, 2]),
+    ('IoU igual ao limiar não suprime', [[0, 0, 1, 1], [0, 0, 1, 0.5]], [0.9, 0.8], 0.5, 10, None, [0, 1]),
+    ('IoU acima do limiar suprime', [[0, 0, 1, 1], [0, 0, 1, 0.5]], [0.9, 0.8], 0.49, 10, None, [0]),
+    ('score_threshold é estrito', [[0, 0, 1, 1], [2, 2, 3, 3]], [0.9, 0.5], 0.5, 10, 0.5, [0]),
+    ('max_output corta', [[0, 0, 1, 1], [2, 2, 3, 3], [4, 4, 5, 5]], [0.3, 0.2, 0.1], 0.5, 2, None, [0, 1]),
+]
+
+
+def _tf_reference(boxes, scores, iou_threshold, max_output, score_threshold):
+    """Laço guloso do kernel de CPU do TF (fila por score, empate pelo menor índice)"""
+    boxes = np.asarray(boxes, dtype=np.float32)
+
+    def iou(i, j):
+        ymin_i, xmin_i = min(boxes[i, 0], boxes[i, 2]), min(boxes[i, 1], boxes[i, 3])
+        ymax_i, xmax_i = max(boxes[i, 0], boxes[i, 2]), max(boxes[i, 1], boxes[i, 3])
+        ymin_j, xmin_j = min(boxes[j, 0], boxes[j, 2]), min(boxes[j, 1], boxes[j, 3])
+        ymax_j, xmax_j = max(boxes[j, 0], boxes[j, 2]), max(boxes[j, 1], boxes[j, 3])
+        area_i = (ymax_i - ymin_i) * (xmax_i - xmin_i)
+        area_j = (ymax_j - ymin_j) * (xmax_j - xmin_j)
+        if area_i <= 0 or area_j <= 0:
+            return 0.0
+        inter = (max(min(ymax_i, ymax_j) - max(ymin_i, ymin_j), 0.0) *
+                 max(min(xmax_i, xmax_j) - max(xmin_i, xmin_j), 0.0))
+        return inter / (area_i + area_j - inter)
+
+    candidates = sorted((i for i in range(len(scores)) if scores[i] > score_threshold),
+                        key=lambda i: (-scores[i], i))
+    selected = []
+    for i in candidates:
+        if len(selected) >= max_output:
+            break
+        if all(iou(i, j) <= iou_threshold for j in selected):
+            selected.append(i)
+    return selected
+
+
+def expected_indices(boxes, scores, iou_threshold, max_output, score_threshold):
+    if tf is None:
+        return _tf_reference(boxes, scores, iou_threshold, max_output, score_threshold)
+    return tf.image.non_max_suppression(
+        np.asarray(boxes, dtype=np.float32), np.asarray(scores, dtype=np.float32), max_output,
+        iou_threshold=iou_threshold, score_threshold=score_threshold).numpy().tolist()
+
+
+def random_fixture(rng):
+    n = int(rng.integers(1, 60))
+    corners = rng.uniform(0, 1, size=(n, 2, 2)).astype(np.float32)
+    sizes = rng.uniform(0, 0.4, size=(n, 1, 2)).astype(np.float32)
+    boxes = np.concatenate([corners[:, 0], corners[:, 0] + sizes[:, 0]], axis=1)
+
+    # Cantos trocados, caixas de área zero e duplicadas
+    swap = rng.random(n) < 0.3
+    boxes[swap] = boxes[swap][:, [2, 3, 0, 1]]
+    flat = rng.random(n) < 0.1
+    boxes[flat, 2] = boxes[flat, 0]
+    dup = rng.random(n) < 0.1
+    boxes[dup] = boxes[0]
+
+    # Scores em poucos níveis para forçar empates
+    scores = (rng.integers(0, 8, size=n) / 8.0).astype(np.float32)
+    iou_threshold = float(rng.choice([0.0, 0.3, 0.45, 0.5, 0.7, 1.0]))
+    max_output = int(rng.integers(1, n + 2))
+    score_threshold = float(rng.choice([-np.inf, 0.0, 0.25]))
+    return boxes, scores, iou_threshold, max_output, score_threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Confere utils.nms.nms() contra o NMS do TensorFlow')
+    parser.add_argument('--seeds', type=int, default=300, help='Quantidade de fixtures aleatórias')
+    args = parser.parse_args()
+
+    reference = 'tf.image.non_max_suppression' if tf is not None else 'transcrição do kernel do TF'
+    if tf is None:
+        print("⚠️  TensorFlow não instalado: comparando com a transcrição do kernel do TF")
+    failures = 0
+
+    for name, boxes, scores, iou_threshold, max_output, score_threshold, expected in CASES:
+        score_threshold = float('-inf') if score_threshold is None else score_threshold
+        got = nms(boxes, scores, iou_threshold, max_output, score_threshold).tolist()
+        ref = expected_indices(boxes, scores, iou_threshold, max_output, score_threshold)
+        if got != expected or ref != expected:
+            failures += 1
+            print(f"❌ {name}: nms={got} {reference}={ref} esperado={expected}")
+
+    rng = np.random.default_rng(0)
+    for seed in range(args.seeds):
+        boxes, scores, iou_threshold, max_output, score_threshold = random_fixture(rng)
+        got = nms(boxes, scores, iou_threshold, max_output, score_threshold).tolist()
+        ref = expected_indices(boxes, scores, iou_threshold, max_output, score_threshold)
+        if got != ref:
+            failures += 1
+            print(f"❌ fixture {seed}: nms={got} {reference}={ref}")
+
+    total = len(CASES) + args.seeds
+    if failures:
+        print(f"❌ {failures}/{total} casos divergiram de {reference}")
+        return 1
+    print(f"✅ {total} casos conferem com {reference}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,13 +10,14 @@ from argparse import Namespace
 from PIL import Image as PIL_Image
 from models.End_ExpansionNet_v2 import End_ExpansionNet_v2
 from utils.language_utils import convert_vector_idx2word
+from utils.control_channel import ControlChannel
+from utils.backend_client import get_client
+from utils.translation import TranslationCache, create_service
 from time import time, sleep
 import os
 import argparse
-from googletrans import Translator
 import json
 from datetime import datetime
-import requests
 
 # ===== CONFIGURAÇÕES DO MODELO =====
 load_path = 'checkpoints/kaz_model.pth'
@@ -80,7 +81,9 @@ if model_available:
             'eos_idx': coco_tokens['word2idx_dict'][coco_tokens['eos_str']]
         }
 
-        translator = Translator()
+        # Backend por configuração: TRANSLATOR_BACKEND=googletrans|google|offline (fallback offline)
+        translator = create_service(os.environ.get('TRANSLATOR_BACKEND', 'googletrans'),
+                                    cache=TranslationCache('cache/translations.sqlite3'))
         
     except Exception as e:
         print(f"⚠️  Erro ao carregar modelo: {e}")
@@ -98,12 +101,7 @@ def cv2_to_pil(img):
 
 def translate_to_portuguese(text):
     """Traduz texto do cazaque para português"""
-    try:
-        translation = translator.translate(text, src='kk', dest='pt')
-        return translation.text
-    except Exception as e:
-        print(f"⚠️  Erro na tradução: {e}")
-        return text
+    return translator.translate(text)
 
 def generate_caption(img):
     """Gera legenda para uma imagem"""
@@ -159,11 +157,8 @@ def send_to_server(server_url, description_kz, description_pt, objects, confiden
     }
     
     try:
-        response = requests.post(
-            server_url,
-            json=payload,
-            timeout=5
-        )
+        # Conexão reaproveitada (keep-alive) entre os envios
+        response = get_client(server_url).send_description(payload, path=server_url)
         
         if response.status_code == 200:
             print(f"📤 ✅ Enviado: {description_pt[:50]}...")
@@ -175,62 +170,6 @@ def send_to_server(server_url, description_kz, description_pt, objects, confiden
         print(f"❌ Erro ao enviar: {e}")
         return False
 
-def get_operation_mode(base_url):
-    """Consulta o modo de operação atual do servidor"""
-    try:
-        # Remove /api/esp32-cam/send-description e adiciona /api/operation-mode
-        server_base = base_url.rsplit('/api/', 1)[0]
-        mode_url = f"{server_base}/api/operation-mode"
-        
-        print(f"🔍 Consultando modo em: {mode_url}")  # DEBUG
-        response = requests.get(mode_url, timeout=2)
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(f"📦 Resposta completa: {data}")  # DEBUG
-            
-            # Resposta tem estrutura: { state: { mode: "realtime" } }
-            if 'state' in data and 'mode' in data['state']:
-                mode = data['state']['mode']
-                print(f"✅ Modo recebido do servidor: {mode}")  # DEBUG
-                return mode
-            # Fallback: tentar pegar direto
-            elif 'mode' in data:
-                mode = data['mode']
-                print(f"✅ Modo recebido (direto): {mode}")  # DEBUG
-                return mode
-            else:
-                print(f"⚠️  Estrutura inesperada, usando modo padrão: realtime")
-                return 'realtime'
-        else:
-            print(f"⚠️  Erro {response.status_code}, usando modo padrão: realtime")  # DEBUG
-            return 'realtime'  # Padrão se falhar
-    except Exception as e:
-        print(f"⚠️  Erro ao consultar modo: {e}")
-        print(f"⚠️  Usando modo padrão: realtime")  # DEBUG
-        return 'realtime'  # Padrão se falhar
-
-def check_manual_capture_request(base_url):
-    """Verifica se há solicitação de captura manual pendente"""
-    try:
-        server_base = base_url.rsplit('/api/', 1)[0]
-        status_url = f"{server_base}/api/esp32-cam/capture-status"
-        
-        response = requests.get(status_url, timeout=2)
-        if response.status_code == 200:
-            data = response.json()
-            should_capture = data.get('shouldCapture', False)
-            timestamp = data.get('timestamp', 0)
-            
-            if should_capture:
-                print(f"✅ Captura manual solicitada! Timestamp: {timestamp}")  # DEBUG
-            
-            return should_capture, timestamp
-        else:
-            return False, 0
-    except Exception as e:
-        return False, 0
-
 def main_loop(esp32_url, server_url, interval, rotate):
     """Loop principal de captura e envio"""
     print(f"\n🎥 Conectando ao ESP32-CAM: {esp32_url}")
@@ -258,9 +197,10 @@ def main_loop(esp32_url, server_url, interval, rotate):
     print("Pressione Ctrl+C para parar\n")
     
     last_capture = 0
-    last_mode_check = 0
     current_mode = 'realtime'
-    last_manual_check = 0
+    
+    # Modo e pedidos de captura por push (SSE); sem push, o canal consulta a API
+    control = ControlChannel(server_url).start()
     
     try:
         while True:
@@ -283,17 +223,15 @@ def main_loop(esp32_url, server_url, interval, rotate):
             
             current_time = time()
             
-            # Verificar modo de operação a cada 2 segundos
-            if current_time - last_mode_check >= 2:
-                last_mode_check = current_time
-                new_mode = get_operation_mode(server_url)
-                if new_mode != current_mode:
-                    current_mode = new_mode
-                    print(f"\n🔄 Modo alterado: {current_mode.upper()}")
-                    if current_mode == 'manual':
-                        print("⏸️  Captura automática pausada. Aguardando comando manual...")
-                    else:
-                        print(f"▶️  Captura automática ativada (intervalo: {interval}s)")
+            # Modo de operação (push ou, sem push, consultado a cada 2 segundos)
+            new_mode = control.mode()
+            if new_mode and new_mode != current_mode:
+                current_mode = new_mode
+                print(f"\n🔄 Modo alterado: {current_mode.upper()}")
+                if current_mode == 'manual':
+                    print("⏸️  Captura automática pausada. Aguardando comando manual...")
+                else:
+                    print(f"▶️  Captura automática ativada (intervalo: {interval}s)")
             
             should_capture = False
             capture_reason = ""
@@ -304,14 +242,12 @@ def main_loop(esp32_url, server_url, interval, rotate):
                 capture_reason = "REALTIME"
                 last_capture = current_time
             
-            # MODO MANUAL: Verificar se há solicitação de captura a cada 0.5s
-            elif current_mode == 'manual' and current_time - last_manual_check >= 0.5:
-                last_manual_check = current_time
-                manual_requested, manual_timestamp = check_manual_capture_request(server_url)
-                if manual_requested:
-                    should_capture = True
-                    capture_reason = "MANUAL"
-                    last_capture = current_time
+            # MODO MANUAL: pedido de captura vindo do servidor
+            elif current_mode == 'manual' and control.capture_requested():
+                print("✅ Captura manual solicitada!")
+                should_capture = True
+                capture_reason = "MANUAL"
+                last_capture = current_time
             
             # Processar captura
             if should_capture:
@@ -334,14 +270,15 @@ def main_loop(esp32_url, server_url, interval, rotate):
                 
                 print(f"✅ Detecção #{detection_count} processada")
             
-            # Pequeno delay para não sobrecarregar
-            sleep(0.1)
+            # Pequeno delay para não sobrecarregar (um evento do servidor acorda antes)
+            control.wait(0.1)
             
     except KeyboardInterrupt:
         print("\n⚠️  Interrompido pelo usuário")
     except Exception as e:
         print(f"\n❌ Erro: {e}")
     finally:
+        control.close()
         cap.release()
         print("\n✅ Recursos liberados")
 
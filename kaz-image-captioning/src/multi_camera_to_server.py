@@ -0,0 +1,146 @@
+"""
+YOLO em várias câmeras no mesmo host com um único detector compartilhado.
+
+Cada fonte (--source, repetível: índice de webcam ou URL de stream do ESP32/celular) roda
+num thread próprio, com o seu LetterboxInput e o seu YoloDecoder. Os frames vão para um
+MicroBatcher, que junta o que chega dentro de --batch-window ms num único invoke() com
+batch N e devolve a saída de cada fonte. Um interpretador só (em vez de um por câmera)
+divide o custo fixo de cada invoke() entre as fontes e mantém os pesos quentes no cache.
+
+Cada câmera publica no servidor quando o conjunto de objetos muda, com source = rótulo
+da câmera. Modelos sem batch dinâmico caem sozinhos para batch 1 (ver MicroBatcher).
+
+Uso:
+    PYTHONPATH=. python src/multi_camera_to_server.py --source 0 \\
+        --source http://192.168.1.50:81/stream --server-url http://localhost:3000
+"""
+import argparse
+import threading
+from time import time
+
+from utils.backend_client import get_client
+from utils.camera_capture import FrameSource
+from utils.letterbox import LetterboxInput
+from utils.yolo_backend import MicroBatcher, TFLiteDetector
+from utils.yolo_decode import YoloDecoder
+from src.unified_camera_detection import (COCO_LABELS, CONF_THRESHOLD, IOU_THRESHOLD, TFLITE_MODEL,
+                                          get_label_pt)
+
+
+def parse_source(value):
+    """'0' -> 0 (webcam), qualquer outra coisa é URL"""
+    return int(value) if value.isdigit() else value
+
+
+def camera_loop(label, source, batcher, args, stop, stats):
+    cap = FrameSource(parse_source(source))
+    if not cap.isOpened():
+        print(f"❌ [{label}] Erro ao conectar à câmera: {source}")
+        return
+    print(f"📹 [{label}] Conectado: {source}")
+
+    # Letterbox e decoder por fonte: guardam a geometria do último frame dessa câmera
+    letterbox = LetterboxInput.from_detector(batcher.detector)
+    decoder = YoloDecoder(COCO_LABELS, conf_threshold=CONF_THRESHOLD, iou_threshold=IOU_THRESHOLD,
+                          output_quantization=batcher.detector.output_quantization)
+    client = None if args.no_send else get_client(args.server_url)
+    last_objects = None
+
+    try:
+        while not stop.is_set():
+            started = time()
+            ret, frame = cap.read()
+            if not ret:
+                print(f"⚠️  [{label}] Falha ao ler frame, tentando de novo")
+                stop.wait(1.0)
+                continue
+
+            try:
+                output = batcher.invoke(letterbox(frame), timeout=args.invoke_timeout)
+            except Exception as e:
+                print(f"⚠️  [{label}] Erro YOLO: {e}")
+                stop.wait(args.interval)
+                continue
+            dets = decoder.decode(output, letterbox=letterbox)
+            stats[label] = stats.get(label, 0) + 1
+
+            objects = sorted({get_label_pt(cls) for cls in dets.class_ids.tolist()})
+            if objects != last_objects:
+                last_objects = objects
+                print(f"🎯 [{label}] {', '.join(objects) if objects else 'nenhum objeto'}")
+                if client is not None:
+                    description = f"Detectado: {', '.join(objects)}" if objects else "Nenhum objeto detectado"
+                    payload = {
+                        "description_pt": description,
+                        "description_kz": description,
+                        "objects": objects,
+                        "confidence": round(float(dets.scores.max()), 3) if dets.scores.size else 0.0,
+                        "source": label
+                    }
+                    try:
+                        response = client.send_description(payload)
+                        if response.status_code != 200:
+                            print(f"❌ [{label}] Erro HTTP {response.status_code}")
+                    except Exception as e:
+                        print(f"❌ [{label}] Erro ao enviar: {e}")
+
+            stop.wait(max(0.0, args.interval - (time() - started)))
+    finally:
+        cap.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='YOLO em várias câmeras com detector compartilhado')
+    parser.add_argument('--source', action='append', required=True,
+                        help='Índice da webcam ou URL do stream (repita para cada câmera)')
+    parser.add_argument('--label', action='append', default=[],
+                        help='Rótulo de cada câmera, na ordem das --source (padrão: cam0, cam1, ...)')
+    parser.add_argument('--server-url', type=str, default='http://localhost:3000/api/esp32-cam/send-description',
+                        help='URL do servidor')
+    parser.add_argument('--no-send', action='store_true',
+                        help='Só detecta e imprime, sem publicar no servidor')
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help='Intervalo mínimo (s) entre detecções de cada câmera')
+    parser.add_argument('--max-batch', type=int, default=0,
+                        help='Tamanho máximo do batch (padrão: número de câmeras)')
+    parser.add_argument('--batch-window', type=float, default=5.0,
+                        help='Janela (ms) para juntar frames de câmeras diferentes num invoke()')
+    parser.add_argument('--yolo-threads', type=int, default=None,
+                        help='Threads do TFLite (padrão: número de CPUs)')
+    parser.add_argument('--invoke-timeout', type=float, default=5.0,
+                        help='Tempo máximo (s) de espera pelo resultado de um frame')
+    args = parser.parse_args()
+
+    labels = args.label + [f"cam{i}" for i in range(len(args.label), len(args.source))]
+
+    detector = TFLiteDetector(TFLITE_MODEL, num_threads=args.yolo_threads)
+    batcher = MicroBatcher(detector, max_batch=args.max_batch or len(args.source),
+                           window_ms=args.batch_window)
+    print(f"✅ YOLO compartilhado por {len(args.source)} câmera(s): {detector.describe()}")
+    print(f"📦 Micro-batching: até {batcher.max_batch} frames, janela {args.batch_window}ms\n")
+
+    stop = threading.Event()
+    stats = {}
+    threads = [threading.Thread(target=camera_loop, args=(label, source, batcher, args, stop, stats),
+                                name=f"camera-{label}", daemon=True)
+               for label, source in zip(labels, args.source)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while any(thread.is_alive() for thread in threads):
+            stop.wait(0.5)
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrompido pelo usuário")
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=args.invoke_timeout)
+        batcher.close()
+        print(f"📦 Batcher: {batcher.stats()}")
+        print(f"🎯 Latência YOLO: {detector.latency_stats()}")
+        print(f"📹 Frames por câmera: {stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,12 +11,12 @@ from argparse import Namespace
 from PIL import Image as PIL_Image
 from models.End_ExpansionNet_v2 import End_ExpansionNet_v2
 from utils.language_utils import convert_vector_idx2word
+from utils.translation import TranslationCache, create_service
+from utils.backend_client import get_client
 from time import time, sleep
 import os
 import argparse
-from googletrans import Translator
 import json
-import requests
 
 # Configurações do modelo
 load_path = 'checkpoints/kaz_model.pth'
@@ -80,16 +80,13 @@ beam_search_kwargs = {
     'eos_idx': coco_tokens['word2idx_dict'][coco_tokens['eos_str']]
 }
 
-translator = Translator()
+# Backend por configuração: TRANSLATOR_BACKEND=googletrans|google|offline (fallback offline)
+translator = create_service(os.environ.get('TRANSLATOR_BACKEND', 'googletrans'),
+                            cache=TranslationCache('cache/translations.sqlite3'))
 
 def translate_to_portuguese(text):
     """Traduz texto do cazaque para português"""
-    try:
-        translation = translator.translate(text, src='kk', dest='pt')
-        return translation.text
-    except Exception as e:
-        print(f"⚠️  Erro na tradução: {e}")
-        return text
+    return translator.translate(text)
 
 def cv2_to_pil(img):
     """Converte imagem OpenCV para PIL"""
@@ -136,7 +133,6 @@ def generate_caption(img, translate=True):
 def send_via_http(server_url, description_pt, description_kz, objects, confidence):
     """Envia descrição via HTTP POST"""
     try:
-        url = f"{server_url}/api/esp32-cam/send-description"
         data = {
             "description_pt": description_pt,
             "description_kz": description_kz,
@@ -144,7 +140,8 @@ def send_via_http(server_url, description_pt, description_kz, objects, confidenc
             "confidence": confidence
         }
         
-        response = requests.post(url, json=data, timeout=5)
+        # Conexão reaproveitada (keep-alive) entre os envios
+        response = get_client(server_url).send_description(data)
         
         if response.status_code == 200:
             print(f"✅ Enviado via HTTP: {response.json().get('message', 'OK')}")
@@ -0,0 +1,491 @@
+"""
+Servidor substituto do back-end Node.js para testes de ponta a ponta sem rede.
+
+Implementa só o que os scripts de captura usam, com as mesmas respostas do teste-web.js:
+
+  GET  /api/operation-mode              modo atual (state.mode)
+  POST /api/operation-mode              troca o modo ({"mode": "manual" | "realtime"})
+  GET  /api/esp32-cam/capture-status    flag de captura manual (limpa ao consultar)
+  POST /api/esp32-cam/capture-now       pede uma captura (flag + evento SSE)
+  POST /api/esp32-cam/send-description  recebe a detecção (payload completo ou delta com seq)
+  GET  /api/stream/events               SSE com 'mode-change', 'capture-request' e 'ping'
+
+Para medir o pipeline de forma reproduzível:
+
+  - --latency-ms/--jitter-ms atrasam todas as respostas; --error-rate responde
+    --error-status (503 por padrão) a uma fração dos POSTs de detecção, com --seed fixo;
+  - --script roda uma sequência de ações no tempo, ex: "0:manual,2:capture,10:realtime"
+    (segundos desde o início); --capture-every pede capturas periódicas;
+  - --record grava cada detecção recebida num JSONL com o horário de chegada, o estado
+    reconstruído do stream de deltas e o tempo desde o último pedido de captura;
+  - ao sair (Ctrl+C ou --duration) imprime contagem, vazão e latências.
+
+Não há WebSocket em /esp32-cam: o DetectionSocket do unified não conecta e as detecções
+seguem pelo POST HTTP, que é o caminho medido aqui.
+
+Uso:
+    PYTHONPATH=. python src/standin_backend.py --port 3000 --script "0:manual,3:capture" \\
+        --record results/standin.jsonl --duration 60
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep, time
+from urllib.parse import urlsplit
+
+MODES = ('realtime', 'manual')
+
+
+def parse_script(text):
+    """'0:manual,2:capture' -> [(0.0, 'manual'), (2.0, 'capture')] ordenado pelo tempo"""
+    steps = []
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        at, _, action = item.partition(':')
+        action = action.strip().lower()
+        if action not in MODES + ('capture',):
+            raise ValueError(f"Ação desconhecida no script: {item!r} (use {', '.join(MODES)} ou capture)")
+        steps.append((float(at), action))
+    return sorted(steps)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(values):
+    if not values:
+        return {}
+    return {'mean_ms': round(sum(values) / len(values), 1),
+            'p50_ms': round(percentile(values, 50), 1),
+            'p95_ms': round(percentile(values, 95), 1),
+            'max_ms': round(max(values), 1)}
+
+
+class StandinBackend:
+    """Estado do servidor: modo, captura manual, streams de delta, clientes SSE e gravação"""
+
+    def __init__(self, mode='realtime', latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 error_status=503, record_path=None, ping_interval=30.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.ping_interval = ping_interval
+        self.random = random.Random(seed)
+
+        self.started = time()
+        self.lock = threading.Lock()
+        self.mode = mode
+        self.mode_updated = self.started
+        self.capture_requested = False
+        self.capture_timestamp = 0
+        self.streams = {}
+        self.sse_clients = set()
+
+        self.received = 0
+        self.kinds = {}
+        self.errors_injected = 0
+        self.gaps = 0
+        self.captures = 0
+        self.arrivals = []
+        self.capture_latencies = []
+
+        self._record = None
+        if record_path:
+            os.makedirs(os.path.dirname(os.path.abspath(record_path)), exist_ok=True)
+            self._record = open(record_path, 'a', encoding='utf-8')
+
+    # ----- injeção de falhas -----
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self.lock:
+                jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+            sleep(max(0.0, self.latency_ms + jitter) / 1000.0)
+
+    def should_fail(self):
+        if self.error_rate <= 0:
+            return False
+        with self.lock:
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.errors_injected += 1
+        return fail
+
+    # ----- modo e captura -----
+
+    def mode_state(self):
+        return {'mode': self.mode, 'updatedAt': int(self.mode_updated * 1000),
+                'triggeredBy': 'standin', 'source': 'standin', 'timestamp': int(time() * 1000)}
+
+    def set_mode(self, mode, triggered_by='standin'):
+        if mode not in MODES:
+            return None
+        with self.lock:
+            changed = mode != self.mode
+            self.mode = mode
+            if changed:
+                self.mode_updated = time()
+        if changed:
+            print(f"🔧 Modo: {mode.upper()} ({triggered_by})")
+            self.broadcast('mode-change', self.mode_state())
+        return changed
+
+    def request_capture(self):
+        with self.lock:
+            self.capture_requested = True
+            self.capture_timestamp = int(time() * 1000)
+            self.captures += 1
+            timestamp = self.capture_timestamp
+        self.broadcast('capture-request', {'timestamp': timestamp, 'mode': self.mode})
+        return timestamp
+
+    def capture_status(self):
+        with self.lock:
+            should_capture = self.capture_requested
+            self.capture_requested = False
+            return {'shouldCapture': should_capture, 'timestamp': self.capture_timestamp,
+                    'mode': self.mode}
+
+    # ----- SSE -----
+
+    def broadcast(self, event, data):
+        with self.lock:
+            clients = list(self.sse_clients)
+        for client in clients:
+            client.put((event, data))
+
+    # ----- detecções -----
+
+    def apply(self, message):
+        """Mesma semântica do applyDetectionDelta do teste-web.js: (status, changed, estado, esperado)"""
+        stream, seq, kind = message.get('stream'), message.get('seq'), message.get('kind')
+        if not stream or not kind:
+            state = {'description_pt': message.get('description_pt'),
+                     'description_kz': message.get('description_kz') or message.get('description_pt'),
+                     'objects': list(message.get('objects') or [])}
+            return 'ok', True, state, None
+
+        with self.lock:
+            previous = self.streams.get(stream)
+            if kind == 'snapshot':
+                state = {'seq': seq,
+                         'description_pt': message.get('description_pt'),
+                         'description_kz': message.get('description_kz') or message.get('description_pt'),
+                         'objects': list(message.get('objects') or [])}
+                self.streams[stream] = state
+                return 'ok', True, dict(state), None
+            if previous is None:
+                return 'gap', False, None, None
+            if seq <= previous['seq']:
+                return 'duplicate', False, dict(previous), None
+            if seq != previous['seq'] + 1:
+                return 'gap', False, None, previous['seq'] + 1
+
+            previous['seq'] = seq
+            if kind == 'same':
+                return 'ok', False, dict(previous), None
+            objects = list(previous['objects'])
+            for obj in message.get('removed') or []:
+                if obj in objects:
+                    objects.remove(obj)
+            objects.extend(message.get('added') or [])
+            previous['objects'] = objects
+            for key in ('description_pt', 'description_kz'):
+                if key in message:
+                    previous[key] = message[key]
+            return 'ok', True, dict(previous), None
+
+    def record(self, message, status_code, status, state):
+        now = time()
+        with self.lock:
+            self.received += 1
+            kind = message.get('kind') or 'full'
+            self.kinds[kind] = self.kinds.get(kind, 0) + 1
+            if status == 'gap':
+                self.gaps += 1
+            since_capture = None
+            if self.capture_timestamp:
+                since_capture = round(now * 1000 - self.capture_timestamp, 1)
+            if status_code == 200:
+                # Só a primeira detecção aceita depois de cada pedido mede a latência da captura
+                if since_capture is not None and \
+                        (not self.arrivals or self.arrivals[-1] * 1000 < self.capture_timestamp):
+                    self.capture_latencies.append(since_capture)
+                self.arrivals.append(now)
+            entry = {
+                'received_at': round(now, 6),
+                'elapsed_s': round(now - self.started, 3),
+                'status': status_code,
+                'delta': status,
+                'mode': self.mode,
+                'since_capture_ms': since_capture,
+                'message': message,
+                'state': state
+            }
+            if self._record is not None:
+                self._record.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                self._record.flush()
+
+    def stats(self):
+        with self.lock:
+            arrivals = list(self.arrivals)
+            duration = time() - self.started
+            intervals = [(b - a) * 1000.0 for a, b in zip(arrivals, arrivals[1:])]
+            return {
+                'received': self.received,
+                'kinds': dict(self.kinds),
+                'errors_injected': self.errors_injected,
+                'gaps': self.gaps,
+                'captures': self.captures,
+                'duration_s': round(duration, 1),
+                'throughput_per_s': round(len(arrivals) / duration, 2) if duration > 0 else 0.0,
+                'interval': summarize(intervals),
+                'capture_latency': summarize(self.capture_latencies)
+            }
+
+    def close(self):
+        with self.lock:
+            clients = list(self.sse_clients)
+            if self._record is not None:
+                self._record.close()
+                self._record = None
+        for client in clients:
+            client.put(None)
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'StandinBackend/1.0'
+
+    @property
+    def backend(self):
+        return self.server.backend
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError:
+            return None
+        return body if isinstance(body, dict) else None
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == '/api/stream/events':
+            return self.stream_events()
+        self.backend.delay()
+        if path == '/api/operation-mode':
+            return self.send_json(200, {'success': True, 'state': self.backend.mode_state(),
+                                        'availableModes': list(MODES)})
+        if path == '/api/esp32-cam/capture-status':
+            return self.send_json(200, self.backend.capture_status())
+        self.send_json(404, {'success': False, 'message': 'Endpoint não existe no servidor substituto'})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self.read_json()
+        self.backend.delay()
+        if body is None:
+            return self.send_json(400, {'success': False, 'message': 'JSON inválido'})
+        if path == '/api/operation-mode':
+            changed = self.backend.set_mode(body.get('mode'), body.get('triggeredBy') or 'http-api')
+            if changed is None:
+                return self.send_json(400, {'success': False, 'error': 'Modo inválido',
+                                            'allowedModes': list(MODES)})
+            return self.send_json(200, {'success': True, 'changed': changed,
+                                        'state': self.backend.mode_state(), 'availableModes': list(MODES)})
+        if path == '/api/esp32-cam/capture-now':
+            timestamp = self.backend.request_capture()
+            print("📸 Captura manual solicitada via API")
+            return self.send_json(200, {'success': True, 'message': 'Sinal de captura manual enviado',
+                                        'timestamp': timestamp})
+        if path == '/api/esp32-cam/send-description':
+            return self.send_description(body)
+        self.send_json(404, {'success': False, 'message': 'Endpoint não existe no servidor substituto'})
+
+    def send_description(self, body):
+        backend = self.backend
+        if backend.should_fail():
+            backend.record(body, backend.error_status, 'error', None)
+            return self.send_json(backend.error_status, {'success': False, 'message': 'Falha injetada'})
+
+        delta = body.get('stream') and body.get('kind') and body.get('kind') != 'snapshot'
+        if not delta and not body.get('description_pt'):
+            backend.record(body, 400, 'invalid', None)
+            return self.send_json(400, {'success': False, 'message': 'Descrição em português é obrigatória'})
+
+        status, changed, state, expected = backend.apply(body)
+        if status == 'gap':
+            backend.record(body, 409, status, None)
+            return self.send_json(409, {'success': False, 'snapshot_required': True,
+                                        'stream': body.get('stream'), 'expected': expected,
+                                        'message': 'Sequência fora de ordem: envie um snapshot'})
+        backend.record(body, 200, status, state)
+        self.send_json(200, {'success': True,
+                             'message': 'Descrição recebida e distribuída' if changed else 'Sem mudança',
+                             'seq': body.get('seq'), 'delta': True, 'receivedAt': int(time() * 1000)})
+
+    def stream_events(self):
+        backend = self.backend
+        events = queue.Queue()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        with backend.lock:
+            backend.sse_clients.add(events)
+        try:
+            self.write_event('connected', {'message': 'Conectado ao servidor', 'timestamp': int(time() * 1000)})
+            self.write_event('mode-change', backend.mode_state())
+            while not self.server.stopping.is_set():
+                try:
+                    item = events.get(timeout=backend.ping_interval)
+                except queue.Empty:
+                    item = ('ping', {'timestamp': int(time() * 1000)})
+                if item is None:
+                    break
+                self.write_event(*item)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with backend.lock:
+                backend.sse_clients.discard(events)
+
+    def write_event(self, event, data):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+
+def run_script(backend, steps, capture_every, stop):
+    """Executa as ações do --script nos tempos marcados e as capturas periódicas"""
+    next_capture = backend.started + capture_every if capture_every else None
+    steps = list(steps)
+    while not stop.is_set():
+        now = time()
+        while steps and backend.started + steps[0][0] <= now:
+            _, action = steps.pop(0)
+            if action == 'capture':
+                backend.request_capture()
+                print("📸 Captura solicitada pelo script")
+            else:
+                backend.set_mode(action, 'script')
+        if next_capture is not None and now >= next_capture:
+            backend.request_capture()
+            next_capture += capture_every
+        if not steps and next_capture is None:
+            return
+        wakeups = [backend.started + steps[0][0]] if steps else []
+        if next_capture is not None:
+            wakeups.append(next_capture)
+        stop.wait(max(0.0, min(wakeups) - time()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor substituto do back-end para testes de ponta a ponta')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                        help='Endereço de escuta')
+    parser.add_argument('--port', type=int, default=3000,
+                        help='Porta (a mesma do teste-web.js por padrão)')
+    parser.add_argument('--mode', type=str, choices=MODES, default='realtime',
+                        help='Modo de operação inicial')
+    parser.add_argument('--latency-ms', type=float, default=0.0,
+                        help='Atraso adicionado a cada resposta (ms)')
+    parser.add_argument('--jitter-ms', type=float, default=0.0,
+                        help='Variação aleatória (±ms) do atraso')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fração (0-1) dos POSTs de detecção respondidos com erro')
+    parser.add_argument('--error-status', type=int, default=503,
+                        help='Status HTTP das falhas injetadas')
+    parser.add_argument('--script', type=str, default='',
+                        help='Ações no tempo, ex: "0:manual,2:capture,10:realtime" (segundos desde o início)')
+    parser.add_argument('--capture-every', type=float, default=0.0,
+                        help='Pede uma captura manual a cada N segundos (0 desativa)')
+    parser.add_argument('--ping-interval', type=float, default=30.0,
+                        help='Intervalo (s) do ping no SSE')
+    parser.add_argument('--record', type=str,
+                        help='JSONL onde cada detecção recebida é gravada')
+    parser.add_argument('--duration', type=float, default=0.0,
+                        help='Encerra depois de N segundos (0 = até Ctrl+C)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Semente do jitter e da injeção de erros')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Mostra o log de cada requisição')
+    args = parser.parse_args()
+
+    try:
+        steps = parse_script(args.script)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    backend = StandinBackend(
+        mode=args.mode,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        record_path=args.record,
+        ping_interval=args.ping_interval,
+        seed=args.seed
+    )
+    server = ThreadingHTTPServer((args.host, args.port), StandinHandler)
+    server.daemon_threads = True
+    server.backend = backend
+    server.verbose = args.verbose
+    server.stopping = threading.Event()
+
+    print("\n╔════════════════════════════════════════════════════════╗")
+    print("║  🧪 SERVIDOR SUBSTITUTO (TESTES DE PONTA A PONTA)     ║")
+    print("╚════════════════════════════════════════════════════════╝\n")
+    print(f"🚀 HTTP em: http://{args.host}:{args.port}")
+    print(f"🔧 Modo inicial: {args.mode.upper()}")
+    print(f"⏱️  Latência: {args.latency_ms}ms ±{args.jitter_ms}ms | Erros: {args.error_rate:.0%} ({args.error_status})")
+    print(f"📝 Gravação: {args.record or 'NÃO'}\n")
+
+    serve_thread = threading.Thread(target=server.serve_forever, name='standin-http', daemon=True)
+    serve_thread.start()
+    script_thread = None
+    if steps or args.capture_every > 0:
+        script_thread = threading.Thread(target=run_script,
+                                         args=(backend, steps, args.capture_every, server.stopping),
+                                         name='standin-script', daemon=True)
+        script_thread.start()
+
+    try:
+        server.stopping.wait(args.duration or None)
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrompido pelo usuário")
+    finally:
+        server.stopping.set()
+        backend.close()
+        server.shutdown()
+        server.server_close()
+        print(f"📊 Resumo: {json.dumps(backend.stats(), ensure_ascii=False)}")
+
+
+if __name__ == '__main__':
+    main()
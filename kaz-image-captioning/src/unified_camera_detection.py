@@ -3,93 +3,171 @@
 Combina YOLO (detecção de objetos) + Modelo Kaz (descrição em linguagem natural)
 Suporta ESP32-CAM, Webcam, Celular via IP
 """
-import torch
-import torchvision
 import pickle
 import cv2
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from argparse import Namespace
 from pathlib import Path
 from PIL import Image as PIL_Image
-from models.End_ExpansionNet_v2 import End_ExpansionNet_v2
 from utils.language_utils import convert_vector_idx2word
+from utils.caption_cache import CaptionCache, perceptual_hash
+from utils.embedding_cache import EmbeddingCache
+from utils.translation import BACKENDS, TranslationBatcher, TranslationCache, create_service
+from utils.camera_capture import FrameSource, esp32_snapshot_url
+from utils.yolo_decode import YoloDecoder, parse_class_list, parse_class_thresholds
+from utils.change_gate import DetectionChangeGate
+from utils.control_channel import ControlChannel
+from utils.backend_client import get_client
+from utils.publisher import POLICIES, DetectionPublisher
+from utils.detection_socket import DetectionSocket
+from utils.delta_encoder import DeltaEncoder, SnapshotRequired
 from time import time, sleep
 import os
+import uuid
 import argparse
-from deep_translator import GoogleTranslator
 import json
 import requests
 import numpy as np
-import tensorflow as tf
+
+# Subsistemas pesados (PyTorch, runtime TFLite, tradutor) são importados e carregados sob
+# demanda por load_kaz(), load_yolo() e load_translator(), conforme o --mode escolhido.
+process_start = time()
+startup_timings = {}
 
 # ===== CONFIGURAÇÕES MODELO KAZ =====
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_path = BASE_DIR / 'checkpoints' / 'kaz_model.pth'
+# Checkpoint só com pesos (gerado por strip_checkpoint.py); preferido quando existir
+deploy_paths = [BASE_DIR / 'checkpoints' / 'kaz_model.safetensors',
+                BASE_DIR / 'checkpoints' / 'kaz_model_deploy.pth']
 dict_path = BASE_DIR / 'vocabulary' / 'vocab_kz.pickle'  # Vocabulário Kazakh (18365 palavras)
 img_size = 384
 
-print("🔄 Carregando dicionário...")
-with open(dict_path, 'rb') as f:
-    coco_tokens = pickle.load(f)
-print("✅ Dicionário carregado!")
-
 drop_args = Namespace(enc=0.0, dec=0.0, enc_input=0.0, dec_input=0.0, other=0.0)
 model_args = Namespace(model_dim=512, N_enc=3, N_dec=3, dropout=0.0, drop_args=drop_args)
 
-print("🔄 Inicializando modelo Kaz...")
-kaz_model = End_ExpansionNet_v2(
-    swin_img_size=img_size, swin_patch_size=4, swin_in_chans=3,
-    swin_embed_dim=192, swin_depths=[2, 2, 18, 2], swin_num_heads=[6, 12, 24, 48],
-    swin_window_size=12, swin_mlp_ratio=4., swin_qkv_bias=True, swin_qk_scale=None,
-    swin_drop_rate=0.0, swin_attn_drop_rate=0.0, swin_drop_path_rate=0.0,
-    swin_norm_layer=torch.nn.LayerNorm, swin_ape=False, swin_patch_norm=True,
-    swin_use_checkpoint=False, final_swin_dim=1536,
-    d_model=model_args.model_dim, N_enc=model_args.N_enc,
-    N_dec=model_args.N_dec, num_heads=8, ff=2048,
-    num_exp_enc_list=[32, 64, 128, 256, 512],
-    num_exp_dec=16,
-    output_word2idx=coco_tokens['word2idx_dict'],
-    output_idx2word=coco_tokens['idx2word_list'],
-    max_seq_len=63, drop_args=model_args.drop_args,
-    rank=0
-)
-
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-print(f"🖥️  Dispositivo: {device}")
-kaz_model.to(device)
-
-if not os.path.exists(load_path):
-    print(f"❌ ERRO: Checkpoint Kaz não encontrado em {load_path}")
-    exit(1)
-
-checkpoint = torch.load(load_path, map_location=device)
-kaz_model.load_state_dict(checkpoint['model_state_dict'])
-kaz_model.eval()
-print("✅ Modelo Kaz carregado!")
-
-transf_1 = torchvision.transforms.Compose([
-    torchvision.transforms.Resize((img_size, img_size))
-])
-transf_2 = torchvision.transforms.Compose([
-    torchvision.transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-])
-
-beam_search_kwargs = {
-    'beam_size': 5,
-    'beam_max_seq_len': 63,
-    'sample_or_max': 'max',
-    'how_many_outputs': 1,
-    'sos_idx': coco_tokens['word2idx_dict'][coco_tokens['sos_str']],
-    'eos_idx': coco_tokens['word2idx_dict'][coco_tokens['eos_str']]
-}
-
-translator = GoogleTranslator(source='auto', target='pt')
+torch = None
+torchvision = None
+coco_tokens = None
+kaz_model = None
+device = None
+transf_1 = None
+transf_2 = None
+beam_search_kwargs = None
+translator = None
+
+# Cache de legendas por hash perceptual (configurado em main())
+caption_cache = None
+# Cache semântico opcional sobre a saída do encoder (configurado em main())
+embedding_cache = None
+# Cache de traduções em SQLite (configurado em main())
+translation_cache = None
+# Fila de envio em segundo plano (configurada em main(); None = envio síncrono)
+publisher = None
+# WebSocket persistente para as detecções (configurado em main(); None = só HTTP)
+detection_socket = None
+# Codificação por delta das detecções (configurada em main(); None = payload completo sempre)
+delta_encoder = None
+delta_lock = threading.Lock()
+# O servidor anunciou suporte a delta na última resposta HTTP (começa False: primeiro envio é completo)
+http_delta_supported = False
+
+def load_kaz(num_threads=None):
+    """Carrega dicionário e modelo Kaz (PyTorch)"""
+    global torch, torchvision, coco_tokens, kaz_model, device, transf_1, transf_2, beam_search_kwargs
+    
+    t0 = time()
+    import torch as _torch
+    import torchvision as _torchvision
+    from models.End_ExpansionNet_v2 import End_ExpansionNet_v2
+    from utils.saving_utils import load_model_state_dict, build_model_from_state_dict
+    torch, torchvision = _torch, _torchvision
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    startup_timings['import torch'] = time() - t0
+    
+    t0 = time()
+    print("🔄 Carregando dicionário...")
+    with open(dict_path, 'rb') as f:
+        coco_tokens = pickle.load(f)
+    print("✅ Dicionário carregado!")
+    startup_timings['dicionário'] = time() - t0
+    
+    checkpoint_path = next((p for p in deploy_paths if os.path.exists(p)), load_path)
+    if checkpoint_path.suffix == '.safetensors':
+        try:
+            import safetensors  # noqa: F401
+        except ImportError:
+            checkpoint_path = load_path
+    if not os.path.exists(checkpoint_path):
+        raise FileNotFoundError(f"Checkpoint Kaz não encontrado em {load_path}")
+    
+    t0 = time()
+    print(f"🔄 Lendo checkpoint Kaz ({checkpoint_path.name}, memory-map)...")
+    state_dict = load_model_state_dict(checkpoint_path, map_location='cpu')
+    startup_timings['checkpoint Kaz'] = time() - t0
+    
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    print(f"🖥️  Dispositivo: {device}")
+    
+    t0 = time()
+    print("🔄 Inicializando modelo Kaz (sem inicialização aleatória)...")
+    build_kaz = lambda: End_ExpansionNet_v2(
+        swin_img_size=img_size, swin_patch_size=4, swin_in_chans=3,
+        swin_embed_dim=192, swin_depths=[2, 2, 18, 2], swin_num_heads=[6, 12, 24, 48],
+        swin_window_size=12, swin_mlp_ratio=4., swin_qkv_bias=True, swin_qk_scale=None,
+        swin_drop_rate=0.0, swin_attn_drop_rate=0.0, swin_drop_path_rate=0.0,
+        swin_norm_layer=torch.nn.LayerNorm, swin_ape=False, swin_patch_norm=True,
+        swin_use_checkpoint=False, final_swin_dim=1536,
+        d_model=model_args.model_dim, N_enc=model_args.N_enc,
+        N_dec=model_args.N_dec, num_heads=8, ff=2048,
+        num_exp_enc_list=[32, 64, 128, 256, 512],
+        num_exp_dec=16,
+        output_word2idx=coco_tokens['word2idx_dict'],
+        output_idx2word=coco_tokens['idx2word_list'],
+        max_seq_len=63, drop_args=model_args.drop_args,
+        rank=0
+    )
+    model = build_model_from_state_dict(build_kaz, state_dict, device)
+    del state_dict
+    model.eval()
+    kaz_model = model
+    print("✅ Modelo Kaz carregado!")
+    startup_timings['construção Kaz'] = time() - t0
+    
+    transf_1 = torchvision.transforms.Compose([
+        torchvision.transforms.Resize((img_size, img_size))
+    ])
+    transf_2 = torchvision.transforms.Compose([
+        torchvision.transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+    ])
+    
+    beam_search_kwargs = {
+        'beam_size': 5,
+        'beam_max_seq_len': 63,
+        'sample_or_max': 'max',
+        'how_many_outputs': 1,
+        'sos_idx': coco_tokens['word2idx_dict'][coco_tokens['sos_str']],
+        'eos_idx': coco_tokens['word2idx_dict'][coco_tokens['eos_str']]
+    }
+
+def load_translator(backend='google', fallback='offline', timeout=None, retries=0, batch_window_ms=0):
+    """Cria o serviço de tradução (backend configurado + cache + fallback offline)"""
+    global translator
+    t0 = time()
+    translator = create_service(backend, cache=translation_cache, fallback=fallback,
+                                timeout=timeout, retries=retries)
+    if batch_window_ms > 0:
+        # Traduções de capturas próximas saem num único pedido
+        translator = TranslationBatcher(translator, window_ms=batch_window_ms)
+    startup_timings['tradutor'] = time() - t0
 
 # ===== CONTROLE DE MODO =====
 def check_operation_mode(server_url):
     """Verifica modo de operação via API"""
     try:
-        url = f"{server_url}/api/operation-mode"
-        response = requests.get(url, timeout=2)
+        response = get_client(server_url).get('/api/operation-mode')
         if response.status_code == 200:
             data = response.json()
             mode = data.get('state', {}).get('mode', 'manual')
@@ -104,33 +182,73 @@ def check_operation_mode(server_url):
         print(f"⚠️  Erro inesperado na verificação de modo: {e}")
         return None
 
-def check_manual_capture_request(server_url):
-    """Verifica se há solicitação de captura manual pendente"""
-    try:
-        response = requests.get(f"{server_url}/api/esp32-cam/capture-status", timeout=2)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('shouldCapture', False)
-    except:
-        pass
-    return False
-
 # ===== CONFIGURAÇÕES YOLO =====
 TFLITE_MODEL = 'tflite_learn_810340_10.tflite'
-yolo_available = os.path.exists(TFLITE_MODEL)
+yolo_available = False
+yolo_detector = None
+yolo_input = None
+yolo_decoder = None
 
-if yolo_available:
+def load_yolo(num_threads=None, use_xnnpack=True, filters=None):
+    """Carrega o detector YOLO (tflite_runtime > ai_edge_litert > tensorflow)"""
+    global yolo_available, yolo_detector, yolo_input, yolo_decoder, t_in, t_out, IN_H, IN_W
+    
+    if not os.path.exists(TFLITE_MODEL):
+        print("⚠️  Modelo YOLO não encontrado, continuando apenas com Kaz")
+        return
+    
+    t0 = time()
     print("🔄 Carregando modelo YOLO...")
-    tflite_interpreter = tf.lite.Interpreter(model_path=TFLITE_MODEL)
-    tflite_interpreter.allocate_tensors()
-    t_in = tflite_interpreter.get_input_details()[0]
-    t_out = tflite_interpreter.get_output_details()[0]
-    IN_H, IN_W = t_in['shape'][1], t_in['shape'][2]
-    in_scale, in_zero = t_in.get('quantization', (1.0, 0))
-    out_scale, out_zero = t_out.get('quantization', (1.0, 0))
-    print("✅ Modelo YOLO carregado!")
-else:
-    print("⚠️  Modelo YOLO não encontrado, continuando apenas com Kaz")
+    from utils.yolo_backend import TFLiteDetector
+    from utils.letterbox import LetterboxInput
+    yolo_detector = TFLiteDetector(TFLITE_MODEL, num_threads=num_threads, use_xnnpack=use_xnnpack)
+    yolo_input = LetterboxInput.from_detector(yolo_detector)
+    t_in = yolo_detector.input_details
+    t_out = yolo_detector.output_details
+    IN_H, IN_W = yolo_detector.input_height, yolo_detector.input_width
+    yolo_decoder = YoloDecoder(COCO_LABELS, conf_threshold=CONF_THRESHOLD, iou_threshold=IOU_THRESHOLD,
+                               output_quantization=yolo_detector.output_quantization, **(filters or {}))
+    yolo_available = True
+    print(f"✅ Modelo YOLO carregado! ({yolo_detector.describe()})")
+    startup_timings['YOLO'] = time() - t0
+
+def split_cpu_budget(mode, cpu_threads, yolo_threads=None):
+    """Divide as threads de CPU entre TFLite (YOLO) e PyTorch (Kaz)"""
+    cpu_threads = max(1, cpu_threads)
+    if mode == 'yolo-only':
+        return yolo_threads or cpu_threads, None
+    if mode == 'kaz-only':
+        return None, cpu_threads
+    # both: os dois modelos rodam ao mesmo tempo, o Kaz é o mais pesado
+    if cpu_threads < 2:
+        print(f"⚠️  Orçamento de {cpu_threads} thread(s) no modo both: YOLO e Kaz usam 1 thread cada "
+              f"e rodam em paralelo, ultrapassando o orçamento (use --cpu-threads 2 ou mais)")
+        return 1, 1
+    requested = yolo_threads
+    yolo_threads = min(yolo_threads or max(1, cpu_threads // 4), cpu_threads - 1)
+    if requested and requested != yolo_threads:
+        print(f"⚠️  --yolo-threads {requested} reduzido para {yolo_threads}: o Kaz precisa de ao menos 1 "
+              f"das {cpu_threads} threads do orçamento")
+    return yolo_threads, cpu_threads - yolo_threads
+
+def load_subsystems(mode, errors, yolo_threads=None, yolo_xnnpack=True, torch_threads=None, yolo_filters=None,
+                    translator_backend='google', translator_fallback='offline',
+                    translation_timeout=None, translation_retries=0, translation_batch_window=0):
+    """Carrega apenas o que o modo selecionado precisa (executado em thread de fundo)"""
+    try:
+        if mode in ['yolo-only', 'both']:
+            load_yolo(num_threads=yolo_threads, use_xnnpack=yolo_xnnpack, filters=yolo_filters)
+        if mode in ['kaz-only', 'both']:
+            load_translator(translator_backend, translator_fallback, translation_timeout, translation_retries,
+                            translation_batch_window)
+            load_kaz(num_threads=torch_threads)
+    except Exception as e:
+        errors.append(e)
+
+def print_startup_timings():
+    parts = [f"{name} {seconds:.2f}s" for name, seconds in startup_timings.items()]
+    print(f"⏱️  Inicialização: {' | '.join(parts)}")
+    print(f"⏱️  Pronto em {time() - process_start:.2f}s desde o início do processo\n")
 
 COCO_LABELS = [
     'person','bicycle','car','motorcycle','airplane','bus','train','truck','boat','traffic light',
@@ -193,8 +311,8 @@ def translate_to_portuguese(text):
         print(f"⚠️  Erro na tradução: {e}")
         return text
 
-def generate_caption_kaz(img):
-    """Gera legenda usando modelo Kaz"""
+def caption_kaz(img):
+    """Gera a legenda em cazaque. Retorna (kz, pt ou None se ainda não traduzida, tempo, chaves de cache)"""
     start = time()
     
     pil_image = cv2_to_pil(img)
@@ -203,16 +321,42 @@ def generate_caption_kaz(img):
         pil_image = PIL_Image.new("RGB", pil_image.size)
     
     preprocess_pil_image = transf_1(pil_image)
+    
+    # Lugar já visto: reaproveita legenda e tradução sem rodar o modelo
+    frame_hash = None
+    if caption_cache is not None:
+        frame_hash = perceptual_hash(preprocess_pil_image)
+        cached = caption_cache.lookup(frame_hash)
+        if cached is not None:
+            pred_kaz, pred_pt = cached
+            print("⚡ Legenda encontrada no cache")
+            return pred_kaz, pred_pt, time() - start, None
+    
     tens_image_1 = torchvision.transforms.ToTensor()(preprocess_pil_image)
     tens_image_2 = transf_2(tens_image_1)
     
     image = tens_image_2.unsqueeze(0).to(device)
     
     with torch.no_grad():
+        enc_output = None
+        enc_vector = None
+        if embedding_cache is not None:
+            # Mesma cena com outra luz/enquadramento: roda só o encoder e compara embeddings
+            enc_output = kaz_model.forward_enc(enc_input=image, enc_input_num_pads=[0])
+            enc_vector = enc_output.mean(dim=1)[0].float().cpu().numpy()
+            cached = embedding_cache.lookup(enc_vector)
+            if cached is not None:
+                pred_kaz, pred_pt, similarity = cached
+                print(f"⚡ Legenda encontrada no cache semântico (cos={similarity:.3f})")
+                if frame_hash is not None:
+                    caption_cache.put(frame_hash, pred_kaz, pred_pt)
+                return pred_kaz, pred_pt, time() - start, None
+        
         pred, _ = kaz_model(
             enc_x=image,
             enc_x_num_pads=[0],
             mode='beam_search',
+            enc_output=enc_output,
             **beam_search_kwargs
         )
     
@@ -222,138 +366,217 @@ def generate_caption_kaz(img):
     
     gen_time = time() - start
     
+    return pred_kaz, None, gen_time, (frame_hash, enc_vector)
+
+def finish_translation(pred_kaz, cache_keys):
+    """Traduz a legenda gerada por caption_kaz e grava nos caches. Retorna (pt, tempo)"""
     trans_start = time()
     pred_pt = translate_to_portuguese(pred_kaz)
     trans_time = time() - trans_start
     
-    return pred_kaz, pred_pt, gen_time, trans_time
+    frame_hash, enc_vector = cache_keys
+    if frame_hash is not None:
+        caption_cache.put(frame_hash, pred_kaz, pred_pt)
+    if enc_vector is not None:
+        embedding_cache.put(enc_vector, pred_kaz, pred_pt)
+    
+    return pred_pt, trans_time
 
-def xywh2xyxy(x):
-    """Converte bbox de xywh para xyxy"""
-    y = np.copy(x)
-    y[..., 0] = x[..., 0] - x[..., 2] / 2.0
-    y[..., 1] = x[..., 1] - x[..., 3] / 2.0
-    y[..., 2] = x[..., 0] + x[..., 2] / 2.0
-    y[..., 3] = x[..., 1] + x[..., 3] / 2.0
-    return y
-
-def do_nms(boxes, scores, iou_threshold=IOU_THRESHOLD, max_output=50):
-    """Non-Maximum Suppression"""
-    if len(boxes) == 0:
-        return np.array([], dtype=np.int32)
-    boxes_tf = tf.convert_to_tensor(boxes, dtype=tf.float32)
-    scores_tf = tf.convert_to_tensor(scores, dtype=tf.float32)
-    idx = tf.image.non_max_suppression(boxes_tf, scores_tf, max_output, iou_threshold=iou_threshold)
-    return idx.numpy()
+def generate_caption_kaz(img):
+    """Gera legenda usando modelo Kaz (geração + tradução na mesma chamada)"""
+    pred_kaz, pred_pt, gen_time, cache_keys = caption_kaz(img)
+    if pred_pt is not None:
+        return pred_kaz, pred_pt, gen_time, 0.0
+    pred_pt, trans_time = finish_translation(pred_kaz, cache_keys)
+    return pred_kaz, pred_pt, gen_time, trans_time
 
-def detect_yolo(frame):
-    """Detecta objetos usando YOLO"""
-    if not yolo_available:
-        return []
-    
-    h_orig, w_orig = frame.shape[:2]
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    resized = cv2.resize(frame_rgb, (IN_W, IN_H))
-    input_data = np.expand_dims(resized, axis=0)
-    
-    if t_in['dtype'] == np.uint8:
-        if in_scale != 0:
-            input_data = (input_data / in_scale + in_zero).astype(np.uint8)
-        else:
-            input_data = input_data.astype(np.uint8)
-    else:
-        input_data = (np.float32(input_data) - 127.5) / 127.5
+def decode_yolo(frame):
+    """Executa o YOLO e retorna Detections (arrays: caixas, scores, classes)"""
+    input_data = yolo_input(frame)
     
     try:
-        tflite_interpreter.set_tensor(t_in['index'], input_data)
-        tflite_interpreter.invoke()
-        output = tflite_interpreter.get_tensor(t_out['index'])
+        output = yolo_detector.invoke(input_data)
     except Exception as e:
         print(f"⚠️  Erro YOLO: {e}")
-        return []
-    
-    if t_out['dtype'] == np.uint8:
-        if out_scale != 0:
-            output = (output.astype(np.float32) - out_zero) * out_scale
-        else:
-            output = output.astype(np.float32)
-    else:
-        output = output.astype(np.float32)
-    
-    preds = output[0] if output.ndim == 3 else output
-    
-    if preds.ndim != 2 or preds.shape[1] < 6:
-        return []
-    
-    obj_conf = preds[:, 4]
-    mask_obj = obj_conf > CONF_THRESHOLD
-    preds = preds[mask_obj]
+        return None
     
-    if preds.shape[0] == 0:
+    return yolo_decoder.decode(output, letterbox=yolo_input)
+
+def detections_to_dicts(dets):
+    """Converte Detections em dicts (só na hora de imprimir/enviar)"""
+    return [{
+        'class': get_label_pt(cls),  # Já em português
+        'class_en': COCO_LABELS[cls] if cls < len(COCO_LABELS) else f"cls{cls}",  # Inglês para referência
+        'confidence': score,
+        'bbox': box
+    } for box, score, cls in zip(dets.boxes.tolist(), dets.scores.tolist(), dets.class_ids.tolist())]
+
+def detect_yolo(frame):
+    """Detecta objetos usando YOLO"""
+    if not yolo_available:
         return []
     
-    class_probs = preds[:, 5:]
-    class_ids = np.argmax(class_probs, axis=1)
-    class_scores = np.max(class_probs, axis=1)
-    scores = preds[:, 4] * class_scores
-    
-    keep = scores > CONF_THRESHOLD
-    preds = preds[keep]
-    scores = scores[keep]
-    class_ids = class_ids[keep]
-    
-    if preds.shape[0] == 0:
+    dets = decode_yolo(frame)
+    if dets is None:
         return []
-    
-    boxes_xywh = preds[:, :4]
-    boxes_xyxy = xywh2xyxy(boxes_xywh)
-    boxes_nms = np.stack([boxes_xyxy[:, 1], boxes_xyxy[:, 0], boxes_xyxy[:, 3], boxes_xyxy[:, 2]], axis=1)
-    keep_idx = do_nms(boxes_nms, scores, IOU_THRESHOLD, max_output=50)
-    
-    detections = []
-    for i in keep_idx:
-        cls = int(class_ids[i])
-        score = float(scores[i])
-        x1n, y1n, x2n, y2n = boxes_xyxy[i]
+    return detections_to_dicts(dets)
+
+def run_yolo(frame):
+    """Executa detect_yolo e mede o tempo (para rodar no pool de workers)"""
+    yolo_start = time()
+    detections = detect_yolo(frame)
+    return detections, time() - yolo_start
+
+STOPWORDS_PT = ['para', 'está', 'sobre', 'perto', 'sendo']
+
+def combine_results(mode, yolo_objects, yolo_confidence, description_pt, description_kz):
+    """Combina YOLO e Kaz conforme o modo. Retorna (descrição pt, descrição kz, objetos, confiança)"""
+    if mode == 'yolo-only':
+        # Usar apenas YOLO
+        final_objects = yolo_objects
+        final_confidence = yolo_confidence
+        if yolo_objects:
+            description_pt = f"Detectado: {', '.join(yolo_objects)}"
+        else:
+            description_pt = "Nenhum objeto detectado"
+        description_kz = description_pt
+        
+    elif mode == 'kaz-only':
+        # Usar apenas Kaz
+        final_objects = [word for word in description_pt.lower().split() 
+                        if len(word) > 3 and word not in STOPWORDS_PT][:5]
+        final_confidence = 0.85
         
-        # Usar label em português diretamente
-        label_name_en = COCO_LABELS[cls] if cls < len(COCO_LABELS) else f"cls{cls}"
-        label_name_pt = get_label_pt(cls)
+    else:  # both
+        # Combinar YOLO + Kaz
+        final_objects = list(set(yolo_objects))  # Remover duplicatas do YOLO
+        final_confidence = yolo_confidence if yolo_objects else 0.85
         
-        detections.append({
-            'class': label_name_pt,  # Já em português
-            'class_en': label_name_en,  # Inglês para referência
-            'confidence': score,
-            'bbox': [float(x1n), float(y1n), float(x2n), float(y2n)]
-        })
+        # Se Kaz detectou algo diferente, adicionar
+        kaz_words = [word for word in description_pt.lower().split() 
+                    if len(word) > 3 and word not in STOPWORDS_PT]
+        
+        for word in kaz_words[:3]:
+            if word not in [obj.lower() for obj in final_objects]:
+                final_objects.append(word)
     
-    return detections
+    # Limitar objetos
+    return description_pt, description_kz, final_objects[:10], final_confidence
 
-def send_to_server(server_url, description_pt, description_kz, objects, confidence, source):
-    """Envia detecção para o servidor"""
+def post_detection(server_url, data):
+    """POST de um payload. True = entregue, False = rejeitado (4xx); rede/5xx levantam exceção.
+    409 com snapshot_required levanta SnapshotRequired (o servidor perdeu a sequência do delta).
+    Cada 200 atualiza http_delta_supported com o 'delta' anunciado na resposta do servidor."""
+    global http_delta_supported
+    response = get_client(server_url).send_description(data)
+    
+    if response.status_code == 200:
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        http_delta_supported = bool(body.get('delta'))
+        print(f"✅ Enviado para servidor: {body.get('message', 'OK')}")
+        return True
+    if response.status_code >= 500:
+        raise RuntimeError(f"HTTP {response.status_code}")
+    if response.status_code == 409:
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if body.get('snapshot_required'):
+            raise SnapshotRequired(f"servidor esperava seq {body.get('expected')}")
+    print(f"❌ Erro HTTP {response.status_code}: {response.text}")
+    return False
+
+def post_delta(server_url, data):
+    """POST com delta: refaz como snapshot se o servidor pedir; volta ao payload completo se recusar"""
+    global http_delta_supported
+    message = delta_encoder.encode(data)
     try:
-        url = f"{server_url}/api/esp32-cam/send-description"
-        data = {
-            "description_pt": description_pt,
-            "description_kz": description_kz,
-            "objects": objects,
-            "confidence": confidence,
-            "source": source  # "esp32-cam" ou "yolo+kaz" ou "webcam+kaz"
-        }
-        
-        response = requests.post(url, json=data, timeout=5)
-        
-        if response.status_code == 200:
-            print(f"✅ Enviado para servidor: {response.json().get('message', 'OK')}")
+        ok = post_detection(server_url, message)
+    except SnapshotRequired as e:
+        print(f"🔁 Delta fora de sequência ({e}), reenviando snapshot")
+        delta_encoder.request_snapshot()
+        message = delta_encoder.encode(data)
+        ok = post_detection(server_url, message)
+    if ok:
+        delta_encoder.commit(message, data)
+        return True
+    if message['kind'] != 'snapshot':
+        # Servidor trocado por um que não entende delta: manda completo e desliga até ele anunciar de novo
+        http_delta_supported = False
+        delta_encoder.request_snapshot()
+        return post_detection(server_url, data)
+    return False
+
+def deliver_detection(server_url, data):
+    """Entrega pelo WebSocket persistente quando conectado; senão pelo POST HTTP.
+    Com o delta ativo (--delta) só envia o que mudou, e só depois que o transporte em uso
+    anunciou suporte (hello do WebSocket ou 'delta' na resposta HTTP); até lá vai completo."""
+    if delta_encoder is None:
+        if detection_socket is not None and detection_socket.send_detection(data):
             return True
-        else:
-            print(f"❌ Erro HTTP {response.status_code}: {response.text}")
-            return False
-            
+        return post_detection(server_url, data)
+    
+    # O lock mantém encode -> envio -> commit atômico entre o publicador e a tradução síncrona
+    with delta_lock:
+        if detection_socket is not None and detection_socket.connected:
+            use_delta = detection_socket.delta_supported
+            message = delta_encoder.encode(data) if use_delta else data
+            if detection_socket.send_detection(message):
+                if use_delta:
+                    delta_encoder.commit(message, data)
+                else:
+                    # O servidor não guardou o estado do stream: o próximo delta parte de um snapshot
+                    delta_encoder.request_snapshot()
+                return True
+        if http_delta_supported:
+            return post_delta(server_url, data)
+        ok = post_detection(server_url, data)
+        delta_encoder.request_snapshot()
+        return ok
+
+def send_to_server(server_url, description_pt, description_kz, objects, confidence, source,
+                   capture_id=None, stage=None):
+    """Envia detecção para o servidor (capture_id/stage ligam a publicação parcial à final).
+    Com o publicador ativo só enfileira e retorna na hora."""
+    data = {
+        "description_pt": description_pt,
+        "description_kz": description_kz,
+        "objects": objects,
+        "confidence": confidence,
+        "source": source  # "esp32-cam" ou "yolo+kaz" ou "webcam+kaz"
+    }
+    if capture_id is not None:
+        data["capture_id"] = capture_id
+        data["stage"] = stage or 'final'
+    
+    if publisher is not None:
+        publisher.publish(data, key=capture_id)
+        return True
+    
+    try:
+        return deliver_detection(server_url, data)
     except Exception as e:
         print(f"❌ Erro ao enviar: {e}")
         return False
 
+def publish_translation(server_url, source, capture_id, mode, caption_kz, cache_keys,
+                        yolo_objects, yolo_confidence):
+    """Worker de tradução: traduz a legenda já publicada e envia a versão final com o mesmo capture_id"""
+    try:
+        caption_pt, trans_time = finish_translation(caption_kz, cache_keys)
+        print(f"🌐 Tradução pronta [{capture_id}] em {trans_time:.2f}s: {caption_pt}")
+        description_pt, description_kz, final_objects, final_confidence = combine_results(
+            mode, yolo_objects, yolo_confidence, caption_pt, caption_kz
+        )
+        send_to_server(server_url, description_pt, description_kz, final_objects, final_confidence,
+                       source, capture_id=capture_id, stage='final')
+    except Exception as e:
+        print(f"⚠️  Erro ao publicar tradução [{capture_id}]: {e}")
+
 def main():
     parser = argparse.ArgumentParser(description='🎯 Sistema Unificado de Detecção')
     parser.add_argument('--source', type=str, required=True,
@@ -373,6 +596,90 @@ def main():
                         help='Modo automático (captura contínua)')
     parser.add_argument('--headless', action='store_true',
                         help='Modo headless (sem interface gráfica)')
+    parser.add_argument('--cpu-threads', type=int, default=os.cpu_count() or 1,
+                        help='Orçamento total de threads de CPU dividido entre YOLO e Kaz')
+    parser.add_argument('--yolo-threads', type=int, default=None,
+                        help='Threads do interpretador TFLite (padrão: parte do --cpu-threads)')
+    parser.add_argument('--early-publish', type=float, default=0.5,
+                        help='No modo both, publica os objetos do YOLO se a legenda demorar mais que N segundos (-1 desativa)')
+    parser.add_argument('--change-gate', action='store_true',
+                        help='No modo automático, pula legenda e envio quando os objetos do YOLO não mudaram')
+    parser.add_argument('--gate-grid', type=int, default=3,
+                        help='Grade NxN usada para comparar a posição dos objetos')
+    parser.add_argument('--gate-max-age', type=float, default=30.0,
+                        help='Segundos máximos sem publicar antes de um envio forçado')
+    parser.add_argument('--publish-queue', type=int, default=32,
+                        help='Tamanho da fila de envio em segundo plano (0 = envio síncrono no loop)')
+    parser.add_argument('--publish-policy', type=str, choices=POLICIES, default='coalesce',
+                        help='Fila cheia/repetida: drop-oldest descarta o mais antigo; coalesce também '
+                             'substitui a versão na fila da mesma captura')
+    parser.add_argument('--publish-retries', type=int, default=3,
+                        help='Tentativas de envio antes de considerar o servidor fora do ar')
+    parser.add_argument('--spill-path', type=str, default=None,
+                        help='Arquivo onde as detecções ficam enquanto o servidor está inacessível, '
+                             'ex: cache/outbox.jsonl (padrão: descarta o que não puder ser enviado)')
+    parser.add_argument('--spill-max-age', type=float, default=60.0,
+                        help='Idade máxima (s) de uma detecção salva para ainda ser reenviada; '
+                             'mais antigas descrevem uma cena que já passou e são descartadas')
+    parser.add_argument('--no-ws', action='store_true',
+                        help='Não abre o WebSocket de detecções; publica tudo por POST HTTP')
+    parser.add_argument('--ws-json', action='store_true',
+                        help='Força JSON no WebSocket (sem MessagePack)')
+    parser.add_argument('--ws-compress-threshold', type=int, default=512,
+                        help='Frames MessagePack maiores que N bytes vão comprimidos com zlib')
+    parser.add_argument('--delta', action='store_true',
+                        help='Envia só o que mudou, com número de sequência, quando o servidor anunciar suporte '
+                             '(padrão: detecção completa sempre)')
+    parser.add_argument('--snapshot-every', type=int, default=50,
+                        help='Envia a detecção completa a cada N mensagens do stream de deltas (0 = só quando pedido)')
+    parser.add_argument('--no-push-control', action='store_true',
+                        help='Não assina o SSE do servidor; consulta modo e pedidos de captura por polling')
+    parser.add_argument('--no-xnnpack', action='store_true',
+                        help='Desativa o delegate XNNPACK do TFLite')
+    parser.add_argument('--class-thresholds', type=str, default='',
+                        help='Limiar por classe COCO, ex: "person=0.4,cup=0.2"')
+    parser.add_argument('--ignore-classes', type=str, default='',
+                        help='Classes COCO ignoradas, ex: "tie,frisbee"')
+    parser.add_argument('--only-classes', type=str, default='',
+                        help='Se definido, só estas classes COCO são reportadas')
+    parser.add_argument('--snapshot', action='store_true',
+                        help='No modo manual do ESP32, usa o endpoint de captura única (/capture) em vez do stream')
+    parser.add_argument('--snapshot-url', type=str,
+                        help='URL de captura única (padrão: derivada de --url, ex: http://IP/capture)')
+    parser.add_argument('--caption-cache', type=str, default=str(BASE_DIR / 'cache' / 'caption_cache.json'),
+                        help='Arquivo do cache de legendas por hash perceptual')
+    parser.add_argument('--cache-size', type=int, default=2000,
+                        help='Número máximo de legendas no cache (LRU)')
+    parser.add_argument('--cache-distance', type=int, default=6,
+                        help='Distância de Hamming máxima (0-63) para considerar o mesmo lugar')
+    parser.add_argument('--no-caption-cache', action='store_true',
+                        help='Desativa o cache de legendas')
+    parser.add_argument('--translator', type=str, choices=list(BACKENDS), default='google',
+                        help='Backend de tradução (offline = tabela de frases local, sem internet)')
+    parser.add_argument('--translator-fallback', type=str, choices=list(BACKENDS) + ['none'], default='offline',
+                        help='Backend usado quando o principal falha')
+    parser.add_argument('--translation-cache', type=str, default=str(BASE_DIR / 'cache' / 'translations.sqlite3'),
+                        help='Banco SQLite do cache de traduções')
+    parser.add_argument('--translation-ttl', type=float, default=30,
+                        help='Validade das traduções em cache (dias)')
+    parser.add_argument('--no-translation-cache', action='store_true',
+                        help='Desativa o cache de traduções')
+    parser.add_argument('--sync-translation', action='store_true',
+                        help='Espera a tradução antes de publicar (padrão: publica a legenda em cazaque e envia a tradução depois)')
+    parser.add_argument('--translation-timeout', type=float, default=5.0,
+                        help='Tempo máximo (s) de cada tentativa de tradução online')
+    parser.add_argument('--translation-retries', type=int, default=2,
+                        help='Novas tentativas de tradução antes de usar o fallback')
+    parser.add_argument('--translation-workers', type=int, default=2,
+                        help='Workers do pool de tradução em segundo plano')
+    parser.add_argument('--translation-batch-window', type=float, default=30.0,
+                        help='Janela (ms) para agrupar traduções próximas num único pedido (0 desativa)')
+    parser.add_argument('--semantic-cache', action='store_true',
+                        help='Ativa o cache semântico (embedding do encoder Swin)')
+    parser.add_argument('--semantic-threshold', type=float, default=0.95,
+                        help='Similaridade de cosseno mínima para reaproveitar a legenda')
+    parser.add_argument('--semantic-cache-size', type=int, default=500,
+                        help='Número máximo de embeddings no cache semântico')
     
     args = parser.parse_args()
     
@@ -395,23 +702,116 @@ def main():
     print(f"🔧 Modo: {args.mode.upper()}")
     print(f"⏱️  Intervalo: {args.interval}s")
     print(f"🔄 Auto: {'SIM' if args.auto else 'NÃO'}")
-    print(f"👁️  Interface: {'NÃO' if args.headless else 'SIM'}\n")
+    print(f"👁️  Interface: {'NÃO' if args.headless else 'SIM'}")
+    print(f"💾 Cache de legendas: {'NÃO' if args.no_caption_cache else args.caption_cache}")
+    print(f"🧠 Cache semântico: {'SIM' if args.semantic_cache else 'NÃO'}\n")
+    
+    global caption_cache, embedding_cache, translation_cache
+    if not args.no_caption_cache and args.mode in ['kaz-only', 'both']:
+        caption_cache = CaptionCache(
+            path=args.caption_cache,
+            max_entries=args.cache_size,
+            max_distance=args.cache_distance
+        )
+    if not args.no_translation_cache and args.mode in ['kaz-only', 'both']:
+        translation_cache = TranslationCache(
+            path=args.translation_cache,
+            ttl=args.translation_ttl * 24 * 3600
+        )
+    if args.semantic_cache and args.mode in ['kaz-only', 'both']:
+        embedding_cache = EmbeddingCache(
+            dim=model_args.model_dim,
+            max_entries=args.semantic_cache_size,
+            threshold=args.semantic_threshold
+        )
+    
+    global publisher, detection_socket, delta_encoder
+    if args.delta:
+        # Id novo a cada execução: o servidor começa o stream do zero a partir do primeiro snapshot
+        delta_encoder = DeltaEncoder(f"{args.source}-{uuid.uuid4().hex[:8]}",
+                                     snapshot_every=args.snapshot_every)
+    if not args.no_ws:
+        detection_socket = DetectionSocket(
+            args.server_url,
+            device_id=f"UNIFIED-{args.source.upper()}",
+            use_msgpack=not args.ws_json,
+            compress_threshold=args.ws_compress_threshold,
+            on_snapshot_request=(lambda message: delta_encoder.request_snapshot())
+            if delta_encoder is not None else None
+        ).start()
+    if args.publish_queue > 0:
+        server_url = args.server_url
+        publisher = DetectionPublisher(
+            lambda data: deliver_detection(server_url, data),
+            max_queue=args.publish_queue,
+            policy=args.publish_policy,
+            retries=args.publish_retries,
+            spill_path=args.spill_path,
+            max_spill_age=args.spill_max_age
+        )
+    
+    change_gate = None
+    if args.change_gate and args.mode in ['yolo-only', 'both']:
+        change_gate = DetectionChangeGate(grid=args.gate_grid, max_age=args.gate_max_age)
+    
+    # Carregar modelos em segundo plano enquanto a câmera conecta
+    load_errors = []
+    yolo_filters = {
+        'class_thresholds': parse_class_thresholds(args.class_thresholds),
+        'allow': parse_class_list(args.only_classes),
+        'deny': parse_class_list(args.ignore_classes)
+    }
+    yolo_threads, torch_threads = split_cpu_budget(args.mode, args.cpu_threads, args.yolo_threads)
+    print(f"🧵 Threads: YOLO={yolo_threads or '-'} | Kaz={torch_threads or '-'}")
+    loader = threading.Thread(
+        target=load_subsystems,
+        args=(args.mode, load_errors, yolo_threads, not args.no_xnnpack, torch_threads, yolo_filters,
+              args.translator, None if args.translator_fallback == 'none' else args.translator_fallback,
+              args.translation_timeout, args.translation_retries, args.translation_batch_window),
+        daemon=True
+    )
+    loader.start()
+    
+    # YOLO e Kaz são independentes: no modo both rodam em paralelo
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='inferencia')
+    # A tradução (rede) não segura a captura: roda em pool próprio e publica a versão final depois
+    translation_executor = None
+    if not args.sync_translation and args.mode in ['kaz-only', 'both']:
+        translation_executor = ThreadPoolExecutor(max_workers=max(1, args.translation_workers),
+                                                  thread_name_prefix='traducao')
     
     # Conectar à câmera
     print(f"📹 Conectando à câmera...")
+    camera_start = time()
+    snapshot_url = None
+    if args.snapshot_url:
+        snapshot_url = args.snapshot_url
+    elif args.snapshot and args.source == 'esp32':
+        snapshot_url = esp32_snapshot_url(args.url)
+    if snapshot_url:
+        print(f"📸 Captura única: {snapshot_url}")
+    
     if args.source == 'webcam':
-        cap = cv2.VideoCapture(args.device)
+        cap = FrameSource(args.device)
         source_label = f"webcam-{args.device}"
     else:
-        cap = cv2.VideoCapture(args.url)
+        cap = FrameSource(args.url, snapshot_url=snapshot_url)
         source_label = "esp32-cam" if args.source == 'esp32' else "phone-cam"
     
     if not cap.isOpened():
         print("❌ Erro ao conectar à câmera!")
         return
     
+    startup_timings['câmera'] = time() - camera_start
     print("✅ Câmera conectada!\n")
     
+    loader.join()
+    if load_errors:
+        print(f"❌ ERRO ao carregar modelos: {load_errors[0]}")
+        cap.release()
+        return
+    print_startup_timings()
+    
     if not args.auto and not args.headless:
         print("="*60)
         print("MODO MANUAL:")
@@ -423,9 +823,13 @@ def main():
     capture_count = 0
     last_capture_time = 0
     auto_mode = args.auto
-    last_mode_check = 0
     current_mode = 'manual'
     
+    # Modo e pedidos de captura chegam por push (SSE); sem push, o canal volta a consultar a API
+    control = ControlChannel(args.server_url)
+    if not args.no_push_control:
+        control.start()
+    
     # Verificar modo inicial
     print("🔍 Verificando modo inicial...")
     initial_mode = check_operation_mode(args.server_url)
@@ -435,20 +839,26 @@ def main():
         print(f"✅ Modo inicial: {initial_mode.upper()} (auto={auto_mode})\n")
     else:
         print("⚠️  Não foi possível verificar modo inicial, usando padrão: MANUAL\n")
+    control.set_capture_enabled(not auto_mode)
     
     try:
         while True:
-            # Verificar modo de operação a cada 2 segundos
-            current_time_check = time()
-            if current_time_check - last_mode_check > 2:
-                api_mode = check_operation_mode(args.server_url)
-                if api_mode and api_mode != current_mode:
-                    current_mode = api_mode
-                    auto_mode = (api_mode == 'realtime')
-                    print(f"\n🔄 Modo alterado via API: {api_mode.upper()} (auto={auto_mode})\n")
-                last_mode_check = current_time_check
+            # Modo de operação (push ou, sem push, consultado a cada 2 segundos)
+            api_mode = control.mode()
+            if api_mode and api_mode != current_mode:
+                current_mode = api_mode
+                auto_mode = (api_mode == 'realtime')
+                print(f"\n🔄 Modo alterado via API: {api_mode.upper()} (auto={auto_mode})\n")
+                control.set_capture_enabled(not auto_mode)
             
-            ret, frame = cap.read()
+            # Modo manual sem interface: só drena o buffer, decodifica quando houver captura
+            decode_on_demand = args.headless and not auto_mode
+            
+            if decode_on_demand:
+                ret = cap.grab()
+                frame = None
+            else:
+                ret, frame = cap.read()
             
             if not ret:
                 print("❌ Erro ao capturar frame")
@@ -476,7 +886,7 @@ def main():
             
             # Modo manual: verifica se app solicitou captura
             if not auto_mode:
-                if check_manual_capture_request(args.server_url):
+                if control.capture_requested():
                     should_capture = True
                     print("📱 Captura solicitada pelo app")
             
@@ -489,11 +899,18 @@ def main():
                 elif key == ord('a'):
                     auto_mode = not auto_mode
                     print(f"\n🔄 Modo {'AUTOMÁTICO' if auto_mode else 'MANUAL'} ativado\n")
+                    control.set_capture_enabled(not auto_mode)
                 elif key == ord('c') or key == 32:
                     should_capture = True
             else:
-                # Em headless mode, aguardar menos em modo manual para resposta rápida
-                sleep(0.05 if not auto_mode else 0.1)
+                # Em headless mode, aguardar menos em modo manual; um evento do servidor acorda antes
+                control.wait(0.05 if not auto_mode else 0.1)
+            
+            if should_capture and frame is None:
+                ret, frame = cap.snapshot()
+                if not ret:
+                    print("❌ Erro ao capturar frame sob demanda")
+                    continue
             
             if should_capture:
                 capture_count += 1
@@ -506,80 +923,121 @@ def main():
                 description_pt = ""
                 description_kz = ""
                 
-                # YOLO Detection
+                capture_id = uuid.uuid4().hex[:12]
+                yolo_future = None
+                kaz_future = None
+                signature = None
                 if args.mode in ['yolo-only', 'both'] and yolo_available:
                     print("🎯 Executando detecção YOLO...")
-                    yolo_start = time()
-                    detections = detect_yolo(frame)
-                    yolo_time = time() - yolo_start
+                    yolo_future = executor.submit(run_yolo, frame)
+                # Com o gate ativo (capturas automáticas) o Kaz só roda depois de o YOLO dizer que a cena mudou
+                use_gate = change_gate is not None and auto_mode and yolo_future is not None
+                if args.mode in ['kaz-only', 'both'] and not use_gate:
+                    print("🤖 Gerando descrição...")
+                    kaz_future = executor.submit(caption_kaz, frame)
+                
+                # YOLO Detection
+                if yolo_future is not None:
+                    detections, yolo_time = yolo_future.result()
                     
                     if detections:
                         yolo_objects = [d['class'] for d in detections]
                         yolo_confidence = sum(d['confidence'] for d in detections) / len(detections)
                         
-                        print(f"🎯 YOLO detectou {len(detections)} objetos em {yolo_time:.2f}s:")
+                        print(f"🎯 YOLO detectou {len(detections)} objetos em {yolo_time:.2f}s "
+                              f"(invoke {yolo_detector.last_latency_ms:.1f}ms):")
                         for det in detections:
                             print(f"   - {det['class']}: {det['confidence']:.2f}")
-                
-                # Descrição em linguagem natural (modelo gera em inglês)
-                if args.mode in ['kaz-only', 'both']:
-                    print("🤖 Gerando descrição...")
-                    caption_en, caption_pt, gen_time, trans_time = generate_caption_kaz(frame)
                     
-                    description_kz = caption_en  # Mantém compatibilidade com backend
-                    description_pt = caption_pt
-                    
-                    print(f"📝 Inglês: {caption_en}")
-                    print(f"📝 Português: {caption_pt}")
-                    print(f"⏱️  Tempo: geração {gen_time:.2f}s | tradução {trans_time:.2f}s")
+                    if change_gate is not None:
+                        signature = change_gate.signature([d['class_en'] for d in detections],
+                                                          [d['bbox'] for d in detections])
                 
-                # Combinar resultados
-                if args.mode == 'yolo-only':
-                    # Usar apenas YOLO
-                    final_objects = yolo_objects
-                    final_confidence = yolo_confidence
-                    if yolo_objects:
-                        description_pt = f"Detectado: {', '.join(yolo_objects)}"
-                        description_kz = description_pt
-                    else:
-                        description_pt = "Nenhum objeto detectado"
-                        description_kz = description_pt
-                        
-                elif args.mode == 'kaz-only':
-                    # Usar apenas Kaz
-                    final_objects = [word for word in description_pt.lower().split() 
-                                    if len(word) > 3 and word not in ['para', 'está', 'sobre', 'perto', 'sendo']][:5]
-                    final_confidence = 0.85
-                    
-                else:  # both
-                    # Combinar YOLO + Kaz
-                    final_objects = list(set(yolo_objects))  # Remover duplicatas do YOLO
-                    final_confidence = yolo_confidence if yolo_objects else 0.85
+                if use_gate:
+                    publish, reason = change_gate.check(signature)
+                    if not publish:
+                        print(f"⏭️  Cena sem mudança, pulando legenda e envio ({change_gate.stats()})")
+                        print(f"{'='*60}\n")
+                        continue
+                    print(f"🔁 Gate: {reason}")
+                    if args.mode == 'both':
+                        print("🤖 Gerando descrição...")
+                        kaz_future = executor.submit(caption_kaz, frame)
+                
+                # Legenda lenta: publica os objetos do YOLO antes e envia o resultado completo depois
+                if (kaz_future is not None and yolo_objects and args.early_publish >= 0
+                        and not wait([kaz_future], timeout=args.early_publish).done):
+                    early_description = f"Detectado: {', '.join(yolo_objects)}"
+                    print("📤 Legenda ainda em andamento, publicando objetos do YOLO...")
+                    send_to_server(
+                        args.server_url,
+                        early_description,
+                        early_description,
+                        list(dict.fromkeys(yolo_objects))[:10],
+                        yolo_confidence,
+                        source_label,
+                        capture_id=capture_id,
+                        stage='partial'
+                    )
+                
+                # Descrição em linguagem natural (modelo gera em cazaque)
+                pending_translation = None
+                if kaz_future is not None:
+                    caption_kz, caption_pt, gen_time, cache_keys = kaz_future.result()
+                    print(f"📝 Cazaque: {caption_kz}")
+                    print(f"⏱️  Tempo: geração {gen_time:.2f}s")
                     
-                    # Se Kaz detectou algo diferente, adicionar
-                    kaz_words = [word for word in description_pt.lower().split() 
-                                if len(word) > 3 and word not in ['para', 'está', 'sobre', 'perto', 'sendo']]
+                    if caption_pt is None and translation_executor is not None:
+                        # Publica já a legenda original + objetos; a tradução segue em segundo plano
+                        pending_translation = (caption_kz, cache_keys)
+                        if yolo_objects:
+                            caption_pt = f"Detectado: {', '.join(yolo_objects)}"
+                        else:
+                            caption_pt = caption_kz
+                    elif caption_pt is None:
+                        caption_pt, trans_time = finish_translation(caption_kz, cache_keys)
+                        print(f"⏱️  Tempo: tradução {trans_time:.2f}s")
                     
-                    for word in kaz_words[:3]:
-                        if word not in [obj.lower() for obj in final_objects]:
-                            final_objects.append(word)
+                    description_kz = caption_kz  # Mantém compatibilidade com backend
+                    description_pt = caption_pt
+                    if pending_translation is None:
+                        print(f"📝 Português: {caption_pt}")
                 
-                # Limitar objetos
-                final_objects = final_objects[:10]
+                description_pt, description_kz, final_objects, final_confidence = combine_results(
+                    args.mode, yolo_objects, yolo_confidence, description_pt, description_kz
+                )
+                if pending_translation is not None:
+                    # As palavras da legenda só entram nos objetos depois da tradução
+                    final_objects = list(dict.fromkeys(yolo_objects))[:10]
                 
                 print(f"\n📦 Objetos finais: {final_objects}")
                 print(f"🎯 Confiança: {final_confidence:.2f}")
                 
                 # Enviar para servidor
-                print("\n📤 Enviando para servidor...")
+                stage = 'partial' if pending_translation is not None else 'final'
+                print(f"\n📤 Enviando para servidor ({stage})...")
                 send_to_server(
                     args.server_url,
                     description_pt,
                     description_kz,
                     final_objects,
                     final_confidence,
-                    source_label
+                    source_label,
+                    capture_id=capture_id,
+                    stage=stage
                 )
+                if signature is not None:
+                    change_gate.mark_published(signature)
+                
+                if pending_translation is not None:
+                    print(f"🌐 Tradução em segundo plano [{capture_id}]")
+                    translation_executor.submit(
+                        publish_translation, args.server_url, source_label, capture_id, args.mode,
+                        pending_translation[0], pending_translation[1], yolo_objects, yolo_confidence
+                    )
+                
+                if capture_count == 1:
+                    print(f"⏱️  Primeira captura concluída {time() - process_start:.2f}s após o início do processo")
                 
                 print(f"{'='*60}\n")
                 
@@ -587,9 +1045,38 @@ def main():
         print("\n⚠️  Interrompido pelo usuário")
     
     finally:
+        control.close()
+        print(f"📡 Canal de controle: {control.stats()}")
+        print(f"🌐 HTTP servidor: {get_client(args.server_url).latency_stats()}")
+        executor.shutdown(wait=False)
+        if translation_executor is not None:
+            # Deixa as traduções já enfileiradas terminarem para a última captura não ficar sem versão final
+            translation_executor.shutdown(wait=True)
+        if publisher is not None:
+            publisher.close()
+            print(f"📤 Publicador: {publisher.stats()}")
+        if detection_socket is not None:
+            detection_socket.close()
+            print(f"🔌 WebSocket de detecções: {detection_socket.stats()}")
+        if delta_encoder is not None:
+            print(f"🔁 Delta: {delta_encoder.stats()}")
         cap.release()
         if not args.headless:
             cv2.destroyAllWindows()
+        if caption_cache is not None:
+            caption_cache.save()
+            print(f"💾 Cache de legendas: {caption_cache.stats()}")
+        if embedding_cache is not None:
+            print(f"🧠 Cache semântico: {embedding_cache.stats()}")
+        if translator is not None:
+            print(f"🌐 Tradução: {translator.stats()}")
+            translator.close()
+        if translation_cache is not None:
+            translation_cache.close()
+        if yolo_detector is not None:
+            print(f"🎯 Latência YOLO: {yolo_detector.latency_stats()}")
+        if change_gate is not None:
+            print(f"🔁 Gate de mudança: {change_gate.stats()}")
         print("\n✅ Programa finalizado.")
 
 if __name__ == "__main__":
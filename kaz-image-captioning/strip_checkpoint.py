@@ -0,0 +1,36 @@
+"""
+✂️  Gera um checkpoint de deploy a partir de um checkpoint de treino
+Mantém apenas os pesos do modelo (remove estado do otimizador, scheduler e data loader),
+reduzindo o tamanho do arquivo e permitindo carregamento com memory-map.
+
+Uso:
+    python strip_checkpoint.py --input checkpoints/kaz_model.pth --output checkpoints/kaz_model_deploy.pth
+    python strip_checkpoint.py --output checkpoints/kaz_model.safetensors   # requer safetensors
+"""
+import argparse
+import os
+
+from utils.saving_utils import save_deploy_checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remove estado de treino de um checkpoint')
+    parser.add_argument('--input', type=str, default='checkpoints/kaz_model.pth',
+                        help='Checkpoint de treino (default: checkpoints/kaz_model.pth)')
+    parser.add_argument('--output', type=str, default='checkpoints/kaz_model_deploy.pth',
+                        help='Destino (.pth ou .safetensors)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ Checkpoint não encontrado: {args.input}")
+        return
+
+    print(f"🔄 Lendo {args.input}...")
+    output = save_deploy_checkpoint(args.input, args.output)
+    size_in = os.path.getsize(args.input) / 1e6
+    size_out = os.path.getsize(output) / 1e6
+    print(f"✅ Checkpoint de deploy salvo em {output} ({size_in:.1f} MB → {size_out:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
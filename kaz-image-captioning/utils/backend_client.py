@@ -0,0 +1,154 @@
+"""
+Cliente HTTP compartilhado para o servidor Node.js (back-end).
+
+As chamadas eram requests.get/post soltos: cada uma abria uma conexão TCP nova, sem
+keep-alive, várias vezes por segundo, e para payloads minúsculos o handshake dominava o
+tempo. BackendClient mantém uma requests.Session com pool de conexões por servidor,
+timeouts separados de conexão/leitura e política de retry com backoff:
+
+  - falhas de conexão são repetidas para qualquer método (o pedido nem chegou a sair);
+  - erros de leitura e 502/503/504 só são repetidos em métodos idempotentes (GET), para
+    que um POST de detecção não seja publicado duas vezes.
+
+Cada chamada registra a latência por endpoint (método + caminho); latency_stats() resume
+contagem, erros, média e p95. get_client(url) devolve um cliente único por servidor, para
+que todas as funções de um script compartilhem o mesmo pool.
+"""
+import threading
+from collections import deque
+from time import perf_counter
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SEND_DESCRIPTION_PATH = '/api/esp32-cam/send-description'
+
+
+def server_base_url(url):
+    """'http://host:3000/api/esp32-cam/send-description' -> 'http://host:3000'"""
+    return url.rsplit('/api/', 1)[0].rstrip('/')
+
+
+class BackendClient:
+    """requests.Session com pool, timeouts, retry e latência por endpoint"""
+
+    def __init__(self, base_url, pool_size=4, connect_timeout=2.0, read_timeout=5.0,
+                 retries=2, backoff=0.3, window=200):
+        self.base_url = server_base_url(base_url)
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._window = window
+        self._latencies = {}
+        self._counts = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def url(self, path):
+        return path if path.startswith(('http://', 'https://')) else f"{self.base_url}{path}"
+
+    def _record(self, key, elapsed, failed):
+        with self._lock:
+            if key not in self._latencies:
+                self._latencies[key] = deque(maxlen=self._window)
+                self._counts[key] = 0
+                self._errors[key] = 0
+            self._counts[key] += 1
+            if failed:
+                self._errors[key] += 1
+            else:
+                self._latencies[key].append(elapsed)
+
+    def request(self, method, path, **kwargs):
+        """Como session.request(), com timeout padrão e latência registrada. Exceções propagam"""
+        kwargs.setdefault('timeout', self.timeout)
+        key = f"{method.upper()} {urlsplit(self.url(path)).path}"
+        start = perf_counter()
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(key, perf_counter() - start, True)
+            raise
+        self._record(key, perf_counter() - start, response.status_code >= 500)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    # ----- endpoints usados pelos scripts -----
+
+    def operation_mode(self):
+        """GET /api/operation-mode -> 'manual' | 'realtime' | None"""
+        try:
+            response = self.get('/api/operation-mode')
+            if response.status_code != 200:
+                return None
+            data = response.json()
+            return data.get('state', {}).get('mode') or data.get('mode')
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+
+    def capture_status(self):
+        """GET /api/esp32-cam/capture-status -> (capturar?, timestamp do pedido)"""
+        try:
+            response = self.get('/api/esp32-cam/capture-status')
+            if response.status_code == 200:
+                data = response.json()
+                return bool(data.get('shouldCapture', False)), data.get('timestamp', 0) or 0
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+        return False, 0
+
+    def send_description(self, payload, path=SEND_DESCRIPTION_PATH):
+        """POST da detecção; retorna a resposta (exceções de rede propagam)"""
+        return self.post(path, json=payload)
+
+    def latency_stats(self):
+        stats = {}
+        with self._lock:
+            for key, samples in self._latencies.items():
+                entry = {'calls': self._counts[key], 'errors': self._errors[key]}
+                if samples:
+                    ms = np.fromiter(samples, dtype=np.float64) * 1000.0
+                    entry['mean_ms'] = round(float(ms.mean()), 1)
+                    entry['p95_ms'] = round(float(np.percentile(ms, 95)), 1)
+                stats[key] = entry
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url, **kwargs):
+    """Cliente compartilhado por servidor (a URL pode incluir o caminho do endpoint)"""
+    base_url = server_base_url(url)
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = BackendClient(base_url, **kwargs)
+            _clients[base_url] = client
+        return client
@@ -0,0 +1,85 @@
+"""
+Fonte de frames com decodificação sob demanda.
+
+No modo manual os scripts só precisam de um frame quando o app pede uma captura. Em vez de
+chamar cap.read() (que decodifica o JPEG/H264) a cada iteração, o loop usa grab() para
+drenar o buffer sem decodificar e só faz retrieve() do frame mais recente quando a captura
+é solicitada. Para o ESP32-CAM é possível usar o endpoint de captura única do firmware
+(/capture na porta 80) e fechar o stream enquanto está ocioso.
+"""
+from urllib.parse import urlsplit, urlunsplit
+
+import cv2
+import numpy as np
+import requests
+
+
+def esp32_snapshot_url(stream_url):
+    """Converte a URL do stream do ESP32-CAM (porta 81, /stream) na URL de captura única"""
+    parts = urlsplit(stream_url)
+    host = parts.hostname or ''
+    netloc = host if parts.port in (None, 81) else f"{host}:{parts.port}"
+    return urlunsplit((parts.scheme or 'http', netloc, '/capture', '', ''))
+
+
+class FrameSource:
+    """Wrapper de cv2.VideoCapture com grab()/snapshot() para o modo manual"""
+
+    def __init__(self, source, snapshot_url=None, snapshot_timeout=3):
+        self.source = source
+        self.snapshot_url = snapshot_url
+        self.snapshot_timeout = snapshot_timeout
+        self.cap = cv2.VideoCapture(source)
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def _ensure_open(self):
+        if self.cap is None:
+            self.cap = cv2.VideoCapture(self.source)
+        return self.cap.isOpened()
+
+    def read(self):
+        """Lê e decodifica o próximo frame (modo automático / preview)"""
+        if not self._ensure_open():
+            return False, None
+        return self.cap.read()
+
+    def grab(self):
+        """Descarta frames do buffer sem decodificar (modo manual ocioso)"""
+        if self.snapshot_url:
+            # Com captura única não há stream para drenar: libera a conexão
+            self.pause()
+            return True
+        if not self._ensure_open():
+            return False
+        return self.cap.grab()
+
+    def snapshot(self):
+        """Obtém um único frame decodificado no momento da captura"""
+        if self.snapshot_url:
+            try:
+                response = requests.get(self.snapshot_url, timeout=self.snapshot_timeout)
+                if response.status_code == 200:
+                    frame = cv2.imdecode(np.frombuffer(response.content, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if frame is not None:
+                        return True, frame
+                print(f"⚠️  Captura única falhou (HTTP {response.status_code}), usando stream")
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️  Captura única falhou ({e}), usando stream")
+            return self.read()
+
+        if not self._ensure_open():
+            return False, None
+        if not self.cap.grab():
+            return False, None
+        return self.cap.retrieve()
+
+    def pause(self):
+        """Fecha o stream; ele é reaberto na próxima leitura"""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def release(self):
+        self.pause()
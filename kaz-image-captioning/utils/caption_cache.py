@@ -0,0 +1,200 @@
+"""
+Cache persistente de legendas indexado por hash perceptual (pHash) do frame pré-processado.
+
+O hash é calculado sobre a imagem 384x384 já redimensionada (a mesma que entra no modelo Kaz),
+de modo que lugares revisitados (casa, escritório, corredor) reaproveitam a legenda e a tradução
+sem rodar o modelo novamente. A busca por distância de Hamming usa um índice multi-hash
+(os 64 bits são divididos em blocos; pelo princípio da casa dos pombos, dois hashes a distância
+<= max_distance compartilham pelo menos um bloco idêntico).
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from time import time
+
+import numpy as np
+
+HASH_BITS = 64
+_DCT_SIZE = 32
+_LOW_FREQ = 8
+
+
+def _dct_matrix(n):
+    k = np.arange(n).reshape(-1, 1)
+    i = np.arange(n).reshape(1, -1)
+    mat = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    mat[0, :] = np.sqrt(1.0 / n)
+    return mat
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def perceptual_hash(img):
+    """Calcula o pHash de 64 bits de uma imagem (PIL ou array HxW / HxWx3)"""
+    gray = np.asarray(img.convert('L') if hasattr(img, 'convert') else img, dtype=np.float32)
+    if gray.ndim == 3:
+        gray = gray.mean(axis=2)
+
+    h, w = gray.shape
+    if h % _DCT_SIZE == 0 and w % _DCT_SIZE == 0:
+        # 384x384 -> 32x32 por média de blocos 12x12 (exato, sem interpolação)
+        small = gray.reshape(_DCT_SIZE, h // _DCT_SIZE, _DCT_SIZE, w // _DCT_SIZE).mean(axis=(1, 3))
+    else:
+        rows = np.linspace(0, h - 1, _DCT_SIZE).astype(np.int64)
+        cols = np.linspace(0, w - 1, _DCT_SIZE).astype(np.int64)
+        small = gray[np.ix_(rows, cols)]
+
+    coeffs = (_DCT @ small @ _DCT.T)[:_LOW_FREQ, :_LOW_FREQ].ravel()
+    # Ignora o coeficiente DC no cálculo da mediana (ele só mede o brilho médio)
+    bits = coeffs > np.median(coeffs[1:])
+    value = 0
+    for b in bits:
+        value = (value << 1) | int(b)
+    return value
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class CaptionCache:
+    """Cache LRU de legendas (Kaz + português) com busca por distância de Hamming"""
+
+    def __init__(self, path=None, max_entries=2000, max_distance=6, autosave_every=20):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.autosave_every = autosave_every
+
+        self.num_blocks = max_distance + 1
+        self.block_bits = HASH_BITS // self.num_blocks
+        self._block_mask = (1 << self.block_bits) - 1
+
+        self._entries = OrderedDict()
+        self._index = [dict() for _ in range(self.num_blocks)]
+        self._lock = threading.Lock()
+        self._dirty = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def _blocks(self, h):
+        return [(h >> (i * self.block_bits)) & self._block_mask for i in range(self.num_blocks)]
+
+    def _index_add(self, h):
+        for i, block in enumerate(self._blocks(h)):
+            self._index[i].setdefault(block, set()).add(h)
+
+    def _index_remove(self, h):
+        for i, block in enumerate(self._blocks(h)):
+            bucket = self._index[i].get(block)
+            if bucket is not None:
+                bucket.discard(h)
+                if not bucket:
+                    del self._index[i][block]
+
+    def lookup(self, h):
+        """Retorna (caption_kz, caption_pt) do vizinho mais próximo ou None"""
+        with self._lock:
+            best, best_dist = None, self.max_distance + 1
+            if h in self._entries:
+                best, best_dist = h, 0
+            else:
+                candidates = set()
+                for i, block in enumerate(self._blocks(h)):
+                    candidates.update(self._index[i].get(block, ()))
+                for cand in candidates:
+                    dist = hamming_distance(h, cand)
+                    if dist < best_dist:
+                        best, best_dist = cand, dist
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best)
+            entry = self._entries[best]
+            entry['last_used'] = time()
+            return entry['caption_kz'], entry['caption_pt']
+
+    def put(self, h, caption_kz, caption_pt):
+        with self._lock:
+            if h not in self._entries:
+                self._index_add(h)
+            self._entries[h] = {
+                'caption_kz': caption_kz,
+                'caption_pt': caption_pt,
+                'last_used': time()
+            }
+            self._entries.move_to_end(h)
+
+            while len(self._entries) > self.max_entries:
+                old_h, _ = self._entries.popitem(last=False)
+                self._index_remove(old_h)
+
+            self._dirty += 1
+            should_save = self.path and self._dirty >= self.autosave_every
+
+        if should_save:
+            self.save()
+
+    def save(self):
+        """Grava snapshot em disco (escrita atômica via arquivo temporário)"""
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = {
+                'max_distance': self.max_distance,
+                'entries': [
+                    {'hash': format(h, '016x'), **entry}
+                    for h, entry in self._entries.items()
+                ]
+            }
+            self._dirty = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Cache de legendas ignorado ({self.path}): {e}")
+            return
+
+        with self._lock:
+            # Entradas gravadas em ordem LRU (mais antiga primeiro)
+            for item in snapshot.get('entries', [])[-self.max_entries:]:
+                h = int(item['hash'], 16)
+                if h not in self._entries:
+                    self._index_add(h)
+                self._entries[h] = {
+                    'caption_kz': item['caption_kz'],
+                    'caption_pt': item['caption_pt'],
+                    'last_used': item.get('last_used', 0)
+                }
+        print(f"✅ Cache de legendas carregado: {len(self._entries)} entradas")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
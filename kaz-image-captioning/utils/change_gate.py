@@ -0,0 +1,57 @@
+"""
+Gate de mudança de cena baseado nas detecções YOLO.
+
+Cada captura vira uma assinatura: o multiconjunto de (classe, célula de uma grade grossa
+onde cai o centro da caixa). Se a assinatura é igual à da última publicação, nada de
+relevante mudou e a captura pode pular legenda, tradução e envio. Depois de max_age
+segundos sem publicar, a próxima captura é enviada de qualquer forma (refresh forçado).
+"""
+from collections import Counter
+from time import time
+
+import numpy as np
+
+
+class DetectionChangeGate:
+    """Compara o conjunto de objetos (classe + posição grossa) com o último publicado"""
+
+    def __init__(self, grid=3, max_age=30.0):
+        self.grid = grid
+        self.max_age = max_age
+        self.last_signature = None
+        self.last_published = 0.0
+
+        self.published = 0
+        self.skipped = 0
+
+    def signature(self, classes, boxes):
+        """Assinatura de classes + caixas xyxy normalizadas (0..1)"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if boxes.shape[0] == 0:
+            return frozenset()
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2.0
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2.0
+        col = np.clip((cx * self.grid).astype(np.int64), 0, self.grid - 1)
+        row = np.clip((cy * self.grid).astype(np.int64), 0, self.grid - 1)
+        cells = Counter(zip(list(classes), (row * self.grid + col).tolist()))
+        return frozenset(cells.items())
+
+    def check(self, signature, now=None):
+        """Retorna (publicar?, motivo)"""
+        now = time() if now is None else now
+        if self.last_signature is None:
+            return True, 'primeira captura'
+        if signature != self.last_signature:
+            return True, 'cena mudou'
+        if now - self.last_published >= self.max_age:
+            return True, f'refresh após {self.max_age:.0f}s'
+        self.skipped += 1
+        return False, 'sem mudança'
+
+    def mark_published(self, signature, now=None):
+        self.last_signature = signature
+        self.last_published = time() if now is None else now
+        self.published += 1
+
+    def stats(self):
+        return {'published': self.published, 'skipped': self.skipped}
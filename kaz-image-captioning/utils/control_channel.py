@@ -0,0 +1,215 @@
+"""
+Canal de controle servidor -> câmera (modo de operação e pedidos de captura).
+
+Em vez de consultar /api/operation-mode a cada 2s e /api/esp32-cam/capture-status várias
+vezes por segundo, o cliente abre uma única conexão SSE em /api/stream/events e reage aos
+eventos 'mode-change' e 'capture-request'. O servidor manda um 'ping' a cada 30s, então
+uma conexão sem dados por read_timeout segundos é considerada morta e reaberta com backoff.
+
+Enquanto o push não está disponível (servidor antigo, proxy que bufferiza, rede caindo),
+mode() e capture_requested() voltam a consultar os endpoints HTTP, com intervalo limitado.
+Pedidos de captura trazem o timestamp do servidor: o mesmo pedido visto pelo push e depois
+pela consulta (a flag do servidor só é limpa por quem consulta) é processado uma vez só.
+Pedidos que chegam em modo automático (realtime, ou capturas desligadas pelo script com
+set_capture_enabled) são descartados, e a fila de pedidos é zerada a cada troca de modo:
+ao voltar para o manual nada é capturado sem um pedido novo.
+As consultas e o stream usam o pool de conexões do BackendClient do servidor.
+"""
+import json
+import threading
+from time import time
+
+from utils.backend_client import get_client
+
+
+class ControlChannel:
+    """Assinatura SSE de modo/captura com fallback para polling"""
+
+    def __init__(self, server_url, mode_interval=2.0, capture_interval=0.5,
+                 reconnect_delay=1.0, max_reconnect_delay=30.0, read_timeout=75.0, client=None):
+        self.client = client or get_client(server_url)
+        self.base_url = self.client.base_url
+        self.mode_interval = mode_interval
+        self.capture_interval = capture_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.read_timeout = read_timeout
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._response = None
+        self._thread = None
+
+        self._connected = False
+        self._mode = None
+        self._pending_captures = 0
+        self._capture_enabled = True
+        self._last_capture_ts = 0
+        self._last_mode_poll = 0.0
+        self._last_capture_poll = 0.0
+
+        self.events = 0
+        self.reconnects = 0
+        self.polls = 0
+
+    @property
+    def connected(self):
+        return self._connected
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='canal-controle', daemon=True)
+        self._thread.start()
+        return self
+
+    # ----- lado do loop de captura -----
+
+    def mode(self):
+        """Modo atual: o último recebido por push ou, sem push, consultado a cada mode_interval"""
+        if not self._connected:
+            now = time()
+            if now - self._last_mode_poll >= self.mode_interval:
+                self._last_mode_poll = now
+                self.polls += 1
+                mode = self.client.operation_mode()
+                if mode:
+                    self._set_mode(mode)
+        return self._mode
+
+    def _set_mode(self, mode):
+        with self._lock:
+            if mode != self._mode:
+                self._pending_captures = 0
+            self._mode = mode
+
+    def set_capture_enabled(self, enabled):
+        """Liga/desliga os pedidos de captura (ex.: modo automático local); zera os pendentes"""
+        with self._lock:
+            self._capture_enabled = enabled
+            self._pending_captures = 0
+
+    def capture_requested(self):
+        """True uma vez para cada pedido de captura (push ou consulta)"""
+        with self._lock:
+            if self._pending_captures:
+                self._pending_captures -= 1
+                return True
+        if self._connected:
+            return False
+
+        now = time()
+        if now - self._last_capture_poll < self.capture_interval:
+            return False
+        self._last_capture_poll = now
+        self.polls += 1
+        requested, timestamp = self.client.capture_status()
+        with self._lock:
+            if not requested or (timestamp and timestamp <= self._last_capture_ts):
+                return False
+            self._last_capture_ts = max(self._last_capture_ts, timestamp)
+        return True
+
+    def wait(self, timeout):
+        """Dorme até timeout ou até chegar um evento (substitui o sleep fixo do loop)"""
+        woke = self._wakeup.wait(timeout)
+        self._wakeup.clear()
+        return woke
+
+    # ----- thread do SSE -----
+
+    def _dispatch(self, event, data):
+        try:
+            payload = json.loads(data) if data else {}
+        except ValueError:
+            return
+        self.events += 1
+        if event == 'mode-change':
+            mode = payload.get('mode')
+            if mode:
+                self._set_mode(mode)
+                self._wakeup.set()
+        elif event == 'capture-request':
+            timestamp = payload.get('timestamp', 0) or 0
+            with self._lock:
+                if timestamp and timestamp <= self._last_capture_ts:
+                    return
+                # Marca como visto mesmo quando descartado, para a consulta não ressuscitar o pedido
+                self._last_capture_ts = max(self._last_capture_ts, timestamp)
+                if not self._capture_enabled or self._mode == 'realtime':
+                    return
+                self._pending_captures += 1
+            self._wakeup.set()
+
+    def _listen(self):
+        response = self.client.session.get(self.client.url('/api/stream/events'), stream=True,
+                                           headers={'Accept': 'text/event-stream'},
+                                           timeout=(5, self.read_timeout))
+        response.raise_for_status()
+        if 'text/event-stream' not in response.headers.get('Content-Type', ''):
+            response.close()
+            raise ConnectionError('resposta não é um stream SSE')
+        # Sem charset no Content-Type o requests assumiria ISO-8859-1; SSE é sempre UTF-8
+        response.encoding = 'utf-8'
+        self._response = response
+
+        event, data = 'message', []
+        with response:
+            # chunk_size=1: com o padrão (512) o requests segura eventos pequenos até encher o bloco
+            for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+                if self._stop.is_set():
+                    break
+                if not self._connected:
+                    # Só conta como conectado depois do primeiro evento recebido
+                    self._connected = True
+                    print(f"📡 Canal de controle conectado (push): {self.base_url}")
+                if line is None:
+                    continue
+                if not line:
+                    if data:
+                        self._dispatch(event, '\n'.join(data))
+                    event, data = 'message', []
+                elif line.startswith(':'):
+                    continue
+                elif line.startswith('event:'):
+                    event = line[6:].strip()
+                elif line.startswith('data:'):
+                    data.append(line[5:].lstrip())
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            started = time()
+            try:
+                self._listen()
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"⚠️  Canal de controle indisponível ({e}), usando consulta periódica")
+            finally:
+                was_connected = self._connected
+                self._connected = False
+                self._response = None
+            if self._stop.is_set():
+                break
+            if was_connected:
+                self.reconnects += 1
+            # Conexão que durou é sinal de servidor saudável: volta ao atraso mínimo
+            if time() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def stats(self):
+        return {'push': self._connected, 'events': self.events,
+                'reconnects': self.reconnects, 'polls': self.polls}
+
+    def close(self):
+        self._stop.set()
+        self._wakeup.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=2)
@@ -0,0 +1,101 @@
+"""
+Codificação por delta das detecções publicadas.
+
+Em cena parada o publicador mandava a mesma descrição e a mesma lista de objetos a cada
+captura, e o servidor retransmitia tudo para cada app. Com o DeltaEncoder cada publicador
+vira um stream com número de sequência e cada mensagem é de um de três tipos:
+
+  - snapshot: payload completo (primeira mensagem, a cada snapshot_every mensagens e sempre
+    que o servidor pedir);
+  - delta: só os objetos que apareceram (added) ou sumiram (removed) e as descrições que
+    mudaram;
+  - same: nada mudou; funciona como heartbeat e o servidor não retransmite.
+
+Campos fora do conteúdo (source, capture_id, stage, confidence) vão em toda mensagem. O
+servidor reconstrói o estado por stream; se a sequência tiver um buraco ele responde
+pedindo snapshot (HTTP 409 ou 'snapshot-request' no WebSocket). O estado só avança com
+commit(), depois de um envio bem-sucedido, então uma nova tentativa reenvia a mesma
+sequência em vez de abrir um buraco.
+
+O delta é opcional (--delta no unified) e só entra em uso depois que o servidor anuncia
+suporte ('delta': true no hello do WebSocket ou na resposta do POST); antes disso, e com
+servidores antigos, as detecções vão completas.
+"""
+import threading
+from collections import Counter
+
+CONTENT_FIELDS = ('description_pt', 'description_kz', 'objects')
+
+
+class SnapshotRequired(Exception):
+    """O servidor perdeu a sequência do stream e precisa de um snapshot"""
+
+
+class DeltaEncoder:
+    """Gera mensagens snapshot/delta/same com número de sequência para um stream"""
+
+    def __init__(self, stream_id, snapshot_every=50):
+        self.stream_id = stream_id
+        self.snapshot_every = snapshot_every
+        self.seq = 0
+        self._last = None
+        self._since_snapshot = 0
+        self._force_snapshot = True
+        self._lock = threading.Lock()
+
+        self.counts = Counter()
+
+    def request_snapshot(self):
+        """A próxima mensagem sai completa (pedido do servidor ou reconexão)"""
+        with self._lock:
+            self._force_snapshot = True
+
+    def encode(self, payload):
+        """Monta a mensagem para o payload, sem alterar o estado do stream"""
+        message = {key: value for key, value in payload.items() if key not in CONTENT_FIELDS}
+        with self._lock:
+            message['stream'] = self.stream_id
+            message['seq'] = self.seq + 1
+            last = self._last
+            snapshot = (last is None or self._force_snapshot or
+                        (self.snapshot_every and self._since_snapshot >= self.snapshot_every))
+
+        if snapshot:
+            message['kind'] = 'snapshot'
+            for key in CONTENT_FIELDS:
+                if key in payload:
+                    message[key] = payload[key]
+            return message
+
+        old_objects = Counter(last.get('objects') or [])
+        new_objects = Counter(payload.get('objects') or [])
+        added = list((new_objects - old_objects).elements())
+        removed = list((old_objects - new_objects).elements())
+        changed = {key: payload[key] for key in ('description_pt', 'description_kz')
+                   if key in payload and payload[key] != last.get(key)}
+
+        if not added and not removed and not changed:
+            message['kind'] = 'same'
+            return message
+        message['kind'] = 'delta'
+        if added:
+            message['added'] = added
+        if removed:
+            message['removed'] = removed
+        message.update(changed)
+        return message
+
+    def commit(self, message, payload):
+        """Confirma o envio de message (gerada de payload): avança a sequência e o estado"""
+        with self._lock:
+            self.seq = message['seq']
+            self._last = {key: payload.get(key) for key in CONTENT_FIELDS}
+            if message['kind'] == 'snapshot':
+                self._since_snapshot = 0
+                self._force_snapshot = False
+            else:
+                self._since_snapshot += 1
+            self.counts[message['kind']] += 1
+
+    def stats(self):
+        return {'stream': self.stream_id, 'seq': self.seq, **dict(self.counts)}
@@ -0,0 +1,112 @@
+"""
+Agendamento do detector: YOLO completo a cada N frames, tracks propagados no meio.
+
+Entre duas execuções do detector, as caixas dos tracks são deslocadas com fluxo óptico
+esparso (cv2.calcOpticalFlowPyrLK) sobre uma grade de pontos dentro de cada caixa, numa
+versão reduzida do frame em tons de cinza. N se adapta à latência medida do detector: se
+o invoke() custa 3 frames de orçamento, o detector roda a cada 3 frames. Movimento forte
+na cena (fração global da máscara do MOG2) força uma detecção imediata.
+"""
+import math
+import warnings
+
+import cv2
+import numpy as np
+
+_LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+_GRID = np.linspace(0.2, 0.8, 3, dtype=np.float32)
+
+
+class DetectionScheduler:
+    """Decide em quais frames o detector completo deve rodar"""
+
+    def __init__(self, frame_budget_ms=33.0, min_interval=1, max_interval=8,
+                 motion_threshold=0.25, ema_alpha=0.2):
+        self.frame_budget_ms = frame_budget_ms
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.motion_threshold = motion_threshold
+        self.ema_alpha = ema_alpha
+
+        self.latency_ms = None
+        self.frames_since_detect = None
+        self.forced = 0
+
+    @property
+    def interval(self):
+        if self.latency_ms is None:
+            return self.min_interval
+        n = math.ceil(self.latency_ms / max(self.frame_budget_ms, 1e-3))
+        return int(min(self.max_interval, max(self.min_interval, n)))
+
+    def should_detect(self, scene_motion=0.0):
+        """Chamado uma vez por frame; retorna True quando o detector deve rodar"""
+        if self.frames_since_detect is None or self.frames_since_detect + 1 >= self.interval:
+            self.frames_since_detect = 0
+            return True
+        if scene_motion >= self.motion_threshold:
+            self.forced += 1
+            self.frames_since_detect = 0
+            return True
+        self.frames_since_detect += 1
+        return False
+
+    def record_latency(self, latency_ms):
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += self.ema_alpha * (latency_ms - self.latency_ms)
+
+
+class FlowPropagator:
+    """Desloca caixas normalizadas [x1, y1, x2, y2] com Lucas-Kanade entre frames consecutivos"""
+
+    def __init__(self, width=320):
+        self.width = width
+        self.prev_gray = None
+
+    def _gray(self, frame):
+        h, w = frame.shape[:2]
+        if w > self.width:
+            frame = cv2.resize(frame, (self.width, max(1, int(round(h * self.width / w)))),
+                               interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def reset(self, frame):
+        """Guarda o frame de referência (chamado nos frames em que o detector roda)"""
+        self.prev_gray = self._gray(frame)
+
+    def propagate(self, frame, boxes):
+        """Retorna as caixas deslocadas pelo deslocamento mediano dos pontos de cada caixa"""
+        gray = self._gray(frame)
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        prev, self.prev_gray = self.prev_gray, gray
+        if prev is None or boxes.shape[0] == 0 or prev.shape != gray.shape:
+            return boxes
+
+        h, w = gray.shape
+        gx, gy = np.meshgrid(_GRID, _GRID)
+        gx, gy = gx.ravel(), gy.ravel()
+        per_box = gx.size
+        px = (boxes[:, 0:1] + (boxes[:, 2:3] - boxes[:, 0:1]) * gx) * w
+        py = (boxes[:, 1:2] + (boxes[:, 3:4] - boxes[:, 1:2]) * gy) * h
+        points = np.stack([px.ravel(), py.ravel()], axis=1).astype(np.float32).reshape(-1, 1, 2)
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(prev, gray, points, None, **_LK_PARAMS)
+        if new_points is None:
+            return boxes
+
+        delta = (new_points - points).reshape(-1, per_box, 2)
+        good = status.reshape(-1, per_box).astype(bool)
+        delta = np.where(good[..., None], delta, np.nan)
+        with warnings.catch_warnings():
+            # Caixas sem nenhum ponto rastreado ficam paradas (mediana NaN -> 0)
+            warnings.simplefilter('ignore', RuntimeWarning)
+            shift = np.nanmedian(delta, axis=1)
+        shift = np.nan_to_num(shift) / np.array([w, h], dtype=np.float32)
+
+        moved = boxes.copy()
+        moved[:, [0, 2]] += shift[:, 0:1]
+        moved[:, [1, 3]] += shift[:, 1:2]
+        return np.clip(moved, 0.0, 1.0)
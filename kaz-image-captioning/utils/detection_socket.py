@@ -0,0 +1,283 @@
+"""
+Canal WebSocket persistente para publicar detecções no back-end (/esp32-cam).
+
+Cada detecção era um POST completo (cabeçalhos HTTP, JSON, resposta). Aqui uma única
+conexão fica aberta e cada detecção vira um frame:
+
+  - na conexão o cliente manda 'identify' (JSON) com as codificações que entende. Um
+    servidor novo responde 'hello' escolhendo msgpack; um servidor antigo não conhece
+    'hello' e o canal continua em JSON, que ele já aceitava;
+  - em msgpack o frame é binário: 1 byte de flags + corpo msgpack. Corpos maiores que
+    compress_threshold vão comprimidos com zlib (flag 0x01), o que compensa nas legendas
+    longas e não custa nada nas mensagens pequenas;
+  - sem tráfego por heartbeat_interval segundos o cliente manda 'heartbeat', que mantém a
+    câmera marcada como conectada no servidor e detecta conexões mortas;
+  - a conexão cai e volta sozinha (backoff exponencial). Enquanto está fora,
+    send_detection() retorna False e quem chama usa o POST HTTP;
+  - o 'hello' também diz se o servidor aceita detecções por delta ('delta': true). Sem isso
+    (servidor antigo ou sem 'hello') delta_supported fica False e quem chama manda o payload
+    completo. Um 'snapshot-request' ou um frame 'error' do servidor chama on_snapshot_request,
+    para a próxima mensagem sair completa.
+
+msgpack e websocket-client são opcionais: sem eles o canal não conecta e tudo segue por HTTP.
+"""
+import json
+import threading
+import zlib
+from time import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
+FLAG_ZLIB = 0x01
+
+
+def encode_frame(message, compress_threshold=512):
+    """dict -> bytes (flags + msgpack, comprimido se grande)"""
+    body = msgpack.packb(message, use_bin_type=True)
+    flags = 0
+    if compress_threshold is not None and len(body) > compress_threshold:
+        compressed = zlib.compress(body, 6)
+        if len(compressed) < len(body):
+            body = compressed
+            flags |= FLAG_ZLIB
+    return bytes([flags]) + body
+
+
+def decode_frame(data):
+    """bytes -> dict (inverso de encode_frame)"""
+    flags, body = data[0], data[1:]
+    if flags & FLAG_ZLIB:
+        body = zlib.decompress(body)
+    return msgpack.unpackb(body, raw=False)
+
+
+def websocket_url(server_url, path='/esp32-cam'):
+    base = server_url.rsplit('/api/', 1)[0].rstrip('/')
+    return base.replace('https://', 'wss://').replace('http://', 'ws://') + path
+
+
+class DetectionSocket:
+    """WebSocket com reconexão automática, msgpack negociado e fallback para JSON"""
+
+    def __init__(self, server_url, device_id='UNIFIED-PYTHON', path='/esp32-cam', use_msgpack=True,
+                 compress_threshold=512, heartbeat_interval=15.0, reconnect_delay=1.0,
+                 max_reconnect_delay=30.0, hello_timeout=2.0, on_snapshot_request=None):
+        self.url = websocket_url(server_url, path)
+        self.device_id = device_id
+        self.use_msgpack = use_msgpack and msgpack is not None
+        self.compress_threshold = compress_threshold
+        self.heartbeat_interval = heartbeat_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.hello_timeout = hello_timeout
+        self.on_snapshot_request = on_snapshot_request
+
+        self.encoding = 'json'
+        self.delta = False
+        self.mode = None
+        self._ws = None
+        self._connected = False
+        self._send_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_sent = 0.0
+
+        self.frames = 0
+        self.bytes_sent = 0
+        self.json_bytes = 0
+        self.compressed = 0
+        self.reconnects = 0
+        self.send_errors = 0
+        self.rejected = 0
+
+    @property
+    def available(self):
+        return websocket is not None
+
+    @property
+    def connected(self):
+        return self._connected
+
+    @property
+    def delta_supported(self):
+        return self._connected and self.delta
+
+    def start(self):
+        if not self.available:
+            print("⚠️  websocket-client não instalado: detecções seguem por HTTP")
+            return self
+        self._thread = threading.Thread(target=self._run, name='detection-socket', daemon=True)
+        self._thread.start()
+        return self
+
+    # ----- envio -----
+
+    def _send(self, message):
+        """Envia uma mensagem na codificação negociada. Levanta exceção se a conexão falhar"""
+        text = json.dumps(message, ensure_ascii=False)
+        with self._send_lock:
+            ws = self._ws
+            if ws is None or not self._connected:
+                raise ConnectionError('WebSocket desconectado')
+            if self.encoding == 'msgpack':
+                frame = encode_frame(message, self.compress_threshold)
+                ws.send(frame, opcode=websocket.ABNF.OPCODE_BINARY)
+                if frame[0] & FLAG_ZLIB:
+                    self.compressed += 1
+                self.bytes_sent += len(frame)
+            else:
+                ws.send(text)
+                self.bytes_sent += len(text.encode('utf-8'))
+            self.json_bytes += len(text.encode('utf-8'))
+            self._last_sent = time()
+
+    def send_detection(self, payload):
+        """Publica uma detecção. False se o canal não está disponível (use o HTTP)"""
+        if not self._connected:
+            return False
+        message = {'type': 'detection', **payload, 'timestamp': int(time() * 1000)}
+        try:
+            self._send(message)
+        except Exception as e:
+            self.send_errors += 1
+            print(f"⚠️  WebSocket: falha ao enviar ({e}), reconectando")
+            self._drop()
+            return False
+        self.frames += 1
+        return True
+
+    # ----- conexão -----
+
+    def _drop(self):
+        self._connected = False
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def _handle_text(self, text):
+        """Mensagens do servidor: hello (negociação), mode-sync, snapshot-request, error; acks textuais são ignorados"""
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(message, dict):
+            return None
+        if message.get('type') == 'mode-sync' and message.get('mode'):
+            self.mode = message['mode']
+        elif message.get('type') in ('snapshot-request', 'error'):
+            if message.get('type') == 'error':
+                self.rejected += 1
+                print(f"⚠️  WebSocket: servidor rejeitou a mensagem ({message.get('message')})")
+            if self.on_snapshot_request is not None:
+                self.on_snapshot_request(message)
+        return message
+
+    def _negotiate(self, ws):
+        encodings = (['msgpack'] if self.use_msgpack else []) + ['json']
+        ws.send(json.dumps({
+            'type': 'identify',
+            'deviceId': self.device_id,
+            'encodings': encodings,
+            'compression': ['zlib'],
+            'timestamp': int(time() * 1000)
+        }))
+        # Espera o 'hello'; um servidor antigo só manda mode-sync e o ack textual do identify
+        deadline = time() + self.hello_timeout
+        ws.settimeout(self.hello_timeout)
+        while time() < deadline:
+            try:
+                data = ws.recv()
+            except websocket.WebSocketTimeoutException:
+                break
+            if isinstance(data, bytes):
+                continue
+            message = self._handle_text(data)
+            if message is not None and message.get('type') == 'hello':
+                self.delta = bool(message.get('delta'))
+                encoding = message.get('encoding', 'json')
+                return encoding if encoding in encodings else 'json'
+            if message is None and data.startswith('Mensagem recebida'):
+                return 'json'
+        return 'json'
+
+    def _listen(self):
+        ws = websocket.create_connection(self.url, timeout=5)
+        self._ws = ws
+        self.delta = False
+        try:
+            encoding = self._negotiate(ws)
+            with self._send_lock:
+                self.encoding = encoding
+                self._connected = True
+            self._last_sent = time()
+            print(f"🔌 WebSocket de detecções conectado: {self.url} ({self.encoding}"
+                  f"{', delta' if self.delta else ''})")
+
+            ws.settimeout(1.0)
+            while not self._stop.is_set():
+                if time() - self._last_sent >= self.heartbeat_interval:
+                    self._send({'type': 'heartbeat', 'deviceId': self.device_id,
+                                'timestamp': int(time() * 1000)})
+                try:
+                    data = ws.recv()
+                except websocket.WebSocketTimeoutException:
+                    continue
+                if not ws.connected:
+                    break
+                if isinstance(data, str):
+                    self._handle_text(data)
+        finally:
+            self._connected = False
+            self._ws = None
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            started = time()
+            try:
+                self._listen()
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"⚠️  WebSocket de detecções indisponível ({e}), usando HTTP")
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            if time() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def stats(self):
+        return {
+            'connected': self._connected,
+            'encoding': self.encoding,
+            'delta': self.delta,
+            'frames': self.frames,
+            'bytes': self.bytes_sent,
+            'json_bytes': self.json_bytes,
+            'compressed': self.compressed,
+            'reconnects': self.reconnects,
+            'send_errors': self.send_errors,
+            'rejected': self.rejected
+        }
+
+    def close(self):
+        self._stop.set()
+        self._drop()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
@@ -0,0 +1,83 @@
+"""
+Cache semântico de legendas indexado pela saída do encoder Swin.
+
+O hash perceptual (utils/caption_cache.py) falha quando a mesma cena aparece com outra
+iluminação ou enquadramento. Aqui a saída de End_ExpansionNet_v2.forward_enc é reduzida a
+um vetor compacto (média sobre a sequência) e comparada por similaridade de cosseno contra
+um índice em memória (busca exata com NumPy; o tamanho é limitado, então força bruta basta).
+Um acerto evita o decoder (beam search) e a tradução.
+"""
+import threading
+from time import time
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Índice de vizinho mais próximo por cosseno com tamanho limitado e remoção LRU"""
+
+    def __init__(self, dim, max_entries=500, threshold=0.95):
+        self.dim = dim
+        self.max_entries = max_entries
+        self.threshold = threshold
+
+        # Vetores normalizados pré-alocados; slots livres ficam com last_used = -inf
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._last_used = np.full(max_entries, -np.inf)
+        self._captions = [None] * max_entries
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, vector):
+        """Retorna (caption_kz, caption_pt, similaridade) ou None"""
+        query = self._normalize(vector)
+        with self._lock:
+            if self._size == 0:
+                self.misses += 1
+                return None
+
+            sims = self._vectors[:self._size] @ query
+            best = int(np.argmax(sims))
+            best_sim = float(sims[best])
+            if best_sim < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._last_used[best] = time()
+            caption_kz, caption_pt = self._captions[best]
+            return caption_kz, caption_pt, best_sim
+
+    def put(self, vector, caption_kz, caption_pt):
+        vector = self._normalize(vector)
+        with self._lock:
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+
+            self._vectors[slot] = vector
+            self._last_used[slot] = time()
+            self._captions[slot] = (caption_kz, caption_pt)
+
+    def __len__(self):
+        return self._size
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
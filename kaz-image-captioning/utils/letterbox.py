@@ -0,0 +1,111 @@
+"""
+Estágio de entrada do detector: letterbox em buffer reutilizado + quantização por tabela.
+
+O frame é redimensionado mantendo a proporção e copiado para o centro de um buffer
+[1, H, W, 3] alocado uma vez (as bordas ficam com cinza 114, como no YOLO). A conversão
+para o tipo de entrada do modelo é feita por uma tabela de 256 posições calculada na
+criação: para modelos uint8 com quantização (1/255, 0) a tabela é a identidade e os pixels
+são copiados direto, sem nenhuma passada em float.
+
+Convenção dos valores reais de entrada: modelos quantizados recebem pixel / 255 (0..1),
+modelos float recebem (pixel - 127.5) / 127.5 (-1..1).
+"""
+import cv2
+import numpy as np
+
+PAD_VALUE = 114
+
+
+def build_input_lut(dtype, quantization=(0.0, 0)):
+    """Tabela pixel (0..255) -> valor no tipo de entrada do modelo"""
+    pixels = np.arange(256, dtype=np.float64)
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'iu':
+        scale, zero_point = quantization
+        info = np.iinfo(dtype)
+        if scale:
+            values = np.round(pixels / 255.0 / scale + zero_point)
+        else:
+            values = pixels
+        return np.clip(values, info.min, info.max).astype(dtype)
+    return ((pixels - 127.5) / 127.5).astype(dtype)
+
+
+class LetterboxInput:
+    """Prepara frames BGR para o detector e converte caixas de volta para o frame original"""
+
+    def __init__(self, height, width, dtype=np.uint8, quantization=(0.0, 0), pad_value=PAD_VALUE):
+        self.height = height
+        self.width = width
+        self.dtype = np.dtype(dtype)
+        self.lut = build_input_lut(self.dtype, quantization)
+        self.identity = self.dtype == np.uint8 and np.array_equal(self.lut, np.arange(256, dtype=np.uint8))
+
+        self.pad_value = pad_value
+        self.buffer = np.empty((1, height, width, 3), dtype=self.dtype)
+
+        self._geometry = None
+        self._resized = None
+        self._rgb = None
+        self._mapped = None
+        self._region = None
+        self.ratio = 1.0
+        self.pad = (0, 0)
+        self.source_size = (height, width)
+        self.content_size = (height, width)
+
+    @classmethod
+    def from_detector(cls, detector, pad_value=PAD_VALUE):
+        return cls(detector.input_height, detector.input_width, detector.input_dtype,
+                   detector.input_quantization, pad_value)
+
+    def _set_geometry(self, h, w):
+        ratio = min(self.width / w, self.height / h)
+        new_w = max(1, min(self.width, int(round(w * ratio))))
+        new_h = max(1, min(self.height, int(round(h * ratio))))
+        left = (self.width - new_w) // 2
+        top = (self.height - new_h) // 2
+
+        self.ratio = ratio
+        self.pad = (left, top)
+        self.source_size = (h, w)
+        self.content_size = (new_h, new_w)
+        self._geometry = (h, w)
+        self._resized = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        self._rgb = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        self._mapped = None if self.identity else np.empty((new_h, new_w, 3), dtype=self.dtype)
+        self._region = self.buffer[0, top:top + new_h, left:left + new_w]
+        # Só as bordas precisam do valor de preenchimento; o centro é sobrescrito a cada frame
+        self.buffer[...] = self.lut[self.pad_value]
+
+    def __call__(self, frame):
+        """Retorna o buffer [1, H, W, 3] pronto para o invoke() (reutilizado entre chamadas)"""
+        h, w = frame.shape[:2]
+        if self._geometry != (h, w):
+            self._set_geometry(h, w)
+
+        new_h, new_w = self._resized.shape[:2]
+        if (new_h, new_w) == (h, w):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        else:
+            cv2.resize(frame, (new_w, new_h), dst=self._resized, interpolation=cv2.INTER_LINEAR)
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+
+        if self.identity:
+            self._region[...] = self._rgb
+        else:
+            np.take(self.lut, self._rgb, out=self._mapped)
+            self._region[...] = self._mapped
+        return self.buffer
+
+    def to_source(self, boxes):
+        """Converte caixas xyxy normalizadas na entrada do modelo para normalizadas no frame original"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        content_h, content_w = self.content_size
+        left, top = self.pad
+        scale_x = self.width / content_w
+        scale_y = self.height / content_h
+        out = np.empty_like(boxes)
+        out[:, [0, 2]] = (boxes[:, [0, 2]] - left / self.width) * scale_x
+        out[:, [1, 3]] = (boxes[:, [1, 3]] - top / self.height) * scale_y
+        return np.clip(out, 0.0, 1.0)
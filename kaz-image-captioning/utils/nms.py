@@ -0,0 +1,110 @@
+"""
+Non-Maximum Suppression em NumPy puro (substitui tf.image.non_max_suppression).
+
+As caixas seguem a convenção do TensorFlow: [y1, x1, y2, x2] (qualquer par de cantos
+opostos). nms() devolve os mesmos índices que tf.image.non_max_suppression: ordem
+decrescente de score, empates resolvidos pelo menor índice, e uma caixa é suprimida
+quando IoU > iou_threshold.
+"""
+import numpy as np
+
+
+def _normalize_boxes(boxes):
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    y1 = np.minimum(boxes[:, 0], boxes[:, 2])
+    x1 = np.minimum(boxes[:, 1], boxes[:, 3])
+    y2 = np.maximum(boxes[:, 0], boxes[:, 2])
+    x2 = np.maximum(boxes[:, 1], boxes[:, 3])
+    return y1, x1, y2, x2
+
+
+def _iou_one_to_many(i, others, y1, x1, y2, x2, areas):
+    inter_h = np.maximum(0.0, np.minimum(y2[i], y2[others]) - np.maximum(y1[i], y1[others]))
+    inter_w = np.maximum(0.0, np.minimum(x2[i], x2[others]) - np.maximum(x1[i], x1[others]))
+    inter = inter_h * inter_w
+    union = areas[i] + areas[others] - inter
+    return np.where((areas[i] > 0) & (areas[others] > 0) & (union > 0),
+                    inter / np.maximum(union, 1e-12), 0.0)
+
+
+def _order_by_score(scores, score_threshold, top_k):
+    candidates = np.flatnonzero(scores > score_threshold)
+    if top_k is not None and candidates.size > top_k:
+        # Pré-filtro top-k: argpartition é O(n), só o que sobra é ordenado
+        part = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+        candidates = np.sort(candidates[part])
+    order = np.argsort(-scores[candidates], kind='stable')
+    return candidates[order]
+
+
+def nms(boxes, scores, iou_threshold=0.5, max_output=50, score_threshold=float('-inf'), top_k=None):
+    """NMS guloso (hard). Retorna índices int32 das caixas mantidas"""
+    scores = np.asarray(scores, dtype=np.float32).ravel()
+    if scores.size == 0 or max_output <= 0:
+        return np.array([], dtype=np.int32)
+
+    y1, x1, y2, x2 = _normalize_boxes(boxes)
+    areas = (y2 - y1) * (x2 - x1)
+    order = _order_by_score(scores, score_threshold, top_k)
+
+    keep = []
+    while order.size > 0 and len(keep) < max_output:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        if rest.size == 0:
+            break
+        ious = _iou_one_to_many(i, rest, y1, x1, y2, x2, areas)
+        order = rest[ious <= iou_threshold]
+
+    return np.array(keep, dtype=np.int32)
+
+
+def batched_nms(boxes, scores, class_ids, iou_threshold=0.5, max_output=50,
+                score_threshold=float('-inf'), top_k=None):
+    """NMS por classe: desloca as caixas de cada classe para não se sobreporem entre classes"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if boxes.shape[0] == 0:
+        return np.array([], dtype=np.int32)
+    class_ids = np.asarray(class_ids).ravel()
+    max_coord = float(np.abs(boxes).max()) + 1.0
+    offsets = (class_ids.astype(np.float32) * 2.0 * max_coord)[:, None]
+    return nms(boxes + offsets, scores, iou_threshold, max_output, score_threshold, top_k)
+
+
+def soft_nms(boxes, scores, iou_threshold=0.5, max_output=50, sigma=0.5,
+             score_threshold=0.001, top_k=None):
+    """Soft-NMS gaussiano (como tf.image.non_max_suppression_with_scores com soft_nms_sigma).
+
+    Retorna (índices int32, scores atualizados das caixas mantidas).
+    """
+    scores = np.asarray(scores, dtype=np.float32).ravel()
+    if scores.size == 0 or max_output <= 0:
+        return np.array([], dtype=np.int32), np.array([], dtype=np.float32)
+
+    y1, x1, y2, x2 = _normalize_boxes(boxes)
+    areas = (y2 - y1) * (x2 - x1)
+    order = _order_by_score(scores, score_threshold, top_k)
+    current = scores[order].copy()
+    scale = -0.5 / sigma if sigma > 0 else 0.0
+
+    keep, keep_scores = [], []
+    while order.size > 0 and len(keep) < max_output:
+        best = int(np.argmax(current))
+        i = order[best]
+        keep.append(i)
+        keep_scores.append(current[best])
+
+        order = np.delete(order, best)
+        current = np.delete(current, best)
+        if order.size == 0:
+            break
+
+        ious = _iou_one_to_many(i, order, y1, x1, y2, x2, areas)
+        weights = np.where(ious <= iou_threshold, np.exp(scale * ious * ious), 0.0)
+        current = current * weights.astype(np.float32)
+
+        alive = current > score_threshold
+        order, current = order[alive], current[alive]
+
+    return np.array(keep, dtype=np.int32), np.array(keep_scores, dtype=np.float32)
@@ -0,0 +1,314 @@
+"""
+Publicação das detecções fora do loop de captura.
+
+send_to_server era chamado direto no loop com timeout de 5s: um servidor lento ou fora do ar
+segurava captura e inferência, e o que falhava era perdido. DetectionPublisher recebe os
+payloads numa fila limitada e um thread próprio faz o envio:
+
+  - publish() nunca bloqueia. Fila cheia descarta o mais antigo (drop-oldest); na política
+    'coalesce' um payload com a mesma chave (ex.: capture_id) substitui o que ainda está na
+    fila, então só a versão mais recente de cada captura é enviada;
+  - falhas transitórias (exceção de rede, 5xx) são repetidas com backoff exponencial. O
+    atraso cresce com as falhas consecutivas, não por item, para não martelar um servidor
+    que caiu;
+  - com spill_path (opcional, desligado por padrão), quando as tentativas acabam o servidor
+    é considerado fora do ar: o item e tudo o que chegar depois vai para um JSONL em disco,
+    cada linha com o horário em que entrou na fila. O sender testa o servidor com o item mais
+    antigo do arquivo e, quando ele volta, reenvia o arquivo em ordem antes de continuar a
+    fila. O arquivo sobrevive a reinícios, mas itens com mais de max_spill_age segundos são
+    descartados em vez de reenviados: uma detecção velha descreveria ao usuário uma cena que
+    não está mais na frente dele.
+
+send_fn(payload) deve retornar True (entregue), False (rejeitado, ex.: 4xx; não adianta
+repetir) ou levantar exceção (falha transitória).
+"""
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+from itertools import count
+from time import time
+
+POLICIES = ('drop-oldest', 'coalesce')
+
+
+class DetectionPublisher:
+    """Fila limitada + thread de envio com retry, backoff e spill em disco"""
+
+    def __init__(self, send_fn, max_queue=32, policy='drop-oldest', retries=3, backoff=0.5,
+                 max_backoff=30.0, spill_path=None, max_spill=1000, max_spill_age=60.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Política desconhecida: {policy!r} (use {', '.join(POLICIES)})")
+        self.send_fn = send_fn
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.spill_path = spill_path
+        self.max_spill = max_spill
+        self.max_spill_age = max_spill_age
+
+        self._queue = OrderedDict()
+        self._ids = count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._busy = False
+        self._failures = 0
+        self._offline = False
+
+        self.published = 0
+        self.sent = 0
+        self.rejected = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.expired = 0
+        self.max_depth = 0
+        self._delays = deque(maxlen=200)
+
+        if spill_path:
+            os.makedirs(os.path.dirname(os.path.abspath(spill_path)), exist_ok=True)
+            self._offline = bool(self._spill_load())
+
+        self._thread = threading.Thread(target=self._run, name='publicador', daemon=True)
+        self._thread.start()
+
+    # ----- lado do produtor -----
+
+    def publish(self, payload, key=None):
+        """Enfileira o payload e retorna na hora. key agrupa versões da mesma captura"""
+        with self._cond:
+            self.published += 1
+            if self.policy == 'coalesce' and key is not None and key in self._queue:
+                # Mantém a posição original na fila, mas com o conteúdo mais novo
+                self._queue[key] = (payload, self._queue[key][1])
+                self.coalesced += 1
+                return
+            if len(self._queue) >= self.max_queue:
+                self._queue.popitem(last=False)
+                self.dropped += 1
+            if key is None or self.policy != 'coalesce':
+                key = ('_', next(self._ids))
+            self._queue[key] = (payload, time())
+            self.max_depth = max(self.max_depth, len(self._queue))
+            self._cond.notify()
+
+    def depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def flush(self, timeout=None):
+        """Espera a fila esvaziar (ou o servidor ser dado como fora do ar). Retorna True se esvaziou"""
+        deadline = None if timeout is None else time() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                if self._offline and not self._busy:
+                    return False
+                remaining = None if deadline is None else deadline - time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 0.1)
+        return True
+
+    def close(self, timeout=5.0):
+        """Tenta entregar o que está na fila; o que sobrar vai para o disco (se configurado)"""
+        self.flush(timeout)
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=max(1.0, self.backoff * 2))
+        with self._cond:
+            leftovers = list(self._queue.values())
+            self._queue.clear()
+        if leftovers:
+            if self.spill_path:
+                self._spill_append(leftovers)
+            else:
+                self.failed += len(leftovers)
+
+    # ----- thread de envio -----
+
+    def _next_delay(self):
+        return min(self.backoff * (2 ** max(0, self._failures - 1)), self.max_backoff)
+
+    def _try_send(self, payload):
+        """Uma tentativa: True entregue, False rejeitado, None falha transitória"""
+        try:
+            ok = self.send_fn(payload)
+        except Exception as e:
+            self._failures += 1
+            if self._failures == 1 or self._failures % 10 == 0:
+                print(f"⚠️  Publicador: falha ao enviar ({e})")
+            return None
+        self._failures = 0
+        return bool(ok)
+
+    def _deliver(self, payload):
+        """Envia com retries. Retorna True/False (resolvido) ou None (desistiu: servidor fora)"""
+        for attempt in range(self.retries + 1):
+            if self._stop.is_set() and attempt > 0:
+                return None
+            result = self._try_send(payload)
+            if result is not None:
+                return result
+            if attempt < self.retries:
+                self.retried += 1
+                self._stop.wait(self._next_delay())
+        return None
+
+    def _take(self):
+        with self._cond:
+            while not self._queue and not self._stop.is_set():
+                self._cond.wait(0.5)
+            if not self._queue:
+                return None
+            self._busy = True
+            _, (payload, queued_at) = self._queue.popitem(last=False)
+            return payload, queued_at
+
+    def _done(self):
+        with self._cond:
+            self._busy = False
+            self._cond.notify_all()
+
+    def _run_offline(self):
+        """Servidor fora: move a fila para o disco e testa a volta com o item mais antigo"""
+        with self._cond:
+            pending = list(self._queue.values())
+            self._queue.clear()
+            self._cond.notify_all()
+        if pending:
+            self._spill_append(pending)
+
+        spilled = self._spill_load()
+        if not spilled:
+            self._offline = False
+            return
+        result = self._try_send(spilled[0][0])
+        if result is None:
+            self._stop.wait(self._next_delay())
+            return
+
+        # Servidor voltou: reenvia o arquivo em ordem
+        print(f"✅ Publicador: servidor de volta, reenviando {len(spilled)} detecções salvas")
+        self._count_result(result, replay=True)
+        for i, (payload, queued_at) in enumerate(spilled[1:], start=1):
+            if self._too_old(queued_at):
+                self.expired += 1
+                continue
+            result = self._deliver(payload)
+            if result is None:
+                self._spill_rewrite(spilled[i:])
+                return
+            self._count_result(result, replay=True)
+        self._spill_rewrite([])
+        self._offline = False
+
+    def _count_result(self, result, replay=False):
+        if result:
+            self.sent += 1
+            if replay:
+                self.replayed += 1
+        else:
+            self.rejected += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._offline:
+                self._run_offline()
+                continue
+
+            item = self._take()
+            if item is None:
+                continue
+            payload, queued_at = item
+            result = self._deliver(payload)
+            if result is None:
+                if self.spill_path:
+                    print("⚠️  Publicador: servidor inacessível, guardando detecções em disco")
+                    self._spill_append([(payload, queued_at)])
+                    self._offline = True
+                else:
+                    self.failed += 1
+            else:
+                self._count_result(result)
+                self._delays.append(time() - queued_at)
+            self._done()
+
+    # ----- spill em disco -----
+
+    def _too_old(self, queued_at):
+        return self.max_spill_age is not None and time() - queued_at > self.max_spill_age
+
+    def _spill_load(self):
+        """Itens (payload, queued_at) do arquivo; os vencidos são descartados e o arquivo reescrito"""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return []
+        items = []
+        expired = 0
+        with open(self.spill_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                queued_at = entry.get('queued_at') if isinstance(entry, dict) else None
+                # Linha sem horário (formato antigo): idade desconhecida, trata como vencida
+                if not isinstance(queued_at, (int, float)) or 'payload' not in entry or self._too_old(queued_at):
+                    expired += 1
+                    continue
+                items.append((entry['payload'], queued_at))
+        if expired:
+            self.expired += expired
+            print(f"🗑️  Publicador: {expired} detecções salvas descartadas por idade")
+            self._spill_rewrite(items)
+        return items
+
+    def _spill_append(self, items):
+        existing = self._spill_load()
+        total = len(existing) + len(items)
+        self.spilled += len(items)
+        if total > self.max_spill:
+            # Limite do arquivo: descarta as detecções mais antigas
+            self.dropped += total - self.max_spill
+            self._spill_rewrite((existing + list(items))[-self.max_spill:])
+            return
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            for payload, queued_at in items:
+                f.write(json.dumps({'queued_at': queued_at, 'payload': payload}, ensure_ascii=False) + '\n')
+
+    def _spill_rewrite(self, items):
+        tmp_path = self.spill_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for payload, queued_at in items:
+                f.write(json.dumps({'queued_at': queued_at, 'payload': payload}, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.spill_path)
+
+    def stats(self):
+        with self._cond:
+            depth = len(self._queue)
+        delays = list(self._delays)
+        return {
+            'policy': self.policy,
+            'depth': depth,
+            'max_depth': self.max_depth,
+            'published': self.published,
+            'sent': self.sent,
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'retries': self.retried,
+            'spilled': self.spilled,
+            'replayed': self.replayed,
+            'expired': self.expired,
+            'offline': self._offline,
+            'mean_delay_ms': round(sum(delays) / len(delays) * 1000.0, 1) if delays else 0.0
+        }
@@ -1,5 +1,6 @@
 
 import os
+import inspect
 import torch
 from datetime import datetime
 
@@ -107,3 +108,55 @@ def partially_load_state_dict(model, state_dict, verbose=False):
                 print("Found: " + str(name))
                 count_print += 1
 
+
+
+def load_model_state_dict(checkpoint_path, map_location='cpu'):
+    # deploy loading: memory-map the checkpoint instead of reading it all into RAM
+    checkpoint_path = str(checkpoint_path)
+    if checkpoint_path.endswith('.safetensors'):
+        from safetensors.torch import load_file
+        return load_file(checkpoint_path, device=str(map_location))
+    try:
+        checkpoint = torch.load(checkpoint_path, map_location=map_location, mmap=True)
+    except (TypeError, RuntimeError):
+        # torch < 2.1 (no mmap argument) or legacy non-zip checkpoint
+        checkpoint = torch.load(checkpoint_path, map_location=map_location)
+    if 'model_state_dict' in checkpoint:
+        return checkpoint['model_state_dict']
+    return checkpoint
+
+
+def build_model_from_state_dict(build_fn, state_dict, device='cpu'):
+    # builds the module on the meta device (no random init, no allocation) and assigns
+    # the checkpoint tensors in place; falls back to regular construction on older torch
+    can_assign = 'assign' in inspect.signature(torch.nn.Module.load_state_dict).parameters
+    if can_assign and hasattr(torch.device('meta'), '__enter__'):
+        try:
+            with torch.device('meta'):
+                model = build_fn()
+        except (RuntimeError, NotImplementedError) as e:
+            print("Fast load: model cannot be built on the meta device (" + str(e) + "), using regular init")
+        else:
+            model.load_state_dict(state_dict, assign=True)
+            still_meta = [name for name, t in list(model.named_parameters()) + list(model.named_buffers())
+                          if t.is_meta]
+            if not still_meta:
+                return model.to(device)
+            print("Fast load: tensors not in checkpoint " + str(still_meta[:5]) + ", using regular init")
+
+    model = build_fn()
+    model.load_state_dict(state_dict)
+    return model.to(device)
+
+
+def save_deploy_checkpoint(checkpoint_path, output_path):
+    # keeps only the model weights (drops optimizer/scheduler/data loader state)
+    state_dict = load_model_state_dict(checkpoint_path, map_location='cpu')
+    state_dict = {name: tensor.contiguous() for name, tensor in state_dict.items()}
+    output_path = str(output_path)
+    if output_path.endswith('.safetensors'):
+        from safetensors.torch import save_file
+        save_file(state_dict, output_path)
+    else:
+        torch.save({'model_state_dict': state_dict}, output_path)
+    return output_path
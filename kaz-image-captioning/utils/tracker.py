@@ -0,0 +1,163 @@
+"""
+Tracker de detecções em arrays NumPy (struct-of-arrays).
+
+Substitui o DetectionTracker de detect_yolo.py, que comparava cada candidato com cada track
+em Python puro. Aqui os tracks vivem em arrays paralelos (caixas, classe, score, hits, idade,
+TTL de verificação), a matriz de IoU candidatos x tracks é calculada de uma vez e mascarada
+por classe, e a associação é resolvida pelo algoritmo húngaro (scipy) ou, sem scipy, por
+casamento guloso em ordem decrescente de IoU. Os dicts só são montados para os tracks
+confirmados, na fronteira com o código de desenho.
+
+As caixas estão em [x1, y1, x2, y2] normalizadas (0..1).
+"""
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """IoU entre todas as caixas de boxes_a (N x 4) e boxes_b (M x 4) em xyxy"""
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = np.clip(a[..., 2] - a[..., 0], 0, None) * np.clip(a[..., 3] - a[..., 1], 0, None)
+    area_b = np.clip(b[..., 2] - b[..., 0], 0, None) * np.clip(b[..., 3] - b[..., 1], 0, None)
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-12), 0.0)
+
+
+def _greedy_assignment(iou, min_iou):
+    """Casamento guloso 1-para-1: pares em ordem decrescente de IoU"""
+    rows, cols = np.nonzero(iou >= min_iou)
+    if rows.size == 0:
+        return rows, cols
+    order = np.argsort(-iou[rows, cols], kind='stable')
+    used_rows = np.zeros(iou.shape[0], dtype=bool)
+    used_cols = np.zeros(iou.shape[1], dtype=bool)
+    keep = []
+    for k in order:
+        r, c = rows[k], cols[k]
+        if used_rows[r] or used_cols[c]:
+            continue
+        used_rows[r] = used_cols[c] = True
+        keep.append(k)
+    keep = np.array(keep, dtype=np.int64)
+    return rows[keep], cols[keep]
+
+
+def assign(iou, min_iou, use_hungarian=True):
+    """Associa candidatos (linhas) a tracks (colunas). Retorna (linhas, colunas) casadas"""
+    if iou.size == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty
+    if use_hungarian and linear_sum_assignment is not None:
+        # Pares abaixo do limiar recebem custo neutro e são descartados depois
+        cost = np.where(iou >= min_iou, -iou, 0.0)
+        rows, cols = linear_sum_assignment(cost)
+        valid = iou[rows, cols] >= min_iou
+        return rows[valid], cols[valid]
+    return _greedy_assignment(iou, min_iou)
+
+
+class ArrayTracker:
+    """Tracker por IoU com estado em arrays paralelos"""
+
+    def __init__(self, match_iou=0.4, max_age=6, verified_ttl=6, min_hits=5,
+                 min_avg_score=0.15, min_box_area=0.02, use_hungarian=True):
+        self.match_iou = match_iou
+        self.max_age = max_age
+        self.verified_ttl = verified_ttl
+        self.min_hits = min_hits
+        self.min_avg_score = min_avg_score
+        self.min_box_area = min_box_area
+        self.use_hungarian = use_hungarian
+
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.cls = np.zeros(0, dtype=np.int32)
+        self.score = np.zeros(0, dtype=np.float32)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.age = np.zeros(0, dtype=np.int32)
+        self.ttl = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        return self.cls.size
+
+    def update(self, boxes, class_ids, scores, verified=None):
+        """Atualiza os tracks com as detecções do frame e retorna a máscara dos confirmados"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        class_ids = np.asarray(class_ids, dtype=np.int32).ravel()
+        scores = np.asarray(scores, dtype=np.float32).ravel()
+        if verified is None:
+            verified = np.zeros(class_ids.size, dtype=bool)
+        else:
+            verified = np.asarray(verified, dtype=bool).ravel()
+
+        self.age += 1
+        np.maximum(self.ttl - 1, 0, out=self.ttl)
+
+        matched = np.zeros(class_ids.size, dtype=bool)
+        if class_ids.size and self.cls.size:
+            iou = iou_matrix(boxes, self.boxes)
+            iou[class_ids[:, None] != self.cls[None, :]] = 0.0
+            rows, cols = assign(iou, self.match_iou, self.use_hungarian)
+            matched[rows] = True
+
+            self.age[cols] = 0
+            self.hits[cols] += 1
+            self.score[cols] = self.score[cols] * 0.6 + scores[rows] * 0.4
+            self.boxes[cols] = (self.boxes[cols] + boxes[rows]) / 2.0
+            refreshed = verified[rows]
+            self.ttl[cols[refreshed]] = self.verified_ttl
+
+        new = ~matched
+        if new.any():
+            n_new = int(new.sum())
+            self.boxes = np.concatenate([self.boxes, boxes[new]])
+            self.cls = np.concatenate([self.cls, class_ids[new]])
+            self.score = np.concatenate([self.score, scores[new]])
+            self.hits = np.concatenate([self.hits, np.ones(n_new, dtype=np.int32)])
+            self.age = np.concatenate([self.age, np.zeros(n_new, dtype=np.int32)])
+            self.ttl = np.concatenate([self.ttl, np.where(verified[new], self.verified_ttl, 0).astype(np.int32)])
+
+        alive = self.age <= self.max_age
+        if not alive.all():
+            self._compact(alive)
+
+        return self.confirmed_mask()
+
+    def set_boxes(self, boxes):
+        """Substitui as caixas dos tracks (propagação entre detecções, sem envelhecer os tracks)"""
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4).copy()
+
+    def _compact(self, keep):
+        self.boxes = self.boxes[keep]
+        self.cls = self.cls[keep]
+        self.score = self.score[keep]
+        self.hits = self.hits[keep]
+        self.age = self.age[keep]
+        self.ttl = self.ttl[keep]
+
+    def confirmed_mask(self):
+        w = np.clip(self.boxes[:, 2] - self.boxes[:, 0], 0, None)
+        h = np.clip(self.boxes[:, 3] - self.boxes[:, 1], 0, None)
+        big_enough = (w * h) >= self.min_box_area
+        return big_enough & ((self.hits >= self.min_hits) |
+                             (self.score >= self.min_avg_score) |
+                             (self.ttl > 0))
+
+    def to_dicts(self, mask=None):
+        """Converte os tracks (opcionalmente filtrados) para o formato de dict usado no desenho"""
+        idx = np.flatnonzero(mask) if mask is not None else np.arange(self.cls.size)
+        return [{
+            'cls': int(self.cls[i]),
+            'box': self.boxes[i].tolist(),
+            'score': float(self.score[i]),
+            'hits': int(self.hits[i]),
+            'age': int(self.age[i]),
+            'verified_ttl': int(self.ttl[i])
+        } for i in idx]
@@ -0,0 +1,631 @@
+"""
+Tradução das legendas: backends plugáveis + cache LRU em memória na frente de um SQLite.
+
+Backends (create_backend):
+  - google: deep_translator.GoogleTranslator (online)
+  - googletrans: googletrans.Translator (online)
+  - offline: tabela de frases/palavras cazaque -> português (vocabulary/kz_pt_phrases.json),
+    resolvida sobre o vocabulário do modelo (vocab_kz.pickle); roda sem internet e com
+    latência limitada
+  - stub: dicionário fixo em memória, para testes herméticos
+
+TranslationService junta backend, cache e fallback: se o backend online falha, a legenda
+sai pelo backend offline em vez de ser enviada sem tradução. Cada chamada ao backend pode
+ter timeout (a chamada roda num worker e é abandonada se passar do prazo) e novas
+tentativas com backoff exponencial antes de cair no fallback.
+
+TranslationBatcher fica na frente do serviço quando várias capturas/câmeras traduzem ao
+mesmo tempo: junta os textos que chegam dentro de uma janela curta, remove duplicados e faz
+uma única chamada translate_batch (lista nativa do backend ou um payload unido por quebras
+de linha), devolvendo cada resultado ao seu pedido e gravando tudo no cache.
+
+O modelo gera um repertório limitado de frases, então a mesma legenda se repete muito. A
+chave do cache é (idioma de origem, idioma de destino, texto normalizado). Entradas expiram
+após ttl segundos, o disco é podado para max_disk linhas (as menos usadas saem primeiro) e,
+na inicialização, as warm_up traduções mais usadas das sessões anteriores são carregadas na
+memória. Só o que não está no cache passa pelo tradutor online.
+"""
+import json
+import os
+import pickle
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from time import perf_counter, sleep, time
+
+VOCAB_DIR = Path(__file__).resolve().parent.parent / 'vocabulary'
+PHRASE_TABLE_PATH = VOCAB_DIR / 'kz_pt_phrases.json'
+VOCAB_KZ_PATH = VOCAB_DIR / 'vocab_kz.pickle'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    src_lang TEXT NOT NULL,
+    dst_lang TEXT NOT NULL,
+    source TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (src_lang, dst_lang, source)
+)
+"""
+
+
+def normalize_text(text):
+    """Normaliza a chave: espaços colapsados, sem bordas, minúsculas"""
+    return ' '.join(text.split()).lower()
+
+
+class TranslationCache:
+    """LRU em memória + SQLite com TTL, limite de tamanho e warm-up"""
+
+    def __init__(self, path=None, max_memory=1000, max_disk=20000, ttl=30 * 24 * 3600, warm_up=500):
+        self.path = path
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.ttl = ttl
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(_SCHEMA)
+                self._db.commit()
+                self.prune()
+                self.warm_up(warm_up)
+            except sqlite3.Error as e:
+                print(f"⚠️  Cache de traduções só em memória ({path}): {e}")
+                self._db = None
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def _remember(self, key, translation, created):
+        self._memory[key] = (translation, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def get(self, text, src_lang, dst_lang):
+        """Retorna a tradução em cache ou None"""
+        key = (src_lang, dst_lang, normalize_text(text))
+        now = time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT translation, created FROM translations "
+                    "WHERE src_lang = ? AND dst_lang = ? AND source = ?", key).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    self._db.execute(
+                        "UPDATE translations SET last_used = ?, hits = hits + 1 "
+                        "WHERE src_lang = ? AND dst_lang = ? AND source = ?", (now,) + key)
+                    self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, text, src_lang, dst_lang, translation):
+        key = (src_lang, dst_lang, normalize_text(text))
+        now = time()
+        with self._lock:
+            self._remember(key, translation, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO translations "
+                    "(src_lang, dst_lang, source, translation, created, last_used, hits) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 0)", key + (translation, now, now))
+                self._db.commit()
+
+    def translate(self, text, src_lang, dst_lang, translate_fn):
+        """Consulta o cache e, se faltar, chama translate_fn(text) e guarda o resultado.
+
+        Exceções de translate_fn são propagadas (nada é gravado nesse caso).
+        """
+        if not text or not text.strip():
+            return text
+        cached = self.get(text, src_lang, dst_lang)
+        if cached is not None:
+            return cached
+        translation = translate_fn(text)
+        if translation:
+            self.put(text, src_lang, dst_lang, translation)
+        return translation
+
+    def warm_up(self, limit):
+        """Carrega na memória as traduções mais usadas das sessões anteriores"""
+        if self._db is None or limit <= 0:
+            return 0
+        now = time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT src_lang, dst_lang, source, translation, created FROM translations "
+                "ORDER BY hits DESC, last_used DESC LIMIT ?", (min(limit, self.max_memory),)).fetchall()
+            # Insere do menos para o mais usado para que os mais usados fiquem no fim da LRU
+            for src_lang, dst_lang, source, translation, created in reversed(rows):
+                if not self._expired(created, now):
+                    self._remember((src_lang, dst_lang, source), translation, created)
+        if rows:
+            print(f"✅ Cache de traduções: {len(self._memory)} frases carregadas")
+        return len(rows)
+
+    def prune(self):
+        """Remove entradas expiradas e limita o disco a max_disk linhas"""
+        if self._db is None:
+            return
+        with self._lock:
+            if self.ttl is not None:
+                self._db.execute("DELETE FROM translations WHERE created < ?", (time() - self.ttl,))
+            if self.max_disk:
+                self._db.execute(
+                    "DELETE FROM translations WHERE rowid NOT IN ("
+                    "SELECT rowid FROM translations ORDER BY last_used DESC LIMIT ?)", (self.max_disk,))
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'memory': len(self._memory),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class TranslationBackend:
+    """Interface dos tradutores: translate(text) e translate_batch(texts)"""
+
+    name = 'base'
+    offline = False
+
+    def __init__(self, src_lang='kk', dst_lang='pt'):
+        self.src_lang = src_lang
+        self.dst_lang = dst_lang
+
+    def translate(self, text):
+        raise NotImplementedError
+
+    def translate_batch(self, texts):
+        return [self.translate(text) for text in texts]
+
+    def _translate_joined(self, texts):
+        """Lote num único pedido: textos unidos por quebra de linha e separados na volta"""
+        texts = list(texts)
+        if len(texts) <= 1 or any('\n' in text for text in texts):
+            return [self.translate(text) for text in texts]
+        lines = self.translate('\n'.join(texts)).split('\n')
+        if len(lines) != len(texts):
+            # O tradutor juntou/quebrou linhas: não dá para casar os resultados com segurança
+            return [self.translate(text) for text in texts]
+        return [line.strip() for line in lines]
+
+
+class GoogleBackend(TranslationBackend):
+    """deep_translator.GoogleTranslator (a origem fica em 'auto', como antes)"""
+
+    name = 'google'
+
+    def __init__(self, src_lang='kk', dst_lang='pt', source='auto'):
+        super().__init__(src_lang, dst_lang)
+        from deep_translator import GoogleTranslator
+        self._translator = GoogleTranslator(source=source, target=dst_lang)
+
+    def translate(self, text):
+        return self._translator.translate(text)
+
+    def translate_batch(self, texts):
+        # deep_translator.translate_batch faz um pedido por texto; aqui o lote vai num só
+        return self._translate_joined(texts)
+
+
+class GoogletransBackend(TranslationBackend):
+    """googletrans.Translator, usado pelos scripts esp32cam/webcam/phone_camera"""
+
+    name = 'googletrans'
+
+    def __init__(self, src_lang='kk', dst_lang='pt'):
+        super().__init__(src_lang, dst_lang)
+        from googletrans import Translator
+        self._translator = Translator()
+
+    def translate(self, text):
+        return self._translator.translate(text, src=self.src_lang, dest=self.dst_lang).text
+
+    def translate_batch(self, texts):
+        return self._translate_joined(texts)
+
+
+class PhraseTableBackend(TranslationBackend):
+    """Tradutor offline por tabela de frases + dicionário de radicais.
+
+    Na criação, cada palavra do vocabulário do modelo é resolvida uma única vez (palavra
+    exata, radical + sufixo de caso conhecido, ou o radical mais longo do dicionário). A
+    tradução em si é só uma varredura da frase com consultas em dict, então a latência é
+    limitada e não depende de rede. A ordem das palavras segue a do cazaque.
+    """
+
+    name = 'offline'
+    offline = True
+    MIN_STEM = 3
+
+    def __init__(self, src_lang='kk', dst_lang='pt', table_path=PHRASE_TABLE_PATH, vocab_path=VOCAB_KZ_PATH):
+        super().__init__(src_lang, dst_lang)
+        with open(table_path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        self.words = {normalize_text(k): v for k, v in table.get('words', {}).items()}
+        self.phrases = {tuple(normalize_text(k).split()): v for k, v in table.get('phrases', {}).items()}
+        self.suffixes = sorted(table.get('suffixes', {}).items(), key=lambda item: -len(item[0]))
+        self.max_phrase = max((len(k) for k in self.phrases), default=1)
+
+        self.lexicon = {}
+        if vocab_path and os.path.exists(vocab_path):
+            with open(vocab_path, 'rb') as f:
+                vocab = pickle.load(f)
+            for word in vocab['idx2word_list']:
+                translation = self._resolve(word)
+                if translation is not None:
+                    self.lexicon[word] = translation
+
+        self.unknown = 0
+        self.tokens = 0
+
+    def _stem(self, word):
+        for end in range(len(word), self.MIN_STEM - 1, -1):
+            translation = self.words.get(word[:end])
+            if translation is not None:
+                return translation
+        return None
+
+    def _resolve(self, word):
+        translation = self.words.get(word)
+        if translation is not None:
+            return translation
+        # Sufixo de caso (locativo/dativo) vira preposição: "көшеде" -> "em rua"
+        for suffix, preposition in self.suffixes:
+            if word.endswith(suffix) and len(word) - len(suffix) >= self.MIN_STEM:
+                stem = self.words.get(word[:-len(suffix)])
+                if stem is not None:
+                    return f"{preposition} {stem}"
+        return self._stem(word)
+
+    def _lookup(self, word):
+        translation = self.lexicon.get(word)
+        if translation is None:
+            translation = self._resolve(word)
+            if translation is not None:
+                self.lexicon[word] = translation
+        return translation
+
+    def translate(self, text):
+        tokens = normalize_text(text).split()
+        out = []
+        i = 0
+        while i < len(tokens):
+            for size in range(min(self.max_phrase, len(tokens) - i), 1, -1):
+                phrase = self.phrases.get(tuple(tokens[i:i + size]))
+                if phrase is not None:
+                    out.append(phrase)
+                    i += size
+                    break
+            else:
+                translation = self._lookup(tokens[i])
+                self.tokens += 1
+                if translation is None:
+                    self.unknown += 1
+                    translation = tokens[i]
+                out.append(translation)
+                i += 1
+        result = ' '.join(out)
+        return result[:1].upper() + result[1:]
+
+
+class StubBackend(TranslationBackend):
+    """Backend local para testes: dicionário fixo, latência e falhas simuladas"""
+
+    name = 'stub'
+    offline = True
+
+    def __init__(self, src_lang='kk', dst_lang='pt', mapping=None, delay=0.0, fail=False):
+        super().__init__(src_lang, dst_lang)
+        self.mapping = {normalize_text(k): v for k, v in (mapping or {}).items()}
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def translate(self, text):
+        self.calls += 1
+        if self.delay:
+            sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('falha simulada do tradutor')
+        return self.mapping.get(normalize_text(text), f"[{self.dst_lang}] {text}")
+
+
+BACKENDS = {
+    'google': GoogleBackend,
+    'googletrans': GoogletransBackend,
+    'offline': PhraseTableBackend,
+    'stub': StubBackend,
+}
+
+
+def create_backend(name, src_lang='kk', dst_lang='pt', **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de tradução desconhecido: {name} (opções: {', '.join(BACKENDS)})")
+    return BACKENDS[name](src_lang=src_lang, dst_lang=dst_lang, **kwargs)
+
+
+class TranslationService:
+    """Backend + cache + fallback (com timeout e retries). translate() nunca levanta exceção"""
+
+    def __init__(self, backend, cache=None, fallback=None, timeout=None, retries=0, backoff=0.5):
+        self.backend = backend
+        # Backends offline já são rápidos; o cache só vale para os online
+        self.cache = cache if not backend.offline else None
+        self.fallback = fallback
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.failures = 0
+        self.timeouts = 0
+        self.retried = 0
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def src_lang(self):
+        return self.backend.src_lang
+
+    @property
+    def dst_lang(self):
+        return self.backend.dst_lang
+
+    def _call_once(self, fn, arg):
+        if not self.timeout:
+            return fn(arg)
+        with self._pool_lock:
+            if self._pool is None:
+                # Chamadas que estouram o prazo continuam rodando no worker até a rede
+                # desistir; alguns workers a mais evitam que elas bloqueiem as próximas
+                self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='traducao-backend')
+        future = self._pool.submit(fn, arg)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timeouts += 1
+            raise TimeoutError(f"sem resposta em {self.timeout:.1f}s")
+
+    def _call_backend(self, text, fn=None):
+        """Chama o backend com timeout por tentativa e backoff exponencial entre tentativas"""
+        fn = fn or self.backend.translate
+        for attempt in range(self.retries + 1):
+            try:
+                return self._call_once(fn, text)
+            except Exception as e:
+                if attempt >= self.retries:
+                    raise
+                self.retried += 1
+                delay = self.backoff * (2 ** attempt)
+                print(f"⚠️  Tradução falhou ({self.backend.name}): {e} - nova tentativa em {delay:.1f}s")
+                sleep(delay)
+
+    def translate(self, text):
+        try:
+            if self.cache is not None:
+                return self.cache.translate(text, self.src_lang, self.dst_lang, self._call_backend)
+            return self._call_backend(text)
+        except Exception as e:
+            self.failures += 1
+            if self.fallback is not None:
+                print(f"⚠️  Erro na tradução ({self.backend.name}): {e} - usando {self.fallback.name}")
+                return self.fallback.translate(text)
+            print(f"⚠️  Erro na tradução ({self.backend.name}): {e}")
+            return text
+
+    def translate_batch(self, texts):
+        """Traduz uma lista: consulta o cache, manda só os que faltam num único pedido e
+        grava os resultados. Como translate(), nunca levanta exceção."""
+        results = list(texts)
+        missing = []
+        for i, text in enumerate(results):
+            if not text or not text.strip():
+                continue
+            cached = self.cache.get(text, self.src_lang, self.dst_lang) if self.cache is not None else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                missing.append(i)
+        if not missing:
+            return results
+
+        batch = [results[i] for i in missing]
+        try:
+            translations = self._call_backend(batch, fn=self.backend.translate_batch)
+            if len(translations) != len(batch):
+                raise ValueError(f"{len(translations)} traduções para {len(batch)} textos")
+        except Exception as e:
+            self.failures += 1
+            if self.fallback is None:
+                print(f"⚠️  Erro na tradução em lote ({self.backend.name}): {e}")
+                return results
+            print(f"⚠️  Erro na tradução em lote ({self.backend.name}): {e} - usando {self.fallback.name}")
+            translations = self.fallback.translate_batch(batch)
+            for i, translation in zip(missing, translations):
+                results[i] = translation
+            return results
+
+        for i, text, translation in zip(missing, batch, translations):
+            if translation:
+                results[i] = translation
+                if self.cache is not None:
+                    self.cache.put(text, self.src_lang, self.dst_lang, translation)
+        return results
+
+    def stats(self):
+        stats = {'backend': self.backend.name, 'failures': self.failures,
+                 'timeouts': self.timeouts, 'retries': self.retried}
+        if self.cache is not None:
+            stats['cache'] = self.cache.stats()
+        return stats
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+class TranslationBatcher:
+    """Coalesce pedidos de tradução próximos no tempo em uma chamada translate_batch"""
+
+    def __init__(self, service, window_ms=30.0, max_batch=16):
+        self.service = service
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        # Textos já na fila: pedidos repetidos recebem o mesmo Future
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.texts = 0
+
+        self._thread = threading.Thread(target=self._run, name='traducao-batcher', daemon=True)
+        self._thread.start()
+
+    @property
+    def src_lang(self):
+        return self.service.src_lang
+
+    @property
+    def dst_lang(self):
+        return self.service.dst_lang
+
+    def submit(self, text):
+        """Enfileira um texto e retorna um Future com a tradução"""
+        with self._lock:
+            self.requests += 1
+            if not text or not text.strip():
+                future = Future()
+                future.set_result(text)
+                return future
+            key = normalize_text(text)
+            future = self._pending.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            cache = self.service.cache
+            cached = cache.get(text, self.src_lang, self.dst_lang) if cache is not None else None
+            future = Future()
+            if cached is not None:
+                future.set_result(cached)
+                return future
+            self._pending[key] = future
+        self._queue.put((key, text, future))
+        return future
+
+    def translate(self, text, timeout=None):
+        """Mesma interface de TranslationService.translate(), passando pela fila"""
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self, first):
+        items = [first]
+        deadline = perf_counter() + self.window
+        while len(items) < self.max_batch:
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            items = self._collect(first)
+            try:
+                translations = self.service.translate_batch([text for _, text, _ in items])
+            except Exception as e:
+                translations = None
+                error = e
+
+            self.batches += 1
+            self.texts += len(items)
+            with self._lock:
+                for i, (key, _, future) in enumerate(items):
+                    self._pending.pop(key, None)
+                    if translations is None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(translations[i])
+
+    def stats(self):
+        stats = dict(self.service.stats())
+        stats['batcher'] = {
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'batches': self.batches,
+            'mean_batch': round(self.texts / self.batches, 2) if self.batches else 0.0
+        }
+        return stats
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2)
+        self.service.close()
+
+
+def create_service(name, cache=None, fallback='offline', src_lang='kk', dst_lang='pt',
+                   timeout=None, retries=0):
+    """Cria o serviço a partir da configuração (nome do backend + fallback opcional)"""
+    backend = create_backend(name, src_lang, dst_lang)
+    fallback_backend = None
+    if fallback and fallback != name:
+        try:
+            fallback_backend = create_backend(fallback, src_lang, dst_lang)
+        except Exception as e:
+            print(f"⚠️  Fallback de tradução indisponível ({fallback}): {e}")
+    return TranslationService(backend, cache=cache, fallback=fallback_backend,
+                              timeout=timeout, retries=retries)
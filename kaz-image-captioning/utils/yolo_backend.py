@@ -0,0 +1,268 @@
+"""
+Backend do detector YOLO (TFLite) sem depender do TensorFlow completo.
+
+Ordem de preferência do runtime:
+  1. tflite_runtime (pacote leve, ideal para ARM)
+  2. ai_edge_litert (sucessor do tflite_runtime)
+  3. tensorflow (tf.lite.Interpreter), apenas se nenhum dos anteriores estiver instalado
+
+O XNNPACK é o delegate padrão de CPU nesses runtimes; aqui ele é mantido ativo com
+num_threads configurável (ou desativado com use_xnnpack=False para comparação).
+
+Com várias câmeras no mesmo host, MicroBatcher junta os frames que chegam dentro de uma
+janela curta em um único invoke() com batch N (resize_tensor_input) e devolve a saída de
+cada frame para quem o enviou.
+"""
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from time import perf_counter
+
+import numpy as np
+
+
+def _load_runtime():
+    """Retorna (Interpreter, load_delegate, OpResolverType ou None, nome do runtime)"""
+    try:
+        from tflite_runtime.interpreter import Interpreter, load_delegate
+        try:
+            from tflite_runtime.interpreter import OpResolverType
+        except ImportError:
+            OpResolverType = None
+        return Interpreter, load_delegate, OpResolverType, 'tflite_runtime'
+    except ImportError:
+        pass
+
+    try:
+        from ai_edge_litert.interpreter import Interpreter, load_delegate, OpResolverType
+        return Interpreter, load_delegate, OpResolverType, 'ai_edge_litert'
+    except ImportError:
+        pass
+
+    import tensorflow as tf
+    OpResolverType = getattr(tf.lite.experimental, 'OpResolverType', None)
+    return tf.lite.Interpreter, tf.lite.experimental.load_delegate, OpResolverType, 'tensorflow'
+
+
+class TFLiteDetector:
+    """Interpretador TFLite com threads configuráveis e medição de latência por invoke()"""
+
+    def __init__(self, model_path, num_threads=None, use_xnnpack=True, delegate_path=None):
+        Interpreter, load_delegate, OpResolverType, runtime = _load_runtime()
+        self.runtime = runtime
+        self.model_path = model_path
+        self.num_threads = num_threads or os.cpu_count() or 1
+
+        kwargs = {'model_path': model_path, 'num_threads': self.num_threads}
+        if delegate_path:
+            kwargs['experimental_delegates'] = [load_delegate(delegate_path)]
+        if not use_xnnpack and OpResolverType is not None:
+            kwargs['experimental_op_resolver_type'] = OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+        self.use_xnnpack = use_xnnpack
+
+        self.interpreter = Interpreter(**kwargs)
+        self.interpreter.allocate_tensors()
+
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.input_index = self.input_details['index']
+        self.output_index = self.output_details['index']
+        self.input_height = int(self.input_details['shape'][1])
+        self.input_width = int(self.input_details['shape'][2])
+        self.input_dtype = self.input_details['dtype']
+        self.output_dtype = self.output_details['dtype']
+        self.input_quantization = self.input_details.get('quantization', (1.0, 0))
+        self.output_quantization = self.output_details.get('quantization', (1.0, 0))
+        self.batch_size = int(self.input_details['shape'][0])
+
+        self.latencies_ms = deque(maxlen=200)
+        self.invoke_count = 0
+
+    def invoke(self, input_data):
+        """Executa o modelo e retorna a saída bruta (ainda quantizada, se for o caso)"""
+        start = perf_counter()
+        self.interpreter.set_tensor(self.input_index, input_data)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output_index)
+        self.latencies_ms.append((perf_counter() - start) * 1000.0)
+        self.invoke_count += 1
+        return output
+
+    def set_batch_size(self, batch_size):
+        """Redimensiona a entrada para [batch_size, H, W, C] (realoca só quando o tamanho muda)"""
+        if batch_size == self.batch_size:
+            return
+        shape = list(self.input_details['shape'])
+        shape[0] = batch_size
+        self.interpreter.resize_tensor_input(self.input_index, shape)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.batch_size = batch_size
+
+    def invoke_batch(self, batch):
+        """Executa um batch [N, H, W, C] e retorna a saída [N, ...]"""
+        self.set_batch_size(batch.shape[0])
+        return self.invoke(batch)
+
+    @property
+    def last_latency_ms(self):
+        return self.latencies_ms[-1] if self.latencies_ms else 0.0
+
+    def latency_stats(self):
+        stats = {
+            'runtime': self.runtime,
+            'threads': self.num_threads,
+            'xnnpack': self.use_xnnpack,
+            'invokes': self.invoke_count
+        }
+        if self.latencies_ms:
+            samples = np.array(self.latencies_ms)
+            stats.update({
+                'last_ms': round(float(samples[-1]), 2),
+                'mean_ms': round(float(samples.mean()), 2),
+                'p50_ms': round(float(np.percentile(samples, 50)), 2),
+                'p95_ms': round(float(np.percentile(samples, 95)), 2)
+            })
+        return stats
+
+    def describe(self):
+        return (f"{self.runtime} | threads={self.num_threads} | "
+                f"XNNPACK={'SIM' if self.use_xnnpack else 'NÃO'} | "
+                f"entrada {self.input_width}x{self.input_height} {np.dtype(self.input_dtype).name}")
+
+
+class MicroBatcher:
+    """Fila de micro-batching: um único thread é dono do detector e agrupa pedidos de várias fontes"""
+
+    def __init__(self, detector, max_batch=4, window_ms=5.0):
+        self.detector = detector
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self._queue = queue.Queue()
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.batches = 0
+        self.frames = 0
+        self.fallbacks = 0
+
+        self._thread = threading.Thread(target=self._run, name='yolo-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, input_data):
+        """Enfileira uma entrada [1, H, W, C] e retorna um Future com a saída [1, ...].
+
+        A entrada é copiada aqui: o LetterboxInput reaproveita o mesmo buffer a cada frame,
+        então quem envia pode preparar o próximo frame antes do Future terminar.
+        """
+        item = (np.array(input_data, copy=True), Future())
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('MicroBatcher fechado')
+            self._queue.put(item)
+        return item[1]
+
+    def invoke(self, input_data, timeout=None):
+        """Mesma interface de TFLiteDetector.invoke(), passando pela fila"""
+        return self.submit(input_data).result(timeout=timeout)
+
+    def _batch_buffer(self, n):
+        buffer = self._buffers.get(n)
+        if buffer is None:
+            shape = [n] + list(self.detector.input_details['shape'][1:])
+            buffer = np.empty(shape, dtype=self.detector.input_dtype)
+            self._buffers[n] = buffer
+        return buffer
+
+    def _collect(self, first):
+        items = [first]
+        deadline = perf_counter() + self.window
+        while len(items) < self.max_batch:
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            items = self._collect(first)
+
+            batch = self._batch_buffer(len(items))
+            for i, (input_data, _) in enumerate(items):
+                batch[i] = input_data.reshape(batch.shape[1:])
+
+            try:
+                output = self.detector.invoke_batch(batch)
+            except Exception as e:
+                if len(items) > 1:
+                    self._invoke_each(items, e)
+                else:
+                    items[0][1].set_exception(e)
+                continue
+
+            self.batches += 1
+            self.frames += len(items)
+            for i, (_, future) in enumerate(items):
+                future.set_result(output[i:i + 1])
+
+    def _invoke_each(self, items, error):
+        """Modelo que não aceita batch > 1: passa a executar um frame por invoke()"""
+        print(f"⚠️  YOLO: batch de {len(items)} falhou ({error}), usando batch 1")
+        self.max_batch = 1
+        self.fallbacks += 1
+        for input_data, future in items:
+            try:
+                output = self.detector.invoke_batch(input_data)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            self.batches += 1
+            self.frames += 1
+            future.set_result(output)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'frames': self.frames,
+            'mean_batch': round(self.frames / self.batches, 2) if self.batches else 0.0,
+            'fallbacks': self.fallbacks
+        }
+
+    def close(self, timeout=2.0):
+        """Recusa novos pedidos, termina o que já está na fila e falha o que sobrar"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout=timeout)
+
+        # Worker preso num invoke() lento ou já encerrado: ninguém mais vai atender a fila
+        pending = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[1].set_exception(RuntimeError('MicroBatcher fechado'))
+                pending += 1
+        if self._thread.is_alive():
+            self._queue.put(None)
+        if pending:
+            print(f"⚠️  YOLO: {pending} pedidos descartados ao fechar o batcher")
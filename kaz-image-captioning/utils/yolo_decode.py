@@ -0,0 +1,116 @@
+"""
+Decodificação vetorizada da saída YOLO (TFLite) em arrays NumPy.
+
+A saída [1, N, 5 + classes] é filtrada pela objectness ainda no domínio quantizado (só as
+linhas que passam são convertidas para float), a classe vem de um argmax e o limiar é
+aplicado por classe a partir de uma tabela. Classes podem ser liberadas (allow) ou
+ignoradas (deny) por nome ou índice. O resultado é um Detections com arrays paralelos;
+dicts só são montados na hora de serializar/enviar.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from utils.nms import nms
+
+Detections = namedtuple('Detections', ['boxes', 'scores', 'class_ids'])
+
+
+def empty_detections():
+    return Detections(np.zeros((0, 4), dtype=np.float32),
+                      np.zeros(0, dtype=np.float32),
+                      np.zeros(0, dtype=np.int32))
+
+
+def parse_class_list(text):
+    """'tie,frisbee' -> ['tie', 'frisbee'] (índices numéricos viram int)"""
+    if not text:
+        return []
+    items = [item.strip() for item in text.split(',') if item.strip()]
+    return [int(item) if item.isdigit() else item for item in items]
+
+
+def parse_class_thresholds(text):
+    """'person=0.3,cup=0.2' -> {'person': 0.3, 'cup': 0.2}"""
+    thresholds = {}
+    for item in parse_class_list(text):
+        name, _, value = str(item).partition('=')
+        key = int(name) if name.strip().isdigit() else name.strip()
+        thresholds[key] = float(value)
+    return thresholds
+
+
+class YoloDecoder:
+    """Filtro de confiança por classe + allow/deny + NMS, tudo em arrays"""
+
+    def __init__(self, labels, conf_threshold=0.25, iou_threshold=0.45, max_output=50,
+                 class_thresholds=None, allow=None, deny=None, output_quantization=(0.0, 0)):
+        self.labels = list(labels)
+        self.num_classes = len(self.labels)
+        self.iou_threshold = iou_threshold
+        self.max_output = max_output
+
+        thresholds = np.full(self.num_classes, conf_threshold, dtype=np.float32)
+        for key, value in (class_thresholds or {}).items():
+            thresholds[self._class_index(key)] = value
+        if allow:
+            allowed = np.zeros(self.num_classes, dtype=bool)
+            allowed[[self._class_index(key) for key in allow]] = True
+            thresholds[~allowed] = np.inf
+        for key in deny or []:
+            thresholds[self._class_index(key)] = np.inf
+        self.thresholds = thresholds
+
+        # Como score = objectness * prob_classe <= objectness, a objectness precisa passar
+        # pelo menor limiar ativo; isso permite filtrar antes de converter para float
+        finite = thresholds[np.isfinite(thresholds)]
+        self.min_threshold = float(finite.min()) if finite.size else np.inf
+
+        self.out_scale, self.out_zero = output_quantization
+        if self.out_scale:
+            self._raw_obj_threshold = self.min_threshold / self.out_scale + self.out_zero
+        else:
+            self._raw_obj_threshold = self.min_threshold
+
+    def _class_index(self, key):
+        if isinstance(key, (int, np.integer)):
+            return int(key)
+        try:
+            return self.labels.index(key)
+        except ValueError:
+            raise ValueError(f"Classe desconhecida: {key!r}")
+
+    def _dequantize(self, rows):
+        if self.out_scale:
+            return (rows.astype(np.float32) - self.out_zero) * self.out_scale
+        return rows.astype(np.float32, copy=False)
+
+    def decode(self, output, letterbox=None):
+        """Converte a saída bruta do invoke() em Detections (caixas xyxy normalizadas no frame original)"""
+        preds = output[0] if output.ndim == 3 else output
+        if preds.ndim != 2 or preds.shape[1] < 6 or not np.isfinite(self.min_threshold):
+            return empty_detections()
+
+        preds = self._dequantize(preds[preds[:, 4] > self._raw_obj_threshold])
+        if preds.shape[0] == 0:
+            return empty_detections()
+
+        class_probs = preds[:, 5:5 + self.num_classes]
+        class_ids = np.argmax(class_probs, axis=1)
+        scores = preds[:, 4] * class_probs[np.arange(class_ids.size), class_ids]
+        keep = scores > self.thresholds[class_ids]
+        if not keep.any():
+            return empty_detections()
+
+        xywh = preds[keep, :4]
+        scores = scores[keep]
+        class_ids = class_ids[keep].astype(np.int32)
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2.0
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2.0
+        if letterbox is not None:
+            boxes = letterbox.to_source(boxes)
+
+        # NMS espera [y1, x1, y2, x2]
+        keep_idx = nms(boxes[:, [1, 0, 3, 2]], scores, self.iou_threshold, self.max_output)
+        return Detections(boxes[keep_idx], scores[keep_idx], class_ids[keep_idx])